@@ -5,6 +5,8 @@ LOG_FILE="logs/pdf_service.log"
 LOG_TIMEOUT=20
 HEARTBEAT_TIMEOUT=10
 CHECK_INTERVAL=60
+STATUS_URL=""
+STALL_TIMEOUT=30
 UNAME_STR=$(uname)
 
 # Parse command line arguments
@@ -26,6 +28,14 @@ while [[ $# -gt 0 ]]; do
             CHECK_INTERVAL="$2"
             shift 2
             ;;
+        -s|--status-url)
+            STATUS_URL="$2"
+            shift 2
+            ;;
+        -S|--stall-timeout)
+            STALL_TIMEOUT="$2"
+            shift 2
+            ;;
         -h|--help)
             echo "Usage: $0 [options]"
             echo "Options:"
@@ -33,6 +43,8 @@ while [[ $# -gt 0 ]]; do
             echo "  -t, --timeout MINUTES              General log timeout in minutes (default: $LOG_TIMEOUT)"
             echo "  -b, --heartbeat-timeout MINUTES    Heartbeat log timeout in minutes (default: $HEARTBEAT_TIMEOUT)"
             echo "  -i, --interval SECONDS             Check interval in seconds (default: $CHECK_INTERVAL)"
+            echo "  -s, --status-url URL               Status endpoint, e.g. http://127.0.0.1:8091/status (default: log check only)"
+            echo "  -S, --stall-timeout MINUTES        Stop the service when an in-flight article makes no progress for this long (default: $STALL_TIMEOUT)"
             echo "  -h, --help                         Show help information"
             exit 0
             ;;
@@ -56,10 +68,52 @@ if [ ! -f "$LOG_FILE" ]; then
     fi
 fi
 
+# Stop the service so that it is restarted by launchd/systemd
+stop_service() {
+    if [ "$UNAME_STR" = "Darwin" ]; then
+        launchctl stop com.rbase.pdf2md
+    else
+        # Find pdf_process_service.py process via ps command and terminate (no root permission required)
+        pids=$(ps aux | grep 'pdf_process_service.py' | grep -v grep | awk '{print $2}')
+        if [ -n "$pids" ]; then
+            echo "$(date '+%Y-%m-%d %H:%M:%S') - Detected pdf_process_service.py process, attempting to kill: $pids"
+            kill $pids
+        else
+            echo "$(date '+%Y-%m-%d %H:%M:%S') - No pdf_process_service.py process detected, cannot terminate process"
+        fi
+    fi
+}
+
 # Main loop
 while true; do
     # Get current timestamp
     current_time=$(date +%s)
+
+    # Check in-flight article progress via the status endpoint, fall back to log freshness when it does not respond
+    if [ -n "$STATUS_URL" ]; then
+        status_json=$(curl -sf --max-time 10 "$STATUS_URL")
+        if [ -n "$status_json" ]; then
+            read -r in_flight max_idle max_idle_article <<< "$(echo "$status_json" | python3 -c '
+import json, sys
+status = json.load(sys.stdin)
+# Articles queued for a stage slot are waiting on other articles, not stalled
+articles = sorted((a for a in status["in_flight"] if not a["waiting"]), key=lambda a: a["idle_seconds"])
+if articles:
+    print(len(articles), int(articles[-1]["idle_seconds"]), articles[-1]["article_id"])
+else:
+    print(0, 0, "-")
+')"
+            if [ "${max_idle:-0}" -gt $((STALL_TIMEOUT * 60)) ]; then
+                echo "$(date '+%Y-%m-%d %H:%M:%S') - Article $max_idle_article made no progress for $((max_idle / 60)) minutes, stopping service..."
+                stop_service
+            else
+                echo "$(date '+%Y-%m-%d %H:%M:%S') - Service running normally, $in_flight articles in flight, longest without progress ${max_idle}s"
+            fi
+            sleep $CHECK_INTERVAL
+            continue
+        fi
+        echo "$(date '+%Y-%m-%d %H:%M:%S') - Status endpoint not responding, falling back to log check"
+    fi
     
     # Find the last INFO log
     last_heartbeat=$(grep "[INFO]" "$LOG_FILE" | tail -n 1)
@@ -109,18 +163,7 @@ while true; do
         if [ "$time_diff" -gt "$LOG_TIMEOUT" ]; then
             # Log timeout, stop service
             echo "$(date '+%Y-%m-%d %H:%M:%S') - Log timeout (${time_diff} minutes), stopping service..."
-            if [ "$UNAME_STR" = "Darwin" ]; then
-                launchctl stop com.rbase.pdf2md
-            else
-                # Find pdf_process_service.py process via ps command and terminate (no root permission required)
-                pids=$(ps aux | grep 'pdf_process_service.py' | grep -v grep | awk '{print $2}')
-                if [ -n "$pids" ]; then
-                    echo "$(date '+%Y-%m-%d %H:%M:%S') - Detected pdf_process_service.py process, attempting to kill: $pids"
-                    kill $pids
-                else
-                    echo "$(date '+%Y-%m-%d %H:%M:%S') - No pdf_process_service.py process detected, cannot terminate process"
-                fi
-            fi
+            stop_service
         else
             echo "$(date '+%Y-%m-%d %H:%M:%S') - Service running normally, last log ${time_diff} minutes ago"
         fi
@@ -9,54 +9,2698 @@ PDF处理服务
 import json
 import sys 
 import os
+import shutil
+import hashlib
+import re
+import uuid
+import itertools
+import collections
+import random
+import heapq
+import cProfile
+import pstats
+import io
+import tracemalloc
+import types
+import importlib
+import importlib.util
+import importlib.metadata
 import yaml
 import logging
 import requests
-import oss2
-from mns.account import Account
-from mns.queue import *
-from mns.topic import *
-from magic_pdf.data.dataset import PymuDocDataset
-from magic_pdf.data.data_reader_writer import FileBasedDataWriter
-from magic_pdf.model.doc_analyze_by_custom_model import doc_analyze
-from magic_pdf.config.enums import SupportedPdfParseMethod
-from aliyun.log import LogClient, LogItem, PutLogsRequest
-from aliyun.log.logexception import LogException
 import time
 import psutil
 import argparse
+import threading
+import queue
+import contextlib
+import signal
+import socket
+import secrets
+import tempfile
+from concurrent.futures import ThreadPoolExecutor, Future
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Listener, Client
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
 
-# 创建logs目录
-os.makedirs('logs', exist_ok=True)
+def lazy_module(name):
+    """
+    延迟导入模块，首次访问模块属性时才执行模块代码
+    模块未安装时返回占位模块，访问其属性时抛出ModuleNotFoundError
+    Args:
+        name: 模块名
+    Returns:
+        模块对象
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        module = types.ModuleType(name)
+
+        def missing(attr):
+            raise ModuleNotFoundError(f"No module named '{name}'", name=name)
+
+        module.__getattr__ = missing
+        return module
+    spec.loader = importlib.util.LazyLoader(spec.loader)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+# OSS SDK较重，延迟到首次访问时导入
+oss2 = lazy_module('oss2')
+
+# 以下依赖在首次使用时由import_mns、import_sls、import_magic_pdf导入，
+# 只需要MNS/OSS的进程不会加载magic_pdf及torch
+Account = None
+MNSExceptionBase = None
+Base64TopicMessage = None
+QueueMessage = None
+LogClient = None
+LogItem = None
+PutLogsRequest = None
+LogException = None
+PymuDocDataset = None
+FileBasedDataWriter = None
+doc_analyze = None
+SupportedPdfParseMethod = None
+InferenceResult = None
+
+def import_mns():
+    """
+    导入阿里云MNS SDK
+    """
+    global Account, MNSExceptionBase, Base64TopicMessage, QueueMessage
+    if Account is None:
+        from mns.account import Account
+    if MNSExceptionBase is None:
+        from mns.mns_exception import MNSExceptionBase
+    if Base64TopicMessage is None:
+        from mns.topic import Base64TopicMessage
+    if QueueMessage is None:
+        from mns.queue import Message as QueueMessage
+
+def import_sls():
+    """
+    导入阿里云日志服务SDK
+    """
+    global LogClient, LogItem, PutLogsRequest, LogException
+    if LogClient is None:
+        from aliyun.log import LogClient
+    if LogItem is None:
+        from aliyun.log import LogItem
+    if PutLogsRequest is None:
+        from aliyun.log import PutLogsRequest
+    if LogException is None:
+        from aliyun.log.logexception import LogException
+
+def import_magic_pdf(with_models=True):
+    """
+    导入magic_pdf解析和推理模块
+    Args:
+        with_models: 是否导入模型推理函数（会加载torch等模型依赖），推理由共享推理服务执行时不需要
+    """
+    global PymuDocDataset, FileBasedDataWriter, doc_analyze, SupportedPdfParseMethod, InferenceResult
+    if PymuDocDataset is None:
+        from magic_pdf.data.dataset import PymuDocDataset
+    if FileBasedDataWriter is None:
+        from magic_pdf.data.data_reader_writer import FileBasedDataWriter
+    if doc_analyze is None and with_models:
+        from magic_pdf.model.doc_analyze_by_custom_model import doc_analyze
+    if SupportedPdfParseMethod is None:
+        from magic_pdf.config.enums import SupportedPdfParseMethod
+    if InferenceResult is None:
+        from magic_pdf.operators.models import InferenceResult
+
+# 日志记录器，处理器在setup_logging中配置
+logger = logging.getLogger('pdf_service')
+logger.setLevel(logging.INFO)
+
+def setup_logging(log_dir='logs'):
+    """
+    配置日志输出到文件和标准输出，重复调用时不会重复添加处理器
+    Args:
+        log_dir: 日志目录
+    """
+    if logger.handlers:
+        return
+
+    # 创建logs目录
+    os.makedirs(log_dir, exist_ok=True)
+
+    # 创建处理器
+    file_handler = logging.FileHandler(filename=os.path.join(log_dir, 'pdf_service.log'))
+    stdout_handler = logging.StreamHandler(stream=sys.stdout)
+
+    # 设置日志格式
+    formatter = logging.Formatter('%(asctime)s [%(filename)s:%(lineno)s] [%(levelname)s] %(message)s')
+    file_handler.setFormatter(formatter)
+    stdout_handler.setFormatter(formatter)
+
+    # 添加处理器
+    logger.addHandler(file_handler)
+    logger.addHandler(stdout_handler)
+
+class CheckpointStore:
+    """
+    推理结果检查点存储
+    按页码区间保存doc_analyze的推理结果，以文章ID、PDF内容哈希和解析方式作为键，
+    支持本地目录和OSS两种存储方式
+    """
+    def __init__(self, backend='local', local_dir='temp/checkpoints', bucket=None, oss_prefix='checkpoints'):
+        """
+        初始化检查点存储
+        Args:
+            backend: 存储方式，local或oss
+            local_dir: 本地存储目录
+            bucket: OSS Bucket对象（backend为oss时使用）
+            oss_prefix: OSS存储前缀
+        """
+        if backend not in ('local', 'oss'):
+            raise ValueError(f"不支持的检查点存储方式: {backend}")
+        self.backend = backend
+        self.local_dir = local_dir
+        self.bucket = bucket
+        self.oss_prefix = oss_prefix.strip('/')
+        self.held_claims = {}
+        if self.backend == 'local':
+            os.makedirs(self.local_dir, exist_ok=True)
+
+    def _range_key(self, article_id, content_hash, parse_method, start_page, end_page):
+        """
+        生成页码区间检查点的相对键
+        """
+        return f'{article_id}/{content_hash}/{parse_method}/{start_page:06d}-{end_page:06d}.json'
+
+    def save_range(self, article_id, content_hash, parse_method, start_page, end_page, page_results):
+        """
+        保存一个页码区间的推理结果
+        Args:
+            article_id: 文章ID
+            content_hash: PDF内容哈希
+            parse_method: 解析方式，ocr或txt
+            start_page: 起始页码（包含）
+            end_page: 结束页码（包含）
+            page_results: 该区间每页的推理结果列表
+        """
+        key = self._range_key(article_id, content_hash, parse_method, start_page, end_page)
+        data = json.dumps(page_results, ensure_ascii=False)
+        if self.backend == 'oss':
+            self.bucket.put_object(f'{self.oss_prefix}/{key}', data)
+            return
+        # 先写临时文件再替换，避免进程中断时留下不完整的检查点
+        path = os.path.join(self.local_dir, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def load_range(self, article_id, content_hash, parse_method, start_page, end_page):
+        """
+        读取一个页码区间的推理结果
+        Returns:
+            该区间每页的推理结果列表，不存在时返回None
+        """
+        key = self._range_key(article_id, content_hash, parse_method, start_page, end_page)
+        if self.backend == 'oss':
+            try:
+                return json.loads(self.bucket.get_object(f'{self.oss_prefix}/{key}').read())
+            except oss2.exceptions.NoSuchKey:
+                return None
+        path = os.path.join(self.local_dir, key)
+        if not os.path.exists(path):
+            return None
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def _claim_key(self, article_id, content_hash, parse_method, start_page, end_page):
+        """
+        生成页码区间认领标记的相对键
+        """
+        return f'{article_id}/{content_hash}/{parse_method}/{start_page:06d}-{end_page:06d}.claim'
+
+    def claim_range(self, article_id, content_hash, parse_method, start_page, end_page, owner, ttl=1800):
+        """
+        认领一个页码区间，同一区间同时只有一个节点推理
+        认领标记超过有效期时视为认领者已退出，可重新认领；接管以读取到的过期标记为条件写入
+        （OSS使用ETag条件覆盖，本地以过期标记内容的哈希创建接管标记），同时接管时只有一个节点成功；
+        认领成功后每隔ttl/3秒续期，直到调用finish_range或release_range
+        Args:
+            article_id: 文章ID
+            content_hash: PDF内容哈希
+            parse_method: 解析方式，ocr或txt
+            start_page: 起始页码（包含）
+            end_page: 结束页码（包含）
+            owner: 认领者标识
+            ttl: 认领标记的有效期(秒)
+        Returns:
+            认领成功时返回True
+        """
+        key = self._claim_key(article_id, content_hash, parse_method, start_page, end_page)
+        data = json.dumps({'owner': owner, 'claimed_at': time.time()})
+        if self.backend == 'oss':
+            claim_key = f'{self.oss_prefix}/{key}'
+            for _ in range(2):
+                try:
+                    result = self.bucket.put_object(claim_key, data, headers={'x-oss-forbid-overwrite': 'true'})
+                except oss2.exceptions.ServerError as e:
+                    if e.status != 409:
+                        raise
+                else:
+                    self.start_renew(key, owner, ttl, result.etag)
+                    return True
+                try:
+                    stale = self.bucket.get_object(claim_key)
+                    claim = json.loads(stale.read())
+                except oss2.exceptions.NoSuchKey:
+                    continue
+                if time.time() - claim['claimed_at'] < ttl:
+                    return False
+                try:
+                    result = self.bucket.put_object(claim_key, data, headers={'If-Match': stale.etag})
+                except oss2.exceptions.ServerError as e:
+                    if e.status in (404, 412):
+                        return False
+                    raise
+                self.start_renew(key, owner, ttl, result.etag)
+                return True
+            return False
+
+        path = os.path.join(self.local_dir, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        for _ in range(2):
+            try:
+                fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            except FileExistsError:
+                try:
+                    with open(path, 'rb') as f:
+                        raw = f.read()
+                    claim = json.loads(raw)
+                except FileNotFoundError:
+                    continue
+                except ValueError:
+                    # 认领标记正在写入
+                    return False
+                if time.time() - claim['claimed_at'] < ttl:
+                    return False
+                # 读到同一过期标记的节点竞争创建同名接管标记，只有一个节点能够接管；
+                # 标记名随认领内容变化，续期或接管后的认领需要重新竞争
+                marker = f'{path}.{hashlib.md5(raw).hexdigest()}.takeover'
+                try:
+                    os.close(os.open(marker, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+                except FileExistsError:
+                    return False
+                self._write_claim(path, data)
+                self.start_renew(key, owner, ttl)
+                return True
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(data)
+            self.start_renew(key, owner, ttl)
+            return True
+        return False
+
+    def _write_claim(self, path, data):
+        """
+        原子替换本地认领标记
+        """
+        tmp_path = f'{path}.{uuid.uuid4().hex}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def start_renew(self, key, owner, ttl, etag=None):
+        """
+        记录持有的认领并启动续期线程，ttl不大于0时不续期
+        Args:
+            key: 认领标记的相对键
+            owner: 认领者标识
+            ttl: 认领标记的有效期(秒)
+            etag: OSS认领对象当前的ETag
+        """
+        if ttl <= 0:
+            return
+        stopped = threading.Event()
+        self.held_claims[(key, owner)] = stopped
+        threading.Thread(target=self.renew_loop, args=(key, owner, ttl, etag, stopped),
+                         name='range-claim-renew', daemon=True).start()
+
+    def renew_loop(self, key, owner, ttl, etag, stopped):
+        """
+        推理认领的区间期间定期续期，避免推理耗时超过认领有效期时区间被其他节点接管重复推理
+        OSS以上次写入的ETag条件覆盖，认领已被其他节点接管时停止续期
+        Args:
+            key: 认领标记的相对键
+            owner: 认领者标识
+            ttl: 认领标记的有效期(秒)
+            etag: OSS认领对象当前的ETag
+            stopped: 结束认领时设置的事件
+        """
+        while not stopped.wait(ttl / 3):
+            data = json.dumps({'owner': owner, 'claimed_at': time.time()})
+            try:
+                if self.backend == 'oss':
+                    try:
+                        result = self.bucket.put_object(f'{self.oss_prefix}/{key}', data, headers={'If-Match': etag})
+                    except oss2.exceptions.ServerError as e:
+                        if e.status in (404, 412):
+                            logger.warning(f"区间认领已被其他节点接管，停止续期: {key}")
+                            return
+                        raise
+                    etag = result.etag
+                    continue
+                path = os.path.join(self.local_dir, key)
+                with open(path, 'r', encoding='utf-8') as f:
+                    if json.load(f).get('owner') != owner:
+                        logger.warning(f"区间认领已被其他节点接管，停止续期: {key}")
+                        return
+                self._write_claim(path, data)
+            except FileNotFoundError:
+                return
+            except Exception as e:
+                logger.warning(f"区间认领续期失败: {e}")
+
+    def finish_range(self, article_id, content_hash, parse_method, start_page, end_page, owner):
+        """
+        区间推理完成后停止续期，保留认领标记，已保存检查点的区间不会再被认领
+        Args:
+            article_id: 文章ID
+            content_hash: PDF内容哈希
+            parse_method: 解析方式，ocr或txt
+            start_page: 起始页码（包含）
+            end_page: 结束页码（包含）
+            owner: 认领者标识
+        """
+        key = self._claim_key(article_id, content_hash, parse_method, start_page, end_page)
+        stopped = self.held_claims.pop((key, owner), None)
+        if stopped is not None:
+            stopped.set()
+
+    def release_range(self, article_id, content_hash, parse_method, start_page, end_page, owner):
+        """
+        释放本节点认领的页码区间，推理失败时调用，使其他节点无需等待认领超时即可重新认领
+        Args:
+            article_id: 文章ID
+            content_hash: PDF内容哈希
+            parse_method: 解析方式，ocr或txt
+            start_page: 起始页码（包含）
+            end_page: 结束页码（包含）
+            owner: 认领者标识，只删除该认领者的认领标记
+        """
+        self.finish_range(article_id, content_hash, parse_method, start_page, end_page, owner)
+        key = self._claim_key(article_id, content_hash, parse_method, start_page, end_page)
+        if self.backend == 'oss':
+            claim_key = f'{self.oss_prefix}/{key}'
+            try:
+                claim = json.loads(self.bucket.get_object(claim_key).read())
+            except oss2.exceptions.NoSuchKey:
+                return
+            if claim.get('owner') == owner:
+                self.bucket.delete_object(claim_key)
+            return
+
+        path = os.path.join(self.local_dir, key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                claim = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return
+        if claim.get('owner') == owner:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(path)
+
+    def save_source(self, article_id, content_hash, pdf_bytes):
+        """
+        保存PDF原文件，供其他节点推理该文档的页码区间
+        Args:
+            article_id: 文章ID
+            content_hash: PDF内容哈希
+            pdf_bytes: PDF文件内容
+        """
+        key = f'{article_id}/{content_hash}/source.pdf'
+        if self.backend == 'oss':
+            self.bucket.put_object(f'{self.oss_prefix}/{key}', pdf_bytes)
+            return
+        path = os.path.join(self.local_dir, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(pdf_bytes)
+        os.replace(tmp_path, path)
+
+    def load_source(self, article_id, content_hash):
+        """
+        读取PDF原文件
+        Returns:
+            PDF文件内容，不存在时（文档已处理完成并清理检查点）返回None
+        """
+        key = f'{article_id}/{content_hash}/source.pdf'
+        if self.backend == 'oss':
+            try:
+                return self.bucket.get_object(f'{self.oss_prefix}/{key}').read()
+            except oss2.exceptions.NoSuchKey:
+                return None
+        path = os.path.join(self.local_dir, key)
+        if not os.path.exists(path):
+            return None
+        with open(path, 'rb') as f:
+            return f.read()
+
+    def clear(self, article_id):
+        """
+        删除文章的全部检查点（包括旧内容哈希下的检查点）
+        Args:
+            article_id: 文章ID
+        """
+        if self.backend == 'oss':
+            keys = [obj.key for obj in oss2.ObjectIterator(self.bucket, prefix=f'{self.oss_prefix}/{article_id}/')]
+            # batch_delete_objects每次最多删除1000个对象
+            for i in range(0, len(keys), 1000):
+                self.bucket.batch_delete_objects(keys[i:i + 1000])
+            return
+        shutil.rmtree(os.path.join(self.local_dir, article_id), ignore_errors=True)
+
+class PageRangeQueue:
+    """
+    页码区间子任务队列
+    超大文档按页码区间拆分的推理子任务发布到该队列，由各节点认领执行；
+    支持MNS队列（多节点）和本地目录（单机测试）两种方式
+    """
+    def __init__(self, backend='local', local_dir='temp/subtasks', mns_queue=None, poll_interval=1):
+        """
+        初始化子任务队列
+        Args:
+            backend: 队列方式，mns或local
+            local_dir: 本地队列目录，每个子任务一个JSON文件
+            mns_queue: MNS队列对象（backend为mns时使用）
+            poll_interval: 本地队列为空时检查新子任务的间隔(秒)
+        """
+        if backend not in ('local', 'mns'):
+            raise ValueError(f"不支持的子任务队列方式: {backend}")
+        self.backend = backend
+        self.local_dir = local_dir
+        self.mns_queue = mns_queue
+        self.poll_interval = poll_interval
+        if self.backend == 'local':
+            os.makedirs(self.local_dir, exist_ok=True)
+
+    def put(self, task):
+        """
+        发布一个子任务
+        Args:
+            task: 子任务字典
+        """
+        data = json.dumps(task, ensure_ascii=False)
+        if self.backend == 'mns':
+            self.mns_queue.send_message(QueueMessage(data))
+            return
+        path = os.path.join(self.local_dir, f'{time.time_ns():020d}-{uuid.uuid4().hex}.json')
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def get(self, wait_seconds=0):
+        """
+        接收一个子任务
+        Args:
+            wait_seconds: 队列为空时的最长等待时间(秒)
+        Returns:
+            (handle, 子任务字典)，队列为空时返回None；处理完成后调用done(handle)
+        """
+        if self.backend == 'mns':
+            try:
+                message = self.mns_queue.receive_message(wait_seconds=wait_seconds)
+            except MNSExceptionBase as e:
+                if e.type == "MessageNotExist":
+                    return None
+                raise
+            return message.receipt_handle, json.loads(message.message_body)
+
+        deadline = time.time() + wait_seconds
+        while True:
+            for name in sorted(os.listdir(self.local_dir)):
+                if not name.endswith('.json'):
+                    continue
+                path = os.path.join(self.local_dir, name)
+                handle = f'{path[:-len(".json")]}.taken'
+                # 重命名是原子操作，只有一个节点能取到该子任务
+                try:
+                    os.rename(path, handle)
+                except FileNotFoundError:
+                    continue
+                with open(handle, 'r', encoding='utf-8') as f:
+                    return handle, json.load(f)
+            if time.time() >= deadline:
+                return None
+            time.sleep(min(self.poll_interval, max(deadline - time.time(), 0)))
+
+    def done(self, handle):
+        """
+        删除已处理的子任务
+        Args:
+            handle: get返回的handle
+        """
+        if self.backend == 'mns':
+            self.mns_queue.delete_message(handle)
+            return
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(handle)
+
+def single_flight_key(pdf_url, outputs, mode=None):
+    """
+    生成去重键，相同PDF地址、输出产物和解析模式的请求产生相同的结果
+    Args:
+        pdf_url: PDF下载地址
+        outputs: 输出产物
+        mode: 解析模式
+    Returns:
+        sha256十六进制字符串
+    """
+    return hashlib.sha256(json.dumps([pdf_url, sorted(outputs), mode]).encode('utf-8')).hexdigest()
+
+class SingleFlight:
+    """
+    跨进程单飞协调
+    同一去重键同时只有一个worker持有锁并执行转换，完成后发布结果记录，其他worker等待并复用该结果；
+    支持本地文件锁（同一节点）和OSS禁止覆盖写入的锁对象（多节点）两种方式
+    """
+    def __init__(self, backend='local', local_dir='temp/dedupe', bucket=None, oss_prefix='dedupe',
+                 lock_ttl=3600, result_ttl=3600):
+        """
+        初始化单飞协调
+        Args:
+            backend: 锁和结果记录的存储方式，local或oss
+            local_dir: 本地存储目录
+            bucket: OSS Bucket对象（backend为oss时使用）
+            oss_prefix: OSS存储前缀
+            lock_ttl: OSS锁对象的有效期(秒)，超过后视为持有者已退出，持有期间每隔lock_ttl/3秒续期
+            result_ttl: 结果记录的有效期(秒)，超过后重新转换
+        """
+        if backend not in ('local', 'oss'):
+            raise ValueError(f"不支持的去重存储方式: {backend}")
+        self.backend = backend
+        self.local_dir = local_dir
+        self.bucket = bucket
+        self.oss_prefix = oss_prefix.strip('/')
+        self.lock_ttl = lock_ttl
+        self.result_ttl = result_ttl
+        self.held_locks = {}
+        if self.backend == 'local':
+            os.makedirs(self.local_dir, exist_ok=True)
+
+    def acquire(self, key):
+        """
+        尝试获取去重键的锁，不等待
+        Args:
+            key: 去重键
+        Returns:
+            获取成功时返回True
+        """
+        if self.backend == 'oss':
+            lock_key = f'{self.oss_prefix}/{key}.lock'
+            owner = uuid.uuid4().hex
+            for _ in range(2):
+                data = json.dumps({'acquired_at': time.time(), 'owner': owner})
+                try:
+                    result = self.bucket.put_object(lock_key, data, headers={'x-oss-forbid-overwrite': 'true'})
+                except oss2.exceptions.ServerError as e:
+                    if e.status != 409:
+                        raise
+                else:
+                    self.start_renew(key, owner, result.etag)
+                    return True
+                # 锁对象超过有效期时视为持有者已退出，以读取时的ETag条件覆盖接管，
+                # 多个worker同时接管时只有一个写入成功
+                try:
+                    stale = self.bucket.get_object(lock_key)
+                    lock = json.loads(stale.read())
+                except oss2.exceptions.NoSuchKey:
+                    continue
+                if time.time() - lock['acquired_at'] < self.lock_ttl:
+                    return False
+                try:
+                    result = self.bucket.put_object(lock_key, data, headers={'If-Match': stale.etag})
+                except oss2.exceptions.ServerError as e:
+                    if e.status in (404, 412):
+                        return False
+                    raise
+                self.start_renew(key, owner, result.etag)
+                return True
+            return False
+
+        import fcntl
+
+        f = open(os.path.join(self.local_dir, f'{key}.lock'), 'a')
+        try:
+            fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            f.close()
+            return False
+        self.held_locks[key] = f
+        return True
+
+    def release(self, key):
+        """
+        释放去重键的锁
+        Args:
+            key: 去重键
+        """
+        if self.backend == 'oss':
+            held = self.held_locks.pop(key, None)
+            if held is None:
+                return
+            owner, stopped = held
+            stopped.set()
+            # 锁已过期被其他worker接管时不删除对方的锁
+            if self.lock_owner(key) == owner:
+                self.bucket.delete_object(f'{self.oss_prefix}/{key}.lock')
+            return
+        f = self.held_locks.pop(key, None)
+        if f is not None:
+            f.close()
+
+    def start_renew(self, key, owner, etag):
+        """
+        记录持有的OSS锁并启动续期线程
+        Args:
+            key: 去重键
+            owner: 本worker的持有者标识
+            etag: 锁对象当前的ETag
+        """
+        stopped = threading.Event()
+        self.held_locks[key] = (owner, stopped)
+        threading.Thread(target=self.renew_loop, args=(key, owner, etag, stopped),
+                         name='single-flight-renew', daemon=True).start()
+
+    def lock_owner(self, key):
+        """
+        读取OSS锁对象的持有者
+        Args:
+            key: 去重键
+        Returns:
+            持有者标识，锁不存在时返回None
+        """
+        try:
+            return json.loads(self.bucket.get_object(f'{self.oss_prefix}/{key}.lock').read()).get('owner')
+        except oss2.exceptions.NoSuchKey:
+            return None
+
+    def renew_loop(self, key, owner, etag, stopped):
+        """
+        持有OSS锁期间定期续期，避免转换耗时超过lock_ttl时锁被其他worker接管
+        续期以上次写入的ETag条件覆盖，锁已被其他worker接管时写入失败，不会覆盖对方的锁
+        Args:
+            key: 去重键
+            owner: 本worker的持有者标识
+            etag: 锁对象当前的ETag
+            stopped: 释放锁时设置的事件
+        """
+        while not stopped.wait(self.lock_ttl / 3):
+            try:
+                result = self.bucket.put_object(f'{self.oss_prefix}/{key}.lock',
+                                                json.dumps({'acquired_at': time.time(), 'owner': owner}),
+                                                headers={'If-Match': etag})
+                etag = result.etag
+            except oss2.exceptions.ServerError as e:
+                if e.status in (404, 412):
+                    logger.warning(f"去重锁已被其他worker接管，停止续期: {key}")
+                    return
+                logger.warning(f"去重锁续期失败: {e}")
+            except Exception as e:
+                logger.warning(f"去重锁续期失败: {e}")
+
+    def publish(self, key, record):
+        """
+        发布转换结果记录
+        Args:
+            key: 去重键
+            record: 结果记录字典
+        """
+        data = json.dumps(dict(record, finished_at=time.time()), ensure_ascii=False)
+        if self.backend == 'oss':
+            self.bucket.put_object(f'{self.oss_prefix}/{key}.json', data)
+            return
+        path = os.path.join(self.local_dir, f'{key}.json')
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def load(self, key):
+        """
+        读取未过期的转换结果记录
+        Args:
+            key: 去重键
+        Returns:
+            结果记录字典，不存在或已过期时返回None
+        """
+        if self.backend == 'oss':
+            try:
+                record = json.loads(self.bucket.get_object(f'{self.oss_prefix}/{key}.json').read())
+            except oss2.exceptions.NoSuchKey:
+                return None
+        else:
+            path = os.path.join(self.local_dir, f'{key}.json')
+            if not os.path.exists(path):
+                return None
+            with open(path, 'r', encoding='utf-8') as f:
+                record = json.load(f)
+        if time.time() - record['finished_at'] >= self.result_ttl:
+            return None
+        return record
+
+def map_result_key(key, record, content):
+    """
+    将结果记录中的OSS对象路径映射到当前消息的输出路径
+    Args:
+        key: 结果记录中的OSS对象路径
+        record: 结果记录，包含原文章的article_id和输出路径
+        content: 当前消息内容字典
+    Returns:
+        当前消息对应的OSS对象路径
+    """
+    if key == record['markdown_file']:
+        return content['markdown_file']
+    images_prefix = record['images_path'].rstrip('/') + '/'
+    if key.startswith(images_prefix):
+        return content['images_path'].rstrip('/') + '/' + key[len(images_prefix):]
+    name = os.path.basename(key)
+    if name.startswith(f"{record['article_id']}_"):
+        name = f"{content['article_id']}_{name[len(record['article_id']) + 1:]}"
+    return os.path.join(content['json_path'], name)
+
+def rewrite_result_object(key, data, record, content, image_dir):
+    """
+    将复用的markdown和JSON结果中原文章的图片路径和文章ID替换为当前消息的值
+    Args:
+        key: 结果记录中的OSS对象路径
+        data: 对象内容
+        record: 结果记录，包含原文章的article_id和图片目录
+        content: 当前消息内容字典
+        image_dir: 当前文章的图片目录
+    Returns:
+        替换后的对象内容
+    """
+    text = data.decode('utf-8')
+    if record.get('image_dir'):
+        text = text.replace(record['image_dir'], image_dir)
+    if os.path.basename(key) == f"{record['article_id']}_manifest.json":
+        manifest = json.loads(text)
+        manifest['article_id'] = content['article_id']
+        text = json.dumps(manifest, ensure_ascii=False, indent=4)
+    return text.encode('utf-8')
+
+class JSONRequestHandler(BaseHTTPRequestHandler):
+    """
+    返回JSON响应的HTTP请求处理基类
+    """
+    protocol_version = 'HTTP/1.1'
+
+    def send_json(self, status, body):
+        """
+        返回普通JSON响应
+        Args:
+            status: HTTP状态码
+            body: 响应内容字典
+        """
+        data = json.dumps(body, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+class StatusRequestHandler(JSONRequestHandler):
+    """
+    状态接口请求处理类，只提供只读的GET /status，不接收任务
+    GET /status 返回处理中文章、吞吐量和队列积压
+    """
+
+    def do_GET(self):
+        """
+        处理状态查询请求
+        """
+        if self.path.rstrip('/') != '/status':
+            self.send_json(404, {'error': 'not found'})
+            return
+        self.send_json(200, self.server.service.status_snapshot())
+
+    def log_message(self, format, *args):
+        """
+        状态查询请求较频繁，访问日志只写入DEBUG日志，避免掩盖服务停滞
+        """
+        logger.debug(f"状态接口请求: {format % args}")
+
+class BatchRequestHandler(JSONRequestHandler):
+    """
+    批量提交接口请求处理类
+    POST /jobs 接收文章列表（字段与MNS消息相同），以NDJSON流的形式逐篇返回处理事件
+    """
+
+    def do_POST(self):
+        """
+        处理批量任务提交请求
+        """
+        if self.path.rstrip('/') != '/jobs':
+            self.send_json(404, {'error': 'not found'})
+            return
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            payload = json.loads(self.rfile.read(length))
+            contents = payload['messages'] if isinstance(payload, dict) else payload
+            if not isinstance(contents, list):
+                raise ValueError('messages必须是列表')
+        except Exception as e:
+            self.send_json(400, {'error': f'请求格式错误: {e}'})
+            return
+
+        service = self.server.service
+        events = queue.Queue()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/x-ndjson')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+
+        # 逐篇提交，任务队列满时阻塞等待，同时回传已完成的事件
+        pending = 0
+        succeeded = 0
+        failed = 0
+        for content in contents:
+            article_id = content.get('article_id', 'unknown') if isinstance(content, dict) else 'unknown'
+            if service.submit_job(content, events):
+                pending += 1
+                self.write_event({'event': 'accepted', 'article_id': article_id})
+            else:
+                failed += 1
+                self.write_event({'event': 'rejected', 'article_id': article_id, 'error': '任务队列已满'})
+            while True:
+                try:
+                    event = events.get_nowait()
+                except queue.Empty:
+                    break
+                pending -= 1
+                succeeded, failed = self.count_event(event, succeeded, failed)
+                self.write_event(event)
+
+        while pending > 0:
+            event = events.get()
+            pending -= 1
+            succeeded, failed = self.count_event(event, succeeded, failed)
+            self.write_event(event)
+
+        self.write_event({
+            'event': 'batch_completed',
+            'total': len(contents),
+            'succeeded': succeeded,
+            'failed': failed
+        })
+        self.wfile.write(b'0\r\n\r\n')
+        self.wfile.flush()
+
+    def count_event(self, event, succeeded, failed):
+        """
+        按事件类型累计成功和失败数量
+        """
+        if event['event'] == 'completed':
+            return succeeded + 1, failed
+        return succeeded, failed + 1
+
+    def write_event(self, event):
+        """
+        以chunked编码写出一行NDJSON事件
+        Args:
+            event: 事件字典
+        """
+        data = (json.dumps(event, ensure_ascii=False) + '\n').encode('utf-8')
+        self.wfile.write(f'{len(data):X}\r\n'.encode('ascii') + data + b'\r\n')
+        self.wfile.flush()
+
+    def log_message(self, format, *args):
+        """
+        将HTTP访问日志写入服务日志
+        """
+        logger.info(f"批量提交接口请求: {format % args}")
+
+class AdaptiveLimiter:
+    """
+    可动态调整上限的并发限制器
+    与信号量类似，但上限可以在运行时调整，并记录正在执行和排队等待的数量
+    """
+    def __init__(self, limit):
+        """
+        初始化并发限制器
+        Args:
+            limit: 初始并发上限
+        """
+        self.limit = limit
+        self.active = 0
+        self.waiting = 0
+        self.condition = threading.Condition()
+
+    def acquire(self):
+        """
+        获取一个执行名额，达到上限时阻塞等待
+        """
+        with self.condition:
+            self.waiting += 1
+            while self.active >= self.limit:
+                self.condition.wait()
+            self.waiting -= 1
+            self.active += 1
+
+    def release(self):
+        """
+        释放一个执行名额
+        """
+        with self.condition:
+            self.active -= 1
+            self.condition.notify_all()
+
+    def set_limit(self, limit):
+        """
+        调整并发上限，上调时唤醒等待中的线程
+        Args:
+            limit: 新的并发上限
+        """
+        with self.condition:
+            self.limit = limit
+            self.condition.notify_all()
+
+class AdaptiveConcurrencyController:
+    """
+    自适应并发控制器
+    统计下载、推理、上传各阶段的排队数量、耗时和吞吐，按AIMD策略在配置范围内调整各阶段并发数：
+    有排队且延迟未明显恶化时加1，延迟恶化且吞吐未提升或内存占用过高时减半
+    """
+    def __init__(self, config):
+        """
+        初始化自适应并发控制器
+        Args:
+            config: concurrency配置字典
+        """
+        self.adjust_interval = config.get('adjust_interval', 30)
+        self.max_memory_percent = config.get('max_memory_percent', 85)
+        self.latency_tolerance = config.get('latency_tolerance', 2.0)
+        self.ewma_alpha = config.get('ewma_alpha', 0.3)
+        stage_defaults = {
+            'download': {'min': 1, 'max': 8, 'initial': 2},
+            # magic_pdf的模型单例未确认线程安全，推理默认不并发
+            'inference': {'min': 1, 'max': 1, 'initial': 1},
+            'upload': {'min': 1, 'max': 8, 'initial': 2}
+        }
+        self.stages = {}
+        for name, defaults in stage_defaults.items():
+            stage_config = dict(defaults, **config.get('stages', {}).get(name, {}))
+            self.stages[name] = {
+                'min': stage_config['min'],
+                'max': stage_config['max'],
+                'limiter': AdaptiveLimiter(stage_config['initial']),
+                'latency': None,
+                'baseline_latency': None,
+                'completed': 0,
+                'last_throughput': 0.0,
+                'decision': 'init'
+            }
+        self.stats_lock = threading.Lock()
+        self.last_adjust_time = time.time()
+        self.in_flight = 0
+        self.slot_condition = threading.Condition()
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        """
+        在指定阶段的并发限制内执行，并记录该阶段耗时
+        Args:
+            name: 阶段名称，download、inference或upload
+        """
+        stage = self.stages[name]
+        stage['limiter'].acquire()
+        started_at = time.time()
+        try:
+            yield
+        finally:
+            elapsed = time.time() - started_at
+            stage['limiter'].release()
+            with self.stats_lock:
+                if stage['latency'] is None:
+                    stage['latency'] = elapsed
+                else:
+                    stage['latency'] = self.ewma_alpha * elapsed + (1 - self.ewma_alpha) * stage['latency']
+                stage['completed'] += 1
+
+    def memory_percent(self):
+        """
+        获取系统内存占用百分比
+        """
+        return psutil.virtual_memory().percent
+
+    def max_in_flight(self):
+        """
+        当前允许同时处理的文章数，等于各阶段并发上限之和
+        """
+        return sum(stage['limiter'].limit for stage in self.stages.values())
+
+    def acquire_slot(self, timeout=None):
+        """
+        获取一个文章处理名额，处理中的文章数达到上限或内存占用过高时阻塞
+        Args:
+            timeout: 最长等待时间(秒)，None表示一直等待
+        Returns:
+            获取成功返回True，超时返回False
+        """
+        deadline = None if timeout is None else time.time() + timeout
+        with self.slot_condition:
+            while True:
+                memory_ok = self.in_flight == 0 or self.memory_percent() < self.max_memory_percent
+                if self.in_flight < self.max_in_flight() and memory_ok:
+                    self.in_flight += 1
+                    return True
+                remaining = 5 if deadline is None else min(5, deadline - time.time())
+                if remaining <= 0:
+                    return False
+                # 定时唤醒以重新检查内存占用
+                self.slot_condition.wait(remaining)
+
+    def release_slot(self):
+        """
+        释放一个文章处理名额
+        """
+        with self.slot_condition:
+            self.in_flight -= 1
+            self.slot_condition.notify_all()
+
+    def maybe_adjust(self):
+        """
+        距离上次调整超过调整周期时执行一次调整
+        Returns:
+            执行了调整时返回各阶段决策，否则返回None
+        """
+        if time.time() - self.last_adjust_time < self.adjust_interval:
+            return None
+        return self.adjust()
+
+    def adjust(self):
+        """
+        根据各阶段统计数据执行一次AIMD调整
+        Returns:
+            各阶段决策字典
+        """
+        now = time.time()
+        interval = max(now - self.last_adjust_time, 1e-6)
+        self.last_adjust_time = now
+        memory_high = self.memory_percent() >= self.max_memory_percent
+
+        decisions = {}
+        with self.stats_lock:
+            for name, stage in self.stages.items():
+                limiter = stage['limiter']
+                throughput = stage['completed'] / interval
+                stage['completed'] = 0
+                latency = stage['latency']
+                if latency is not None:
+                    # 基准延迟取观测到的最低值，并缓慢上浮以适应负载变化
+                    baseline = stage['baseline_latency']
+                    stage['baseline_latency'] = latency if baseline is None else min(baseline * 1.05, latency)
+                latency_degraded = (
+                    latency is not None
+                    and latency > stage['baseline_latency'] * self.latency_tolerance
+                    and throughput <= stage['last_throughput']
+                )
+
+                limit = limiter.limit
+                if memory_high:
+                    decision = 'decrease:memory'
+                    limit = max(stage['min'], limit // 2)
+                elif latency_degraded:
+                    decision = 'decrease:latency'
+                    limit = max(stage['min'], limit // 2)
+                elif limiter.waiting > 0 and limit < stage['max']:
+                    decision = 'increase:queued'
+                    limit += 1
+                else:
+                    decision = 'hold'
+                limiter.set_limit(limit)
+                stage['last_throughput'] = throughput
+                stage['decision'] = decision
+                decisions[name] = decision
+
+        with self.slot_condition:
+            self.slot_condition.notify_all()
+        return decisions
+
+    def snapshot(self):
+        """
+        获取各阶段当前状态，用于心跳日志
+        Returns:
+            各阶段并发上限、执行数、排队数、平均延迟和最近一次决策
+        """
+        with self.stats_lock:
+            return {
+                name: {
+                    'limit': stage['limiter'].limit,
+                    'active': stage['limiter'].active,
+                    'queued': stage['limiter'].waiting,
+                    'latency': round(stage['latency'], 3) if stage['latency'] is not None else None,
+                    'throughput': round(stage['last_throughput'], 4),
+                    'decision': stage['decision']
+                }
+                for name, stage in self.stages.items()
+            }
+
+class TopicOutbox:
+    """
+    主题消息发件箱
+    待发送的主题消息先写入本地日志目录，由后台线程分批发送，失败时按指数退避重试，
+    发送成功后删除日志文件；服务重启后继续发送日志目录中未完成的消息。
+    多个进程可以共用同一日志目录，每条消息发送前先改名认领
+    """
+    CLAIM_SUFFIX = '.sending'
+
+    def __init__(self, publish, journal_dir='temp/outbox', batch_size=20, base_backoff=5,
+                 max_backoff=600, max_attempts=50, log=None):
+        """
+        初始化发件箱
+        Args:
+            publish: 发送单条主题消息的函数，参数为消息内容字典
+            journal_dir: 本地日志目录
+            batch_size: 每轮最多发送的消息数
+            base_backoff: 首次重试等待时间(秒)
+            max_backoff: 最长重试等待时间(秒)
+            max_attempts: 最大发送次数，超过后移入failed子目录
+            log: 日志函数，参数与log_remotely相同
+        """
+        self.publish = publish
+        self.journal_dir = journal_dir
+        self.failed_dir = os.path.join(journal_dir, 'failed')
+        self.batch_size = batch_size
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.max_attempts = max_attempts
+        self.log = log or (lambda level, message, extra_fields=None: logger.info(message))
+        self.condition = threading.Condition()
+        self.stopping = False
+        self.thread = None
+        self.sequence = itertools.count()
+        os.makedirs(self.journal_dir, exist_ok=True)
+        self.recover_claims()
+
+    def put(self, message_content):
+        """
+        将主题消息写入日志并通知后台线程发送，不等待发送结果
+        Args:
+            message_content: 消息内容字典
+        """
+        entry = {'content': message_content, 'attempts': 0, 'next_attempt_at': 0}
+        # 文件名以纳秒时间戳和序号开头，保证按写入顺序发送
+        name = f'{time.time_ns():020d}-{next(self.sequence):08d}-{uuid.uuid4().hex}.json'
+        self._write_entry(os.path.join(self.journal_dir, name), entry)
+        with self.condition:
+            self.condition.notify_all()
+
+    def _write_entry(self, path, entry):
+        """
+        原子写入日志文件
+        """
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(entry, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    def pending_count(self):
+        """
+        获取未发送成功的消息数
+        """
+        return len([name for name in os.listdir(self.journal_dir)
+                    if name.endswith('.json') or name.endswith(self.CLAIM_SUFFIX)])
+
+    def start(self):
+        """
+        启动后台发送线程
+        """
+        if self.thread is not None:
+            return
+        self.stopping = False
+        self.thread = threading.Thread(target=self.run, name='topic-outbox', daemon=True)
+        self.thread.start()
+
+    def stop(self, timeout=30):
+        """
+        停止后台发送线程，未发送的消息保留在日志中
+        Args:
+            timeout: 等待线程结束的最长时间(秒)
+        """
+        if self.thread is None:
+            return
+        with self.condition:
+            self.stopping = True
+            self.condition.notify_all()
+        self.thread.join(timeout)
+        self.thread = None
+
+    def run(self):
+        """
+        后台发送循环
+        """
+        while True:
+            next_due = self.flush()
+            with self.condition:
+                if self.stopping:
+                    return
+                wait_time = None if next_due is None else max(0, next_due - time.time())
+                self.condition.wait(wait_time if wait_time is not None else 60)
+
+    def flush(self):
+        """
+        发送一批到期的消息
+        Returns:
+            下一条待重试消息的到期时间，没有待发送消息时返回None
+        """
+        now = time.time()
+        next_due = None
+        sent = 0
+        for name in sorted(os.listdir(self.journal_dir)):
+            if not name.endswith('.json'):
+                continue
+            path = os.path.join(self.journal_dir, name)
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    entry = json.load(f)
+            except Exception as e:
+                self.log("WARNING", f"读取主题消息日志失败: {e}", {"journal_file": name})
+                continue
+
+            if entry['next_attempt_at'] > now:
+                next_due = entry['next_attempt_at'] if next_due is None else min(next_due, entry['next_attempt_at'])
+                continue
+            if sent >= self.batch_size:
+                # 本批已满，立即开始下一批
+                return now
+
+            # 先原子改名认领日志，多个进程共用日志目录时同一条消息只由一个进程发送
+            claimed_path = f'{path}.{os.getpid()}{self.CLAIM_SUFFIX}'
+            try:
+                os.rename(path, claimed_path)
+            except FileNotFoundError:
+                continue
+
+            sent += 1
+            article_id = entry['content'].get('article_id', 'unknown')
+            try:
+                self.publish(entry['content'])
+            except Exception as e:
+                entry['attempts'] += 1
+                if entry['attempts'] >= self.max_attempts:
+                    os.makedirs(self.failed_dir, exist_ok=True)
+                    os.replace(claimed_path, os.path.join(self.failed_dir, name))
+                    self.log("ERROR", f"主题消息多次发送失败，已移入失败目录: {e}", {
+                        "article_id": article_id,
+                        "attempts": entry['attempts']
+                    })
+                    continue
+                backoff = min(self.max_backoff, self.base_backoff * 2 ** (entry['attempts'] - 1))
+                entry['next_attempt_at'] = time.time() + backoff
+                self._write_entry(path, entry)
+                self._remove_claimed(claimed_path)
+                self.log("WARNING", f"主题消息发送失败，{backoff} 秒后重试: {e}", {
+                    "article_id": article_id,
+                    "attempts": entry['attempts']
+                })
+                next_due = entry['next_attempt_at'] if next_due is None else min(next_due, entry['next_attempt_at'])
+                continue
+            # 发送成功后单独删除认领文件，删除失败不会重新写回日志导致重复发送
+            self._remove_claimed(claimed_path)
+        return next_due
+
+    def _remove_claimed(self, claimed_path):
+        """
+        删除已认领的日志文件，文件已不存在时忽略
+        """
+        try:
+            os.remove(claimed_path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            self.log("WARNING", f"删除主题消息日志失败: {e}", {"journal_file": os.path.basename(claimed_path)})
+
+    def recover_claims(self):
+        """
+        将认领进程已退出的日志文件恢复为待发送状态
+        """
+        for name in os.listdir(self.journal_dir):
+            if not name.endswith(self.CLAIM_SUFFIX):
+                continue
+            original, _, pid = name[:-len(self.CLAIM_SUFFIX)].rpartition('.')
+            try:
+                os.kill(int(pid), 0)
+                continue
+            except (ValueError, ProcessLookupError):
+                pass
+            except PermissionError:
+                # 进程存在但属于其他用户
+                continue
+            try:
+                os.rename(os.path.join(self.journal_dir, name), os.path.join(self.journal_dir, original))
+            except FileNotFoundError:
+                pass
+
+class ArticleProfiler:
+    """
+    单篇文章的性能分析器
+    记录各处理阶段和各页码区间的推理耗时，可选采集cProfile调用统计和tracemalloc内存快照
+    """
+    def __init__(self, article_id, use_cprofile=False, pages_per_range=0):
+        """
+        初始化性能分析器
+        Args:
+            article_id: 文章ID
+            use_cprofile: 是否采集cProfile调用统计
+            pages_per_range: 未启用检查点时按该页数分段推理以获得分页耗时，0表示不分段
+        """
+        self.article_id = article_id
+        self.pages_per_range = pages_per_range
+        self.profile = cProfile.Profile() if use_cprofile else None
+        self.stages = []
+        self.pages = []
+        self.status = 'success'
+        self.started_at = None
+        self.elapsed = 0.0
+        self.snapshot = None
+        self.peak_memory = None
+
+    def start(self):
+        """
+        开始分析
+        """
+        self.started_at = time.time()
+        if self.profile is not None:
+            self.profile.enable()
+
+    def stop(self):
+        """
+        结束分析，记录耗时和内存峰值
+        """
+        if self.profile is not None:
+            self.profile.disable()
+        self.elapsed = time.time() - self.started_at
+        if tracemalloc.is_tracing():
+            self.peak_memory = tracemalloc.get_traced_memory()[1]
+
+    def take_snapshot(self):
+        """
+        采集tracemalloc内存快照，快照开销较大，只在确定保存分析结果时调用
+        """
+        if tracemalloc.is_tracing():
+            self.snapshot = tracemalloc.take_snapshot()
+
+    def record_stage(self, name, wait, elapsed):
+        """
+        记录处理阶段耗时
+        Args:
+            name: 阶段名称
+            wait: 等待执行名额的时间(秒)
+            elapsed: 执行时间(秒)
+        """
+        self.stages.append({'stage': name, 'wait': round(wait, 3), 'elapsed': round(elapsed, 3)})
+
+    def record_pages(self, start_page, end_page, elapsed):
+        """
+        记录页码区间的推理耗时
+        Args:
+            start_page: 起始页码（包含）
+            end_page: 结束页码（包含）
+            elapsed: 推理时间(秒)
+        """
+        pages = end_page - start_page + 1
+        self.pages.append({
+            'start_page': start_page,
+            'end_page': end_page,
+            'elapsed': round(elapsed, 3),
+            'seconds_per_page': round(elapsed / pages, 3) if pages > 0 else None
+        })
+
+    def dump(self, output_dir):
+        """
+        保存分析结果
+        Args:
+            output_dir: 输出目录
+        Returns:
+            保存的文件路径列表
+        """
+        os.makedirs(output_dir, exist_ok=True)
+        files = []
+
+        timings_path = os.path.join(output_dir, 'timings.json')
+        with open(timings_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'article_id': self.article_id,
+                'status': self.status,
+                'elapsed': round(self.elapsed, 3),
+                'peak_traced_memory': self.peak_memory,
+                'stages': self.stages,
+                'pages': self.pages
+            }, f, ensure_ascii=False, indent=2)
+        files.append(timings_path)
+
+        if self.profile is not None:
+            pstats_path = os.path.join(output_dir, 'profile.pstats')
+            self.profile.dump_stats(pstats_path)
+            files.append(pstats_path)
+            report = io.StringIO()
+            pstats.Stats(self.profile, stream=report).sort_stats('cumulative').print_stats(50)
+            report_path = os.path.join(output_dir, 'profile.txt')
+            with open(report_path, 'w', encoding='utf-8') as f:
+                f.write(report.getvalue())
+            files.append(report_path)
+
+        if self.snapshot is not None:
+            tracemalloc_path = os.path.join(output_dir, 'tracemalloc.txt')
+            with open(tracemalloc_path, 'w', encoding='utf-8') as f:
+                for stat in self.snapshot.statistics('lineno')[:50]:
+                    f.write(f'{stat}\n')
+            files.append(tracemalloc_path)
+        return files
+
+class StatusRegistry:
+    """
+    处理中文章的状态登记
+    记录每篇处理中文章的阶段、已处理页数和耗时，并统计滑动窗口内的完成数和页数，供状态接口查询
+    """
+    def __init__(self, window=300):
+        """
+        初始化状态登记
+        Args:
+            window: 吞吐量统计的滑动窗口(秒)
+        """
+        self.window = window
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.in_flight = {}
+        self.finished = collections.deque()
+        self.completed = 0
+        self.failed = 0
+        self.created_at = time.time()
+        try:
+            self.process = psutil.Process()
+            # cpu_percent首次调用返回0.0，先调用一次作为后续计算的起点
+            self.process.cpu_percent()
+        except Exception:
+            self.process = None
+
+    @contextlib.contextmanager
+    def track(self, article_id):
+        """
+        在当前线程中登记一篇处理中的文章，处理结束后计入吞吐量统计
+        Args:
+            article_id: 文章ID
+        """
+        now = time.time()
+        record = {
+            'article_id': article_id,
+            'stage': 'started',
+            'waiting': False,
+            'pages_processed': 0,
+            'pages_total': None,
+            'started_at': now,
+            'stage_started_at': now,
+            'last_progress_at': now,
+            'start_rss': self.rss()
+        }
+        with self.lock:
+            self.in_flight[id(record)] = record
+        self.local.record = record
+        succeeded = False
+        try:
+            yield record
+            succeeded = True
+        finally:
+            self.local.record = None
+            finished_at = time.time()
+            with self.lock:
+                del self.in_flight[id(record)]
+                self.finished.append((finished_at, record['pages_processed'], succeeded))
+                if succeeded:
+                    self.completed += 1
+                else:
+                    self.failed += 1
+                self.trim(finished_at)
+
+    def rss(self):
+        """
+        获取进程RSS，状态统计失败不影响文章处理
+        Returns:
+            RSS字节数，获取失败时返回None
+        """
+        try:
+            if self.process is None:
+                self.process = psutil.Process()
+            return self.process.memory_info().rss
+        except Exception:
+            return None
+
+    def current(self):
+        """
+        获取当前线程正在处理的文章的状态记录
+        Returns:
+            状态记录字典，当前线程未登记文章时返回None
+        """
+        return getattr(self.local, 'record', None)
+
+    def set_stage(self, stage, waiting=False):
+        """
+        更新当前文章的处理阶段
+        Args:
+            stage: 阶段名称
+            waiting: 是否正在等待该阶段的执行名额
+        """
+        record = self.current()
+        if record is None:
+            return
+        now = time.time()
+        if record['stage'] != stage:
+            record['stage_started_at'] = now
+        record['stage'] = stage
+        record['waiting'] = waiting
+        record['last_progress_at'] = now
+
+    def set_pages(self, pages_total=None, pages_processed=None, add=0):
+        """
+        更新当前文章的页数进度
+        Args:
+            pages_total: 总页数，为空时不更新
+            pages_processed: 已处理页数，为空时不更新
+            add: 在已处理页数上增加的页数
+        """
+        record = self.current()
+        if record is None:
+            return
+        if pages_total is not None:
+            record['pages_total'] = pages_total
+        if pages_processed is not None:
+            record['pages_processed'] = pages_processed
+        record['pages_processed'] += add
+        record['last_progress_at'] = time.time()
+
+    def trim(self, now):
+        """
+        删除滑动窗口之外的完成记录，调用方需持有锁
+        """
+        while self.finished and self.finished[0][0] < now - self.window:
+            self.finished.popleft()
+
+    def snapshot(self):
+        """
+        获取处理中文章和吞吐量的快照
+        Returns:
+            状态字典，包含process、in_flight和throughput
+        """
+        now = time.time()
+        rss = self.rss()
+        with self.lock:
+            self.trim(now)
+            records = sorted(self.in_flight.values(), key=lambda record: record['started_at'])
+            finished = list(self.finished)
+            completed, failed = self.completed, self.failed
+        in_flight = [{
+            'article_id': record['article_id'],
+            'stage': record['stage'],
+            'waiting': record['waiting'],
+            'pages_processed': record['pages_processed'],
+            'pages_total': record['pages_total'],
+            'elapsed': round(now - record['started_at'], 3),
+            'stage_elapsed': round(now - record['stage_started_at'], 3),
+            'idle_seconds': round(now - record['last_progress_at'], 3),
+            # 同时处理多篇文章时各文章的内存增量相互包含，仅供参考
+            'memory_delta_mb': round((rss - record['start_rss']) / 1024 / 1024, 1)
+            if rss is not None and record['start_rss'] is not None else None
+        } for record in records]
+        # 服务刚启动时按实际运行时间计算速率
+        window = max(min(self.window, now - self.created_at), 1)
+        articles = sum(1 for item in finished if item[2])
+        pages = sum(item[1] for item in finished if item[2])
+        return {
+            'process': {
+                'pid': os.getpid(),
+                'memory_mb': round(rss / 1024 / 1024, 1) if rss is not None else None,
+                'cpu_percent': self.process.cpu_percent() if rss is not None else None
+            },
+            'in_flight': in_flight,
+            'throughput': {
+                'window': self.window,
+                'articles': articles,
+                'failed': len(finished) - articles,
+                'pages': pages,
+                'articles_per_minute': round(articles / window * 60, 3),
+                'pages_per_minute': round(pages / window * 60, 3),
+                'completed_total': completed,
+                'failed_total': failed
+            }
+        }
+
+class PageImageCache:
+    """
+    单文档页面图像缓存
+    页面首次渲染后保存为.npy文件（默认位于/dev/shm），分类、版面分析、OCR及推理服务进程以内存映射方式读取，
+    避免同一页面重复光栅化和复制；文档处理完成后删除。
+    缓存超出容量时删除最早写入的其他文档的页面图像，仍无法写入时不缓存，直接使用渲染结果
+    """
+    def __init__(self, cache_dir=None, max_bytes=0):
+        """
+        初始化页面图像缓存
+        Args:
+            cache_dir: 缓存目录，默认使用/dev/shm/pdf_page_cache，不存在/dev/shm时使用系统临时目录
+            max_bytes: 缓存目录的最大字节数，0表示只受磁盘剩余空间限制
+        """
+        if cache_dir is None:
+            base_dir = '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+            cache_dir = os.path.join(base_dir, 'pdf_page_cache')
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+
+    def page_path(self, key, page_id):
+        """
+        获取页面图像的缓存文件路径
+        Args:
+            key: 文档缓存键（内容哈希）
+            page_id: 页码
+        """
+        return os.path.join(self.cache_dir, key, f'{page_id:06d}.npy')
+
+    def get_image(self, key, page_id, render):
+        """
+        读取页面图像，未缓存时渲染并写入缓存
+        Args:
+            key: 文档缓存键
+            page_id: 页码
+            render: 渲染函数，返回包含img、width和height的字典
+        Returns:
+            包含img、width和height的字典，img为写时复制的内存映射数组
+        """
+        import numpy as np
+
+        path = self.page_path(key, page_id)
+        try:
+            img = np.load(path, mmap_mode='c')
+            return {'img': img, 'width': img.shape[1], 'height': img.shape[0]}
+        except (FileNotFoundError, ValueError):
+            pass
+
+        image = render()
+        if not isinstance(image.get('img'), np.ndarray):
+            return image
+        tmp_path = f'{path}.{uuid.uuid4().hex}.tmp'
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            if not self.reserve(key, image['img'].nbytes):
+                return image
+            with open(tmp_path, 'wb') as f:
+                np.save(f, image['img'])
+            os.replace(tmp_path, path)
+        except OSError:
+            # 缓存空间不足等写入失败不影响处理，直接使用渲染结果
+            with contextlib.suppress(OSError):
+                os.remove(tmp_path)
+        return image
+
+    def reserve(self, key, nbytes):
+        """
+        检查能否再写入nbytes字节，超出缓存容量时按写入时间删除其他文档的页面图像
+        Args:
+            key: 当前文档缓存键，不删除当前文档的页面
+            nbytes: 待写入的字节数
+        Returns:
+            可以写入时返回True
+        """
+        if shutil.disk_usage(self.cache_dir).free < nbytes:
+            return False
+        if not self.max_bytes:
+            return True
+
+        used = 0
+        documents = []
+        for name in os.listdir(self.cache_dir):
+            doc_dir = os.path.join(self.cache_dir, name)
+            size = 0
+            with contextlib.suppress(OSError):
+                with os.scandir(doc_dir) as entries:
+                    size = sum(entry.stat().st_size for entry in entries if entry.is_file())
+            used += size
+            if name != key:
+                with contextlib.suppress(OSError):
+                    documents.append((os.path.getmtime(doc_dir), doc_dir, size))
+        for _, doc_dir, size in sorted(documents):
+            if used + nbytes <= self.max_bytes:
+                break
+            shutil.rmtree(doc_dir, ignore_errors=True)
+            used -= size
+        return used + nbytes <= self.max_bytes
+
+    def wrap(self, dataset, key, page_offset=0):
+        """
+        包装数据集，使其页面图像从缓存读取
+        Args:
+            dataset: PymuDocDataset实例
+            key: 文档缓存键
+            page_offset: 数据集页码相对原文档的偏移（数据集为页码区间截取时使用）
+        Returns:
+            CachedPageDataset实例
+        """
+        return CachedPageDataset(dataset, self, key, page_offset)
+
+    def clear(self, key):
+        """
+        删除文档的全部页面图像
+        Args:
+            key: 文档缓存键
+        """
+        shutil.rmtree(os.path.join(self.cache_dir, key), ignore_errors=True)
+
+class CachedPageDataset:
+    """
+    从页面图像缓存读取页面图像的数据集包装，其余属性和方法转发给原数据集
+    """
+    def __init__(self, dataset, cache, key, page_offset=0):
+        """
+        初始化数据集包装
+        Args:
+            dataset: PymuDocDataset实例
+            cache: PageImageCache实例
+            key: 文档缓存键
+            page_offset: 数据集页码相对原文档的偏移
+        """
+        self.dataset = dataset
+        self.cache = cache
+        self.key = key
+        self.page_offset = page_offset
+
+    def __len__(self):
+        return len(self.dataset)
+
+    def __iter__(self):
+        for page_id in range(len(self)):
+            yield self.get_page(page_id)
+
+    def __getattr__(self, name):
+        return getattr(self.dataset, name)
+
+    def get_page(self, page_id):
+        """
+        获取页面，页面图像从缓存读取
+        Args:
+            page_id: 页码
+        """
+        return CachedPage(self.dataset.get_page(page_id), self.cache, self.key, page_id + self.page_offset)
+
+    def apply(self, proc, *args, **kwargs):
+        """
+        以包装后的数据集调用处理函数，与Dataset.apply相同
+        """
+        return proc(self, *args, **kwargs)
+
+class CachedPage:
+    """
+    从页面图像缓存读取图像的页面包装，其余属性和方法转发给原页面
+    """
+    def __init__(self, page, cache, key, page_id):
+        """
+        初始化页面包装
+        Args:
+            page: 原页面
+            cache: PageImageCache实例
+            key: 文档缓存键
+            page_id: 页面在原文档中的页码
+        """
+        self.page = page
+        self.cache = cache
+        self.key = key
+        self.page_id = page_id
+
+    def __getattr__(self, name):
+        return getattr(self.page, name)
+
+    def get_image(self):
+        """
+        获取页面图像，未缓存时由原页面渲染
+        """
+        return self.cache.get_image(self.key, self.page_id, self.page.get_image)
+
+class InferenceServerError(Exception):
+    """
+    共享推理服务不可用或推理失败
+    """
+
+def analyze_pdf_bytes(pdf_bytes, ocr, start_page_id=0, end_page_id=None, page_cache=None):
+    """
+    对PDF执行版面分析和OCR推理，共享推理服务的默认推理函数
+    Args:
+        pdf_bytes: PDF文件内容
+        ocr: 是否使用OCR模式
+        start_page_id: 起始页码
+        end_page_id: 结束页码（包含），为空时到最后一页
+        page_cache: 客户端的页面图像缓存，包含dir、key和可选的page_offset（pdf_bytes为页码区间截取时的偏移）、
+            max_bytes（缓存容量），为空时不使用缓存
+    Returns:
+        推理结果model_list，范围外的页面为空结果
+    """
+    import_magic_pdf()
+    ds = PymuDocDataset(pdf_bytes)
+    if page_cache:
+        cache = PageImageCache(page_cache['dir'], page_cache.get('max_bytes', 0))
+        ds = cache.wrap(ds, page_cache['key'], page_cache.get('page_offset', 0))
+    infer_result = ds.apply(doc_analyze, ocr=ocr, start_page_id=start_page_id, end_page_id=end_page_id)
+    return infer_result.get_infer_res()
+
+def slice_pdf_pages(pdf_bytes, start_page_id=0, end_page_id=None):
+    """
+    截取PDF的指定页码区间
+    Args:
+        pdf_bytes: PDF文件内容
+        start_page_id: 起始页码
+        end_page_id: 结束页码（包含），为空时到最后一页
+    Returns:
+        (区间PDF内容, 原文档页数, 实际结束页码)，区间覆盖全部页面时返回原内容
+    """
+    import fitz
+
+    doc = fitz.open(stream=pdf_bytes, filetype='pdf')
+    try:
+        page_count = doc.page_count
+        end_page_id = page_count - 1 if end_page_id is None else min(end_page_id, page_count - 1)
+        if start_page_id == 0 and end_page_id == page_count - 1:
+            return pdf_bytes, page_count, end_page_id
+        sub_doc = fitz.open()
+        sub_doc.insert_pdf(doc, from_page=start_page_id, to_page=end_page_id)
+        try:
+            return sub_doc.tobytes(), page_count, end_page_id
+        finally:
+            sub_doc.close()
+    finally:
+        doc.close()
+
+def expand_page_results(page_results, page_count, start_page_id):
+    """
+    将页码区间的推理结果还原为原文档页码，范围外的页面与doc_analyze一样填充空结果
+    Args:
+        page_results: 区间内各页的推理结果
+        page_count: 原文档页数
+        start_page_id: 区间起始页码
+    Returns:
+        原文档全部页面的model_list
+    """
+    model_list = [
+        {'layout_dets': [], 'page_info': {'page_no': page_no, 'width': 0, 'height': 0}}
+        for page_no in range(page_count)
+    ]
+    for offset, page_result in enumerate(page_results):
+        page_result['page_info']['page_no'] = start_page_id + offset
+        model_list[start_page_id + offset] = page_result
+    return model_list
+
+def analyze_pdf_batch(batch):
+    """
+    将多个文档（或页码区间）的页面合并为一批执行推理，共享推理服务的默认批量推理函数
+    magic_pdf不提供batch_doc_analyze时逐个文档推理
+    Args:
+        batch: 推理请求列表，每项包含pdf_bytes、ocr、start_page_id和end_page_id
+    Returns:
+        与请求顺序对应的model_list列表，与analyze_pdf_bytes相同，范围外的页面为空结果
+    """
+    import_magic_pdf()
+    try:
+        from magic_pdf.model.doc_analyze_by_custom_model import batch_doc_analyze
+    except ImportError:
+        return [
+            analyze_pdf_bytes(r['pdf_bytes'], r['ocr'], r.get('start_page_id', 0), r.get('end_page_id'), r.get('page_cache'))
+            for r in batch
+        ]
+
+    results = [None] * len(batch)
+    # batch_doc_analyze的解析方式对整批生效，按OCR模式分组
+    for ocr in (False, True):
+        indexes = [i for i, request in enumerate(batch) if request['ocr'] == ocr]
+        if not indexes:
+            continue
+        datasets = []
+        ranges = []
+        for i in indexes:
+            start_page_id = batch[i].get('start_page_id', 0)
+            pdf_bytes, page_count, end_page_id = slice_pdf_pages(batch[i]['pdf_bytes'], start_page_id, batch[i].get('end_page_id'))
+            ds = PymuDocDataset(pdf_bytes)
+            page_cache = batch[i].get('page_cache')
+            if page_cache:
+                ds = PageImageCache(page_cache['dir'], page_cache.get('max_bytes', 0)).wrap(
+                    ds, page_cache['key'], page_offset=page_cache.get('page_offset', 0) + start_page_id
+                )
+            datasets.append(ds)
+            ranges.append((page_count, start_page_id, end_page_id))
+        infer_results = batch_doc_analyze(datasets, 'ocr' if ocr else 'txt')
+        for i, infer_result, (page_count, start_page_id, end_page_id) in zip(indexes, infer_results, ranges):
+            results[i] = expand_page_results(infer_result.get_infer_res(), page_count, start_page_id)
+    return results
+
+# 共享推理服务的默认socket路径，所在目录权限为0700，只允许服务用户连接
+DEFAULT_INFERENCE_ADDRESS = 'temp/inference/inference.sock'
+
+def resolve_inference_authkey(inference_server_config, create=False):
+    """
+    获取共享推理服务的连接认证密钥
+    未配置authkey时读取authkey_file（默认与socket同目录的authkey文件），
+    推理服务启动时密钥文件不存在则生成随机密钥写入权限为0600的文件
+    Args:
+        inference_server_config: inference_server配置字典
+        create: 密钥文件不存在时是否生成
+    Returns:
+        认证密钥
+    Raises:
+        InferenceServerError: 未配置密钥且密钥文件不存在
+    """
+    if inference_server_config.get('authkey'):
+        return inference_server_config['authkey']
+    path = inference_authkey_file(inference_server_config)
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return f.read().strip()
+    except FileNotFoundError:
+        if not create:
+            raise InferenceServerError(f'未配置共享推理服务认证密钥，密钥文件不存在: {path}')
+    os.makedirs(os.path.dirname(path) or '.', mode=0o700, exist_ok=True)
+    authkey = secrets.token_hex(32)
+    try:
+        fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    except FileExistsError:
+        # 其他进程同时生成了密钥
+        return resolve_inference_authkey(inference_server_config)
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        f.write(authkey)
+    return authkey
+
+def inference_authkey_file(inference_server_config):
+    """
+    获取共享推理服务认证密钥文件路径
+    Args:
+        inference_server_config: inference_server配置字典
+    """
+    address = inference_server_config.get('address', DEFAULT_INFERENCE_ADDRESS)
+    return inference_server_config.get('authkey_file') or os.path.join(os.path.dirname(address), 'authkey')
+
+class InferenceServer:
+    """
+    共享推理服务
+    在单独进程中持有模型，通过Unix socket接收同一节点上多个服务进程的推理请求，
+    由单个推理线程执行；启用微批处理时将短时间内到达的多个文档的页面合并为一批推理，
+    服务进程无需各自加载模型
+    """
+    def __init__(self, address, authkey=None, analyze=None, log=None, batch_size=1, max_wait=0.0,
+                 analyze_batch=None):
+        """
+        初始化共享推理服务
+        Args:
+            address: Unix socket路径
+            authkey: 连接认证密钥，不能为空
+            analyze: 推理函数，参数与analyze_pdf_bytes相同，默认使用analyze_pdf_bytes
+            log: 日志函数，参数与log_remotely相同
+            batch_size: 每批最多合并的页数，为1时不合并
+            max_wait: 凑批时等待后续请求的最长时间(秒)
+            analyze_batch: 批量推理函数，参数与analyze_pdf_batch相同，默认使用analyze_pdf_batch
+        """
+        if not authkey:
+            raise ValueError('共享推理服务必须配置认证密钥')
+        self.address = address
+        self.authkey = authkey.encode()
+        self.analyze = analyze or analyze_pdf_bytes
+        self.analyze_batch = analyze_batch or analyze_pdf_batch
+        self.batch_size = batch_size
+        self.max_wait = max_wait
+        self.log = log or (lambda level, message, extra_fields=None: logger.info(message))
+        self.requests = queue.Queue()
+        self.listener = None
+        self.running = False
+        self.threads = []
+
+    def start(self):
+        """
+        监听Unix socket并启动连接和推理线程，socket位于权限为0700的目录中
+        """
+        socket_dir = os.path.dirname(self.address) or '.'
+        os.makedirs(socket_dir, mode=0o700, exist_ok=True)
+        os.chmod(socket_dir, 0o700)
+        if os.path.exists(self.address):
+            os.unlink(self.address)
+        self.listener = Listener(self.address, family='AF_UNIX', authkey=self.authkey)
+        os.chmod(self.address, 0o600)
+        self.running = True
+        self.threads = [
+            threading.Thread(target=self.accept_loop, name='inference-accept', daemon=True),
+            threading.Thread(target=self.inference_loop, name='inference-worker', daemon=True)
+        ]
+        for thread in self.threads:
+            thread.start()
+        self.log("INFO", f"共享推理服务已启动, 地址: {self.address}", {"address": self.address})
+
+    def stop(self):
+        """
+        停止接收请求并删除socket文件，正在执行的推理在推理线程中完成
+        """
+        if not self.running:
+            return
+        self.running = False
+        self.requests.put(None)
+        self.listener.close()
+        if os.path.exists(self.address):
+            os.unlink(self.address)
+
+    def accept_loop(self):
+        """
+        接收客户端连接，每个连接由单独线程处理
+        """
+        while self.running:
+            try:
+                conn = self.listener.accept()
+            except Exception as e:
+                if self.running:
+                    self.log("WARNING", f"接收推理连接失败: {e}", {"exception_type": type(e).__name__})
+                continue
+            threading.Thread(target=self.handle_connection, args=(conn,), daemon=True).start()
+
+    def handle_connection(self, conn):
+        """
+        读取连接上的请求，提交给推理线程并返回结果
+        Args:
+            conn: multiprocessing Connection
+        """
+        with conn:
+            while True:
+                try:
+                    request = conn.recv()
+                except (EOFError, OSError):
+                    return
+                if request.get('op') == 'ping':
+                    conn.send({'result': 'pong'})
+                    continue
+                future = Future()
+                self.requests.put((request, future))
+                try:
+                    response = {'result': future.result()}
+                except Exception as e:
+                    response = {'error': f'{type(e).__name__}: {e}'}
+                try:
+                    conn.send(response)
+                except (EOFError, OSError):
+                    return
+
+    @staticmethod
+    def request_pages(request):
+        """
+        估算推理请求的页数
+        Args:
+            request: 推理请求字典
+        Returns:
+            页数
+        """
+        start_page_id = request.get('start_page_id', 0)
+        if request.get('end_page_id') is not None:
+            return request['end_page_id'] - start_page_id + 1
+        return max((request.get('page_count') or 1) - start_page_id, 1)
+
+    def inference_loop(self):
+        """
+        收集推理请求凑成一批后执行，达到batch_size页或等待超过max_wait秒即开始推理，
+        模型只在该线程中使用
+        """
+        while True:
+            item = self.requests.get()
+            if item is None:
+                return
+            batch = [item]
+            pages = self.request_pages(item[0])
+            deadline = time.time() + self.max_wait
+            while pages < self.batch_size:
+                timeout = deadline - time.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = self.requests.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if item is None:
+                    # 处理完当前批次后退出
+                    self.requests.put(None)
+                    break
+                batch.append(item)
+                pages += self.request_pages(item[0])
+            self.run_batch(batch, pages)
+
+    def run_batch(self, batch, pages):
+        """
+        执行一批推理请求并返回各请求的结果，批量推理失败时逐个请求重试，避免单个文档影响同批其他文档
+        Args:
+            batch: (推理请求, Future)列表
+            pages: 本批页数
+        """
+        started_at = time.time()
+        if len(batch) > 1:
+            try:
+                results = self.analyze_batch([request for request, _ in batch])
+            except Exception as e:
+                self.log("WARNING", f"批量推理失败，逐个文档重试: {e}", {
+                    "exception_type": type(e).__name__,
+                    "batch_documents": len(batch)
+                })
+            else:
+                for (_, future), result in zip(batch, results):
+                    future.set_result(result)
+                self.log("INFO", f"共享推理服务完成批量推理, 文档数: {len(batch)}, 页数: {pages}, 耗时: {time.time() - started_at:.2f}秒", {
+                    "batch_documents": len(batch),
+                    "batch_pages": pages,
+                    "elapsed": time.time() - started_at
+                })
+                return
+
+        for request, future in batch:
+            started_at = time.time()
+            try:
+                future.set_result(self.analyze(
+                    request['pdf_bytes'],
+                    request['ocr'],
+                    request.get('start_page_id', 0),
+                    request.get('end_page_id'),
+                    request.get('page_cache')
+                ))
+            except Exception as e:
+                self.log("ERROR", f"共享推理服务推理失败: {e}", {
+                    "exception_type": type(e).__name__,
+                    "exc_info": True
+                })
+                future.set_exception(e)
+                continue
+            self.log("INFO", f"共享推理服务完成推理, 耗时: {time.time() - started_at:.2f}秒", {
+                "ocr": request['ocr'],
+                "start_page_id": request.get('start_page_id', 0),
+                "end_page_id": request.get('end_page_id'),
+                "elapsed": time.time() - started_at
+            })
+
+class InferenceClient:
+    """
+    共享推理服务客户端，每次请求建立一个Unix socket连接
+    """
+    def __init__(self, address, authkey=None, timeout=1800, authkey_file=None):
+        """
+        初始化推理服务客户端
+        Args:
+            address: Unix socket路径
+            authkey: 连接认证密钥，与服务端一致
+            timeout: 等待推理结果的最长时间(秒)
+            authkey_file: 未配置authkey时读取的密钥文件，推理服务启动时生成
+        """
+        self.address = address
+        self.authkey = authkey.encode() if authkey else None
+        self.authkey_file = authkey_file
+        self.timeout = timeout
+
+    def load_authkey(self):
+        """
+        获取认证密钥，未配置时从密钥文件读取
+        Returns:
+            认证密钥
+        Raises:
+            InferenceServerError: 没有可用的认证密钥
+        """
+        if self.authkey is None and self.authkey_file:
+            try:
+                with open(self.authkey_file, 'r', encoding='utf-8') as f:
+                    self.authkey = f.read().strip().encode() or None
+            except OSError as e:
+                raise InferenceServerError(f'读取共享推理服务认证密钥失败: {e}') from e
+        if self.authkey is None:
+            raise InferenceServerError('未配置共享推理服务认证密钥')
+        return self.authkey
+
+    def request(self, payload):
+        """
+        发送请求并等待结果
+        Args:
+            payload: 请求字典
+        Returns:
+            推理服务返回的结果
+        """
+        authkey = self.load_authkey()
+        try:
+            conn = Client(self.address, family='AF_UNIX', authkey=authkey)
+        except (OSError, AuthenticationError) as e:
+            raise InferenceServerError(f'连接共享推理服务失败: {e}') from e
+        with conn:
+            conn.send(payload)
+            if not conn.poll(self.timeout):
+                raise InferenceServerError(f'共享推理服务超过{self.timeout}秒未返回结果')
+            response = conn.recv()
+        if 'error' in response:
+            raise InferenceServerError(response['error'])
+        return response['result']
+
+    def ping(self):
+        """
+        检查推理服务是否可用
+        Returns:
+            可用时返回True
+        """
+        try:
+            return self.request({'op': 'ping'}) == 'pong'
+        except InferenceServerError:
+            return False
+
+    def analyze(self, pdf_bytes, ocr, start_page_id=0, end_page_id=None, page_count=None, page_cache=None):
+        """
+        请求推理服务对PDF执行推理
+        Args:
+            pdf_bytes: PDF文件内容
+            ocr: 是否使用OCR模式
+            start_page_id: 起始页码
+            end_page_id: 结束页码（包含），为空时到最后一页
+            page_count: 文档页数，供推理服务凑批时估算页数
+            page_cache: 页面图像缓存，包含dir和key，推理服务与本进程共用已渲染的页面
+        Returns:
+            推理结果model_list
+        """
+        return self.request({
+            'op': 'analyze',
+            'pdf_bytes': pdf_bytes,
+            'ocr': ocr,
+            'start_page_id': start_page_id,
+            'end_page_id': end_page_id,
+            'page_count': page_count,
+            'page_cache': page_cache
+        })
+
+class ProcessingError(Exception):
+    """
+    文章处理失败的基类，子类决定失败消息的处理策略
+    """
+
+class PermanentInputError(ProcessingError):
+    """
+    输入本身无法处理（消息格式错误、PDF不存在或损坏等），重试无意义，直接转入死信
+    """
+
+class InvalidMessageError(PermanentInputError, KeyError):
+    """
+    消息缺少必要字段，同时是KeyError，与原有的字段缺失异常保持兼容
+    """
+
+class TransientIOError(ProcessingError):
+    """
+    下载、上传或消息服务的临时故障，先在失败的阶段内重试，仍失败时延迟重试整条消息
+    """
+
+class EngineError(ProcessingError):
+    """
+    模型推理或解析失败，按退避时间延迟重试整条消息
+    """
+
+class ArticleInProgressError(TransientIOError):
+    """
+    同一文章正在由MNS消费循环或批量提交接口处理，稍后重试，避免两次处理共用临时文件
+    """
+
+def classify_error(error):
+    """
+    将异常归类为PermanentInputError、TransientIOError或EngineError
+    Args:
+        error: 异常对象
+    Returns:
+        异常类别（ProcessingError的子类）
+    """
+    for category in (PermanentInputError, TransientIOError, EngineError):
+        if isinstance(error, category):
+            return category
+    if isinstance(error, requests.HTTPError) and error.response is not None:
+        status = error.response.status_code
+        if status >= 500 or status in (408, 429):
+            return TransientIOError
+        return PermanentInputError
+    if isinstance(error, (requests.ConnectionError, requests.Timeout, ConnectionError, TimeoutError)):
+        return TransientIOError
+    if isinstance(error, json.JSONDecodeError):
+        return PermanentInputError
+    # OSS和MNS的错误多为网络或服务端故障，权限等配置错误也不应让消息转入死信
+    if type(error).__module__.split('.')[0] in ('oss2', 'mns'):
+        return TransientIOError
+    return EngineError
+
+class PDFRejectedError(PermanentInputError):
+    """
+    PDF未通过预检，不应进入转换流程（损坏、加密、空文档或超出大小限制）
+    """
+    def __init__(self, reason, report=None):
+        """
+        初始化预检拒绝异常
+        Args:
+            reason: 拒绝原因
+            report: 预检报告字典
+        """
+        super().__init__(reason)
+        self.reason = reason
+        self.report = report or {}
+
+class NullDataWriter:
+    """
+    丢弃写入内容的writer，未请求图片产物时代替图片输出writer
+    """
+    def write(self, path, data):
+        """
+        丢弃写入的字节内容
+        """
 
-# 配置日志
-logger = logging.getLogger('pdf_service')
-logger.setLevel(logging.INFO)
+    def write_string(self, path, data):
+        """
+        丢弃写入的文本内容
+        """
+
+# 可按消息选择的输出产物
+OUTPUT_ARTIFACTS = ('markdown', 'middle_json', 'content_list', 'images')
+
+def resolve_outputs(outputs):
+    """
+    校验输出产物列表
+    Args:
+        outputs: 输出产物名称列表，取值见OUTPUT_ARTIFACTS
+    Returns:
+        输出产物名称的frozenset
+    """
+    unknown = set(outputs) - set(OUTPUT_ARTIFACTS)
+    if unknown:
+        raise ValueError(f"未知的输出产物: {sorted(unknown)}, 可选值: {list(OUTPUT_ARTIFACTS)}")
+    if not outputs:
+        raise ValueError("输出产物列表不能为空")
+    return frozenset(outputs)
+
+# markdown中的图片链接，magic_pdf输出的图片和表格截图均为该格式
+IMAGE_LINK_PATTERN = re.compile(r'!\[[^\]]*\]\([^)]*\)')
+
+def strip_image_links(markdown):
+    """
+    删除markdown中的图片链接，未请求图片产物时图片不会写出和上传
+    Args:
+        markdown: markdown文本
+    Returns:
+        删除图片链接后的markdown文本
+    """
+    markdown = IMAGE_LINK_PATTERN.sub('', markdown)
+    return re.sub(r'\n{3,}', '\n\n', markdown).strip() + '\n'
+
+# 可按消息选择的解析模式
+PARSE_MODES = ('full', 'fast', 'auto')
+
+def resolve_mode(mode):
+    """
+    校验解析模式
+    Args:
+        mode: 解析模式，取值见PARSE_MODES
+    Returns:
+        解析模式
+    """
+    if mode not in PARSE_MODES:
+        raise ValueError(f"未知的解析模式: {mode}, 可选值: {list(PARSE_MODES)}")
+    return mode
+
+def inspect_pdf(pdf_path, sample_pages=20, min_text_chars=50):
+    """
+    使用PyMuPDF快速检查PDF，不做渲染和模型推理
+    Args:
+        pdf_path: PDF文件路径
+        sample_pages: 抽样检查的页数
+        min_text_chars: 页面文字数不少于该值时视为有文字层
+    Returns:
+        预检报告字典，包含页数、文件大小、是否加密、是否损坏、文字层覆盖率和图片面积占比
+    """
+    import fitz
+
+    report = {
+        'file_size': os.path.getsize(pdf_path),
+        'page_count': 0,
+        'encrypted': False,
+        'corrupt': False,
+        'error': '',
+        'text_coverage': 0.0,
+        'image_coverage': 0.0
+    }
+    try:
+        doc = fitz.open(pdf_path, filetype='pdf')
+    except Exception as e:
+        report['corrupt'] = True
+        report['error'] = str(e)
+        return report
+
+    try:
+        # 只有所有者密码的PDF可以用空密码打开，不视为加密
+        if doc.needs_pass and not doc.authenticate(''):
+            report['encrypted'] = True
+            return report
+        report['page_count'] = doc.page_count
+        if doc.page_count == 0:
+            return report
+
+        # 均匀抽样页面
+        step = max(1, doc.page_count // sample_pages)
+        page_indexes = list(range(0, doc.page_count, step))[:sample_pages]
+        text_pages = 0
+        image_coverage = 0.0
+        for index in page_indexes:
+            page = doc[index]
+            if len(page.get_text('text').strip()) >= min_text_chars:
+                text_pages += 1
+            page_area = abs(page.rect) or 1
+            image_area = sum(abs(fitz.Rect(info['bbox']) & page.rect) for info in page.get_image_info())
+            image_coverage += min(1.0, image_area / page_area)
+        report['text_coverage'] = round(text_pages / len(page_indexes), 3)
+        report['image_coverage'] = round(image_coverage / len(page_indexes), 3)
+    except Exception as e:
+        report['corrupt'] = True
+        report['error'] = str(e)
+    finally:
+        doc.close()
+    return report
+
+def route_pdf(report, preflight_config, allow_oversize=False):
+    """
+    根据预检报告确定处理路径
+    Args:
+        report: inspect_pdf返回的预检报告
+        preflight_config: preflight配置字典
+        allow_oversize: 是否允许处理超大文档（已转发到超大文档队列的消息）
+    Returns:
+        (处理路径, 原因)，处理路径为reject、oversize、txt或ocr
+    """
+    if report['corrupt']:
+        return 'reject', f"PDF文件损坏: {report['error']}"
+    if report['encrypted']:
+        return 'reject', 'PDF文件已加密'
+    if report['page_count'] == 0:
+        return 'reject', 'PDF文件没有页面'
+
+    max_pages = preflight_config.get('max_pages', 1000)
+    max_file_size = preflight_config.get('max_file_size_mb', 200) * 1024 * 1024
+    if not allow_oversize and (report['page_count'] > max_pages or report['file_size'] > max_file_size):
+        reason = f"PDF文件超出限制: {report['page_count']} 页, {report['file_size'] / 1024 / 1024:.1f} MB"
+        if preflight_config.get('oversize_queue'):
+            return 'oversize', reason
+        return 'reject', reason
+
+    if (report['text_coverage'] >= preflight_config.get('text_coverage_threshold', 0.8)
+            and report['image_coverage'] < preflight_config.get('image_coverage_threshold', 0.5)):
+        return 'txt', '文字层完整'
+    return 'ocr', '文字层缺失或以图片为主'
+
+def extract_pdf_fast(pdf_path, image_dir, min_image_size=32, extract_images=True):
+    """
+    只使用PyMuPDF提取PDF的文字、标题和内嵌图片，不调用版面分析等模型
+    适用于单栏、有完整文字层的PDF，输出结构与magic_pdf的markdown、content_list和middle_json保持一致
+    Args:
+        pdf_path: PDF文件路径
+        image_dir: 图片输出目录，同时作为markdown中图片链接的前缀
+        min_image_size: 宽或高小于该像素数的图片视为装饰图片，不输出
+        extract_images: 是否提取图片，未请求图片产物时不提取，输出中不包含图片
+    Returns:
+        (markdown文本, content_list列表, middle_json字典, 页数)
+    """
+    import fitz
+
+    if extract_images:
+        os.makedirs(image_dir, exist_ok=True)
+    image_prefix = image_dir.rstrip('/')
+    doc = fitz.open(pdf_path, filetype='pdf')
+    try:
+        # 按文字长度加权统计正文字号，用于判断标题级别
+        size_weights = {}
+        pages = []
+        for page in doc:
+            blocks = page.get_text('dict', sort=True)['blocks']
+            pages.append(blocks)
+            for block in blocks:
+                for line in block.get('lines', []):
+                    for span in line['spans']:
+                        size = round(span['size'] * 2) / 2
+                        size_weights[size] = size_weights.get(size, 0) + len(span['text'].strip())
+        body_size = max(size_weights, key=size_weights.get) if size_weights else 0
+
+        markdown_parts = []
+        content_list = []
+        pdf_info = []
+        saved_images = {}
+        for page_idx, blocks in enumerate(pages):
+            page = doc[page_idx]
+            items = []
+            for block in blocks:
+                if block['type'] != 0:
+                    continue
+                lines = [''.join(span['text'] for span in line['spans']).strip() for line in block['lines']]
+                text = ' '.join(line for line in lines if line)
+                if not text:
+                    continue
+                size = max(span['size'] for line in block['lines'] for span in line['spans'])
+                level = 0
+                if body_size and len(text) <= 200:
+                    if size >= body_size * 1.6:
+                        level = 1
+                    elif size >= body_size * 1.2:
+                        level = 2
+                items.append({'type': 'title' if level else 'text', 'bbox': list(block['bbox']),
+                              'text': text, 'level': level})
+
+            for info in page.get_image_info(xrefs=True) if extract_images else []:
+                xref = info.get('xref', 0)
+                if not xref or info['width'] < min_image_size or info['height'] < min_image_size:
+                    continue
+                if xref not in saved_images:
+                    image = doc.extract_image(xref)
+                    data, ext = image['image'], image['ext']
+                    if ext not in ('png', 'jpg', 'jpeg'):
+                        # jpx、jb2等原生格式上传时不支持，转换为PNG
+                        pixmap = fitz.Pixmap(doc, xref)
+                        if pixmap.colorspace is not None and pixmap.colorspace.n > 3:
+                            pixmap = fitz.Pixmap(fitz.csRGB, pixmap)
+                        data, ext = pixmap.tobytes('png'), 'png'
+                    name = f"{hashlib.sha256(data).hexdigest()}.{ext}"
+                    with open(os.path.join(image_dir, name), 'wb') as f:
+                        f.write(data)
+                    saved_images[xref] = name
+                items.append({'type': 'image', 'bbox': list(info['bbox']),
+                              'image_path': saved_images[xref]})
 
-# 创建处理器
-file_handler = logging.FileHandler(filename='logs/pdf_service.log')
-stdout_handler = logging.StreamHandler(stream=sys.stdout)
+            # 按阅读顺序（自上而下、自左而右）合并文字和图片
+            items.sort(key=lambda item: (round(item['bbox'][1]), item['bbox'][0]))
+            for item in items:
+                if item['type'] == 'image':
+                    markdown_parts.append(f"![]({image_prefix}/{item['image_path']})")
+                    content_list.append({
+                        'type': 'image',
+                        'img_path': f"{image_prefix}/{item['image_path']}",
+                        'img_caption': [],
+                        'img_footnote': [],
+                        'page_idx': page_idx
+                    })
+                elif item['level']:
+                    markdown_parts.append(f"{'#' * item['level']} {item['text']}")
+                    content_list.append({
+                        'type': 'text',
+                        'text': item['text'],
+                        'text_level': item['level'],
+                        'page_idx': page_idx
+                    })
+                else:
+                    markdown_parts.append(item['text'])
+                    content_list.append({'type': 'text', 'text': item['text'], 'page_idx': page_idx})
+            pdf_info.append({
+                'page_idx': page_idx,
+                'page_size': [page.rect.width, page.rect.height],
+                'para_blocks': items
+            })
+
+        middle_json = {
+            'pdf_info': pdf_info,
+            '_parse_type': 'fast',
+            '_version_name': f'pymupdf-{fitz.VersionBind}'
+        }
+        return '\n\n'.join(markdown_parts) + '\n', content_list, middle_json, doc.page_count
+    finally:
+        doc.close()
+
+def choose_fast_path(report, fast_path_config):
+    """
+    根据预检报告判断是否适合走快速路径
+    Args:
+        report: inspect_pdf返回的预检报告
+        fast_path_config: fast_path配置字典
+    Returns:
+        适合走快速路径时返回True
+    """
+    return (
+        not report['corrupt']
+        and not report['encrypted']
+        and 0 < report['page_count'] <= fast_path_config.get('auto_max_pages', 50)
+        and report['text_coverage'] >= fast_path_config.get('auto_min_text_coverage', 0.95)
+        and report['image_coverage'] <= fast_path_config.get('auto_max_image_coverage', 0.1)
+    )
 
-# 设置日志格式
-formatter = logging.Formatter('%(asctime)s [%(filename)s:%(lineno)s] [%(levelname)s] %(message)s')
-file_handler.setFormatter(formatter)
-stdout_handler.setFormatter(formatter)
+def engine_version(mode):
+    """
+    获取解析引擎版本，用于输出清单和重新处理时的比较
+    Args:
+        mode: 解析模式，fast为PyMuPDF快速路径，其他为magic-pdf完整流程
+    Returns:
+        引擎版本字符串
+    """
+    if mode == 'fast':
+        import fitz
+        return f'pymupdf-{fitz.VersionBind}'
+    try:
+        return f"magic-pdf-{importlib.metadata.version('magic-pdf')}"
+    except importlib.metadata.PackageNotFoundError:
+        return 'magic-pdf-unknown'
 
-# 添加处理器
-logger.addHandler(file_handler)
-logger.addHandler(stdout_handler)
+def plan_reprocess(manifest, input_hash, pipeline_version, layout_version, outputs, affected_parse_methods=None):
+    """
+    根据已有的输出清单判断文档是否需要重新转换
+    Args:
+        manifest: 上次转换写出的输出清单，不存在时为None
+        input_hash: 当前PDF文件的sha256
+        pipeline_version: 当前引擎版本
+        layout_version: 当前版面模型版本，为空时不复用缓存的版面结果
+        outputs: 本次请求的输出产物
+        affected_parse_methods: 受本次升级影响的解析方式列表，为None时视为全部受影响
+    Returns:
+        (处理方式, 原因)，处理方式为skip（保留已有结果）、reparse（复用缓存的版面结果重新解析）或full（完整转换）
+    """
+    if manifest is None:
+        return 'full', '没有输出清单'
+    if manifest.get('input_hash') != input_hash:
+        return 'full', '输入文件已变化'
+    if not set(outputs) <= set(manifest.get('outputs', [])):
+        return 'full', '请求了新的输出产物'
+    if manifest.get('pipeline_version') == pipeline_version:
+        return 'skip', '引擎版本未变化'
+    if affected_parse_methods is not None and manifest.get('parse_method') not in affected_parse_methods:
+        return 'skip', f"本次升级不影响{manifest.get('parse_method')}解析方式"
+    if layout_version and manifest.get('layout_cached') and manifest.get('layout_version') == layout_version:
+        return 'reparse', '版面模型未变化，复用缓存的版面结果'
+    return 'full', '引擎版本已变化'
 
 class PDFProcessService:
     """
     PDF处理服务类
     处理从MNS接收的消息，将PDF转换为Markdown并上传到OSS
     """
-    def __init__(self, config_path, wait_seconds=30, max_runtime=3600*6, log_heartbeat_period=300):
+    def __init__(self, config_path, wait_seconds=30, max_runtime=3600*6, log_heartbeat_period=300, connect_mns=True):
         """
         初始化服务
         Args:
             config_path: 配置文件路径
+            connect_mns: 是否初始化MNS队列和主题（本地批量转换时不需要）
         """
+        setup_logging()
+
         # 加载配置
         with open(config_path, 'r') as f:
             self.config = yaml.safe_load(f)
@@ -66,6 +2710,7 @@ class PDFProcessService:
         self.last_heartbeat_time = 0  # 记录上次心跳时间
         if self.cloud_log_enabled:
             try:
+                import_sls()
                 self.log_client = LogClient(
                     endpoint=self.config['sls']['endpoint'],
                     accessKeyId=self.config['sls']['access_id'],
@@ -82,17 +2727,33 @@ class PDFProcessService:
             self.cloud_log_enabled = False
             
         # 初始化MNS客户端
-        self.mns_account = Account(
-            self.config['mns']['endpoint'],
-            self.config['mns']['access_id'],
-            self.config['mns']['access_key']
-        )
-        self.queue = self.mns_account.get_queue(self.config['mns']['queue_name'])
-        
-        # 初始化主题服务
-        if 'topic' in self.config['mns']:
-            self.topic = self.mns_account.get_topic(self.config['mns']['topic']['topic_name'])
-            logger.info(f"已初始化主题服务: {self.config['mns']['topic']['topic_name']}")
+        if connect_mns:
+            import_mns()
+            self.mns_account = Account(
+                self.config['mns']['endpoint'],
+                self.config['mns']['access_id'],
+                self.config['mns']['access_key']
+            )
+            self.queue = self.mns_account.get_queue(self.config['mns']['queue_name'])
+            
+            # 初始化主题服务
+            if 'topic' in self.config['mns']:
+                self.topic = self.mns_account.get_topic(self.config['mns']['topic']['topic_name'])
+                logger.info(f"已初始化主题服务: {self.config['mns']['topic']['topic_name']}")
+
+        # 初始化主题消息发件箱，主题消息异步发送，发送失败不影响文章处理结果
+        self.topic_outbox = None
+        outbox_config = self.config.get('mns', {}).get('topic', {}).get('outbox', {})
+        if hasattr(self, 'topic') and outbox_config.get('enabled', True):
+            self.topic_outbox = TopicOutbox(
+                self.send_topic_message,
+                journal_dir=outbox_config.get('journal_dir', 'temp/outbox'),
+                batch_size=outbox_config.get('batch_size', 20),
+                base_backoff=outbox_config.get('base_backoff', 5),
+                max_backoff=outbox_config.get('max_backoff', 600),
+                max_attempts=outbox_config.get('max_attempts', 50),
+                log=self.log_remotely
+            )
         
         # 初始化OSS客户端
         self.oss_auth = oss2.Auth(
@@ -118,6 +2779,144 @@ class PDFProcessService:
         # 初始化通知配置
         self.notice_hook_url = self.config.get('notice', {}).get('corp_wechat_hook_url', '')
 
+        # 模型推理锁，MNS消费循环和批量提交接口共用同一套模型（未启用自适应并发时使用）
+        self.inference_lock = threading.Lock()
+
+        # 初始化页面图像缓存，同一文档的页面只渲染一次
+        page_cache_config = self.config.get('page_cache', {})
+        self.page_cache = None
+        if page_cache_config.get('enabled', False):
+            self.page_cache = PageImageCache(
+                page_cache_config.get('dir'),
+                page_cache_config.get('max_size_mb', 2048) * 1024 * 1024
+            )
+
+        # 初始化共享推理服务客户端，启用后模型推理由共享推理服务进程执行
+        inference_server_config = self.config.get('inference_server', {})
+        self.inference_client = None
+        if inference_server_config.get('enabled', False):
+            self.inference_client = InferenceClient(
+                inference_server_config.get('address', DEFAULT_INFERENCE_ADDRESS),
+                inference_server_config.get('authkey'),
+                inference_server_config.get('timeout', 1800),
+                authkey_file=inference_authkey_file(inference_server_config)
+            )
+
+        # 初始化批量提交接口
+        api_config = self.config.get('api', {})
+        self.api_enabled = api_config.get('enabled', False)
+        self.api_host = api_config.get('host', '127.0.0.1')
+        self.api_port = api_config.get('port', 8090)
+        self.api_workers = api_config.get('workers', 1)
+        self.api_submit_timeout = api_config.get('submit_timeout', 300)
+        # 待处理任务队列有界，队列满时提交请求阻塞，实现背压
+        self.api_job_queue = queue.Queue(maxsize=api_config.get('max_pending', 64))
+        self.api_server = None
+        self.api_worker_threads = []
+        self.api_stopping = threading.Event()
+
+        # 处理中的文章ID，同一文章同时只处理一次
+        self.processing_articles = set()
+        self.processing_lock = threading.Lock()
+
+        # 初始化自适应并发控制
+        concurrency_config = self.config.get('concurrency', {})
+        self.concurrency_enabled = concurrency_config.get('enabled', False)
+        self.inference_thread_safe = concurrency_config.get('inference_thread_safe', False)
+        self.concurrency = None
+        self.executor = None
+        if self.concurrency_enabled:
+            self.concurrency = AdaptiveConcurrencyController(concurrency_config)
+            max_workers = sum(stage['max'] for stage in self.concurrency.stages.values())
+            self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='pdf-worker')
+
+        # 初始化性能分析
+        self.profiling_config = self.config.get('profiling', {})
+        self.profiling_enabled = self.profiling_config.get('enabled', False)
+        self.profile_local = threading.local()
+        self.stage_local = threading.local()
+        self.profile_lock = threading.Lock()
+        self.slowest_profiles = []
+        if self.profiling_enabled and self.profiling_config.get('tracemalloc', False):
+            tracemalloc.start(self.profiling_config.get('tracemalloc_frames', 10))
+
+        # 初始化处理状态登记，供状态接口查询处理中文章、吞吐量和队列积压
+        status_config = self.config.get('status', {})
+        self.status = StatusRegistry(window=status_config.get('window', 300))
+        self.backlog_ttl = status_config.get('backlog_ttl', 30)
+        self.progress_pages = status_config.get('progress_pages', 50)
+        self.status_enabled = status_config.get('enabled', False)
+        self.status_host = status_config.get('host', '127.0.0.1')
+        self.status_port = status_config.get('port', 8091)
+        self.status_server = None
+        self.backlog_cache = None
+        self.backlog_lock = threading.Lock()
+
+        # 初始化PDF预检
+        self.preflight_config = self.config.get('preflight', {})
+        self.preflight_enabled = self.preflight_config.get('enabled', False)
+
+        # 初始化快速解析路径
+        self.fast_path_config = self.config.get('fast_path', {})
+        resolve_mode(self.fast_path_config.get('default_mode', 'full'))
+
+        # 初始化默认输出产物，消息中的outputs字段优先
+        self.default_outputs = resolve_outputs(self.config.get('outputs', {}).get('default', OUTPUT_ARTIFACTS))
+
+        # 初始化重新处理配置
+        self.reprocess_config = self.config.get('reprocess', {})
+        self.cache_layout = self.reprocess_config.get('cache_layout', False)
+
+        # 初始化失败重试策略
+        self.retry_config = self.config.get('retry', {})
+        self.max_dequeue_count = self.retry_config.get('max_dequeue_count', 3)
+
+        # 初始化相同PDF的转换去重
+        self.dedupe_config = self.config.get('dedupe', {})
+        self.single_flight = None
+        if self.dedupe_config.get('enabled', False):
+            self.single_flight = SingleFlight(
+                backend=self.dedupe_config.get('backend', 'local'),
+                local_dir=self.dedupe_config.get('local_dir', 'temp/dedupe'),
+                bucket=self.bucket,
+                oss_prefix=self.dedupe_config.get('oss_prefix', 'dedupe'),
+                lock_ttl=self.dedupe_config.get('lock_ttl', 3600),
+                result_ttl=self.dedupe_config.get('result_ttl', 3600)
+            )
+
+        # 初始化推理检查点
+        checkpoint_config = self.config.get('checkpoint', {})
+        self.checkpoint_enabled = checkpoint_config.get('enabled', False)
+        self.checkpoint_pages = checkpoint_config.get('pages_per_range', 50)
+        if self.checkpoint_enabled:
+            self.checkpoint_store = CheckpointStore(
+                backend=checkpoint_config.get('backend', 'local'),
+                local_dir=checkpoint_config.get('local_dir', 'temp/checkpoints'),
+                bucket=self.bucket,
+                oss_prefix=checkpoint_config.get('oss_prefix', 'checkpoints')
+            )
+
+        # 初始化多节点协同处理，超大文档按检查点区间拆分为子任务，由各节点认领推理
+        self.distributed_config = self.config.get('distributed', {})
+        self.subtask_queue = None
+        self.node_id = f'{socket.gethostname()}:{os.getpid()}'
+        self.subtask_stop = threading.Event()
+        self.subtask_thread = None
+        if self.distributed_config.get('enabled', False):
+            if not self.checkpoint_enabled:
+                raise ValueError("启用多节点协同处理时必须启用推理检查点")
+            backend = self.distributed_config.get('backend', 'mns')
+            mns_queue = None
+            if backend == 'mns':
+                import_mns()
+                mns_queue = self.mns_account.get_queue(self.distributed_config['queue_name'])
+            self.subtask_queue = PageRangeQueue(
+                backend=backend,
+                local_dir=self.distributed_config.get('local_dir', 'temp/subtasks'),
+                mns_queue=mns_queue,
+                poll_interval=self.distributed_config.get('poll_interval', 5)
+            )
+
     def log_remotely(self, level, message, extra_fields=None):
         """
         发送日志到阿里云日志服务
@@ -169,26 +2968,44 @@ class PDFProcessService:
         启动服务，开始监听消息队列
         """
         self.log_remotely("INFO", "PDF处理服务已启动")
+        if self.topic_outbox is not None:
+            self.topic_outbox.start()
+        if self.api_enabled:
+            self.start_api_server()
+        if self.status_enabled:
+            self.start_status_server()
+        if self.subtask_queue is not None:
+            self.subtask_thread = threading.Thread(target=self.subtask_loop, name='pdf-subtasks', daemon=True)
+            self.subtask_thread.start()
         
         while time.time() - self.start_time < self.max_runtime:
+            slot_acquired = False
             try:
                 # 检查心跳
                 self.log_heartbeat()
+
+                # 并发模式下先调整并发数并等待空闲名额，再接收消息
+                if self.concurrency_enabled:
+                    decisions = self.concurrency.maybe_adjust()
+                    if decisions and any(d != 'hold' for d in decisions.values()):
+                        self.log_remotely("INFO", f"调整并发数: {self.concurrency.snapshot()}")
+                    if not self.concurrency.acquire_slot(timeout=self.wait_seconds):
+                        continue
+                    slot_acquired = True
                 
                 # 接收消息
                 message = self.queue.receive_message(wait_seconds=self.wait_seconds)
-                if message.dequeue_count >= 3:
-                    self.log_remotely("INFO", f"消息 {message.message_id} 已重试3次，跳过处理")
-                    self.notice_manager(message)
-                    self.queue.delete_message(message.receipt_handle)
+                if message.dequeue_count >= self.max_dequeue_count:
+                    self.log_remotely("INFO", f"消息 {message.message_id} 已重试{self.max_dequeue_count}次，跳过处理")
+                    self.dead_letter(message)
                     continue
                 
-                # 处理消息
-                self.process_message(message)
-                
-                # 删除已处理的消息
-                self.log_remotely("INFO", f"删除已处理的消息 {message.message_id}")
-                self.queue.delete_message(message.receipt_handle)
+                if self.concurrency_enabled:
+                    self.executor.submit(self.handle_dispatched_message, message)
+                    slot_acquired = False
+                    continue
+
+                self.handle_message(message)
                 
             except MNSExceptionBase as e:
                 if e.type == "MessageNotExist":
@@ -196,24 +3013,459 @@ class PDFProcessService:
                 self.log_remotely("ERROR", f"接收消息失败: {e}", {"exception_type": type(e).__name__, "exc_info": True})
             except Exception as e:
                 self.log_remotely("ERROR", f"处理消息时发生错误: {e}", {"exception_type": type(e).__name__, "exc_info": True})
+            finally:
+                if slot_acquired:
+                    self.concurrency.release_slot()
 
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+        if self.api_server is not None:
+            self.stop_api_server()
+        if self.status_server is not None:
+            self.stop_status_server()
+        if self.subtask_thread is not None:
+            self.subtask_stop.set()
+            self.subtask_thread.join()
+        if self.topic_outbox is not None:
+            self.topic_outbox.stop()
         self.log_remotely("INFO", f"PDF处理服务已运行 {int(time.time() - self.start_time)} 秒，即将关闭")
+
+    def handle_message(self, message):
+        """
+        处理消息并在成功后从队列删除
+        处理失败时按异常类别处理：输入错误直接转入死信；临时故障和引擎错误延迟重试，
+        已达到最大处理次数时转入死信；文章仍在处理中不算失败，重新发送延迟消息，不计入处理次数
+        Args:
+            message: MNS消息对象
+        """
+        try:
+            self.process_message(message)
+        except Exception as e:
+            category = classify_error(e)
+            reason = e.reason if isinstance(e, PDFRejectedError) else f'{type(e).__name__}: {e}'
+            if isinstance(e, ArticleInProgressError):
+                self.requeue_in_progress(message, reason)
+            elif category is PermanentInputError or message.dequeue_count + 1 >= self.max_dequeue_count:
+                self.dead_letter(message, reason, category)
+            else:
+                self.delay_retry(message, reason, category)
+            return
+        
+        # 删除已处理的消息
+        self.log_remotely("INFO", f"删除已处理的消息 {message.message_id}")
+        self.queue.delete_message(message.receipt_handle)
+
+    def dead_letter(self, message, reason=None, category=None):
+        """
+        不再重试的消息：转发到死信队列（如已配置）、通知管理员并从队列删除
+        Args:
+            message: MNS消息对象
+            reason: 失败原因，为空时表示多次处理失败
+            category: 异常类别
+        """
+        category_name = category.__name__ if category else None
+        self.log_remotely("WARNING", f"消息 {message.message_id} 不再重试: {reason or '多次处理失败'}", {
+            "message_id": message.message_id,
+            "dequeue_count": message.dequeue_count,
+            "error_category": category_name
+        })
+        dead_letter_queue = self.retry_config.get('dead_letter_queue')
+        if dead_letter_queue:
+            try:
+                body = json.loads(message.message_body)
+            except ValueError:
+                body = {'message_body': message.message_body}
+            self.mns_account.get_queue(dead_letter_queue).send_message(QueueMessage(json.dumps(dict(
+                body,
+                error=reason,
+                error_category=category_name,
+                dequeue_count=message.dequeue_count
+            ))))
+        try:
+            self.notice_manager(message, reason)
+        except Exception as e:
+            self.log_remotely("WARNING", f"通知管理员失败: {e}", {"message_id": message.message_id})
+        self.queue.delete_message(message.receipt_handle)
+
+    def requeue_in_progress(self, message, reason):
+        """
+        文章正在处理中时重新发送一条延迟消息并删除原消息，新消息的处理次数从头计算，
+        等待其他处理完成不会耗尽重试次数而转入死信
+        Args:
+            message: MNS消息对象
+            reason: 重新发送的原因
+        """
+        delay = self.retry_config.get('in_progress_delay', 60)
+        self.log_remotely("INFO", f"消息 {message.message_id} 对应的文章正在处理中，{delay} 秒后重新处理: {reason}", {
+            "message_id": message.message_id,
+            "dequeue_count": message.dequeue_count,
+            "retry_delay": delay
+        })
+        try:
+            self.queue.send_message(QueueMessage(message.message_body, delay))
+        except Exception as e:
+            # 重新发送失败时保留原消息，只延长不可见时间
+            self.log_remotely("WARNING", f"重新发送消息失败，延迟原消息: {e}", {"message_id": message.message_id})
+            try:
+                self.queue.change_message_visibility(message.receipt_handle, delay)
+            except Exception as e:
+                self.log_remotely("WARNING", f"修改消息可见时间失败: {e}", {"message_id": message.message_id})
+            return
+        self.queue.delete_message(message.receipt_handle)
+
+    def delay_retry(self, message, reason, category):
+        """
+        延长消息的不可见时间，按处理次数指数退避后再重试整条消息
+        Args:
+            message: MNS消息对象
+            reason: 失败原因
+            category: 异常类别，TransientIOError或EngineError
+        """
+        if category is TransientIOError:
+            base_delay = self.retry_config.get('transient_delay', 60)
+        else:
+            base_delay = self.retry_config.get('engine_delay', 300)
+        delay = min(base_delay * 2 ** (message.dequeue_count - 1), self.retry_config.get('max_delay', 3600))
+        self.log_remotely("INFO", f"消息 {message.message_id} 将在 {delay} 秒后重试: {reason}", {
+            "message_id": message.message_id,
+            "dequeue_count": message.dequeue_count,
+            "error_category": category.__name__,
+            "retry_delay": delay
+        })
+        try:
+            self.queue.change_message_visibility(message.receipt_handle, delay)
+        except Exception as e:
+            # 修改失败时消息在原可见性超时后重新出现
+            self.log_remotely("WARNING", f"修改消息可见时间失败: {e}", {"message_id": message.message_id})
+
+    def retry_stage(self, func, *args, **kwargs):
+        """
+        在当前阶段内重试临时故障，只重试失败的步骤（如只重新上传，不重新推理）
+        Args:
+            func: 阶段内执行的函数
+            *args, **kwargs: 函数参数
+        Returns:
+            函数返回值
+        """
+        attempts = self.retry_config.get('stage_attempts', 3)
+        for attempt in range(1, attempts + 1):
+            try:
+                return func(*args, **kwargs)
+            except Exception as e:
+                if attempt == attempts or classify_error(e) is not TransientIOError:
+                    raise
+                delay = min(self.retry_config.get('stage_delay', 2) * 2 ** (attempt - 1), 60)
+                self.log_remotely("WARNING", f"{getattr(func, '__name__', func)} 临时故障，{delay} 秒后重试({attempt}/{attempts}): {e}", {
+                    "exception_type": type(e).__name__,
+                    "attempt": attempt
+                })
+                time.sleep(delay)
+
+    def handle_dispatched_message(self, message):
+        """
+        并发模式下在工作线程中处理消息，处理失败的消息保留在队列中等待重试
+        Args:
+            message: MNS消息对象
+        """
+        try:
+            self.handle_message(message)
+        except Exception as e:
+            self.log_remotely("ERROR", f"处理消息时发生错误: {e}", {"exception_type": type(e).__name__, "exc_info": True})
+        finally:
+            self.concurrency.release_slot()
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        """
+        在处理阶段的执行上下文中运行
+        启用自适应并发时由控制器限制各阶段并发数；进程内的模型推理还需持有推理锁串行执行
+        （magic_pdf模型单例未确认线程安全，配置concurrency.inference_thread_safe后才允许并发；
+        使用共享推理服务时由推理服务排队，不在进程内串行）；
+        当前文章启用性能分析时记录该阶段的等待和执行耗时，并在状态登记中更新当前阶段
+        Args:
+            name: 阶段名称，download、inference或upload
+        """
+        queued_at = time.time()
+        self.status.set_stage(name, waiting=True)
+        with contextlib.ExitStack() as context:
+            self.enter_stage_limits(context, name)
+            started_at = time.time()
+            self.status.set_stage(name)
+            held = getattr(self.stage_local, 'held', {})
+            self.stage_local.held = dict(held, **{name: context})
+            try:
+                yield
+            finally:
+                self.stage_local.held = held
+        profiler = self.current_profiler()
+        if profiler is not None:
+            profiler.record_stage(name, started_at - queued_at, time.time() - started_at)
+
+    def enter_stage_limits(self, context, name):
+        """
+        获取阶段的并发名额和进程内推理锁
+        Args:
+            context: 持有名额和锁的ExitStack
+            name: 阶段名称
+        """
+        if self.concurrency_enabled:
+            context.enter_context(self.concurrency.stage(name))
+        if name == 'inference' and self.inference_client is None and not self.inference_thread_safe:
+            context.enter_context(self.inference_lock)
+
+    @contextlib.contextmanager
+    def released_stage(self, name):
+        """
+        暂时让出当前线程在阶段中持有的并发名额和推理锁，退出时重新获取
+        用于等待其他节点等不占用本阶段资源的长时间等待，未处于该阶段时不做处理
+        Args:
+            name: 阶段名称
+        """
+        context = getattr(self.stage_local, 'held', {}).get(name)
+        if context is None:
+            yield
+            return
+        context.close()
+        self.status.set_stage(name, waiting=True)
+        try:
+            yield
+        finally:
+            self.enter_stage_limits(context, name)
+            self.status.set_stage(name)
+
+    def current_profiler(self):
+        """
+        获取当前线程正在处理的文章的性能分析器
+        Returns:
+            ArticleProfiler实例，未启用性能分析时返回None
+        """
+        return getattr(self.profile_local, 'profiler', None)
+
+    @contextlib.contextmanager
+    def profile_article(self, article_id):
+        """
+        对单篇文章的处理过程进行性能分析
+        按采样率启用cProfile，处理耗时超过阈值且位于最慢的N篇文章之列时保存分析结果
+        Args:
+            article_id: 文章ID
+        """
+        if not self.profiling_enabled:
+            yield
+            return
+        profiler = ArticleProfiler(
+            article_id,
+            use_cprofile=random.random() < self.profiling_config.get('sample_rate', 0.1),
+            pages_per_range=self.profiling_config.get('pages_per_range', 0)
+        )
+        self.profile_local.profiler = profiler
+        profiler.start()
+        try:
+            yield
+        except Exception as e:
+            profiler.status = f'failed: {type(e).__name__}: {e}'
+            raise
+        finally:
+            profiler.stop()
+            self.profile_local.profiler = None
+            try:
+                self.save_profile(profiler)
+            except Exception as e:
+                self.log_remotely("WARNING", f"保存性能分析结果失败: {e}", {"article_id": article_id})
+
+    def save_profile(self, profiler):
+        """
+        文章处理耗时超过阈值且位于最慢的N篇之列时保存性能分析结果，并按配置上传到OSS
+        Args:
+            profiler: ArticleProfiler实例
+        """
+        if profiler.elapsed < self.profiling_config.get('latency_threshold', 300):
+            return
+        slowest_n = self.profiling_config.get('slowest_n', 10)
+        output_dir = os.path.join(self.profiling_config.get('output_dir', 'temp/profiles'), profiler.article_id)
+        evicted_dir = None
+        with self.profile_lock:
+            if len(self.slowest_profiles) >= slowest_n:
+                if profiler.elapsed <= self.slowest_profiles[0][0]:
+                    return
+                _, evicted_dir = heapq.heapreplace(self.slowest_profiles, (profiler.elapsed, output_dir))
+            else:
+                heapq.heappush(self.slowest_profiles, (profiler.elapsed, output_dir))
+
+        # 删除被挤出最慢N篇的分析结果，同一文章重新处理时目录相同，直接覆盖
+        if evicted_dir is not None and evicted_dir != output_dir:
+            shutil.rmtree(evicted_dir, ignore_errors=True)
+        profiler.take_snapshot()
+        files = profiler.dump(output_dir)
+        self.log_remotely("WARNING", f"文章处理耗时 {profiler.elapsed:.1f} 秒，已保存性能分析结果: {output_dir}", {
+            "article_id": profiler.article_id,
+            "elapsed": profiler.elapsed,
+            "profile_dir": output_dir
+        })
+
+        oss_prefix = self.profiling_config.get('oss_prefix', '')
+        if oss_prefix:
+            for path in files:
+                self.bucket.put_object_from_file(
+                    f"{oss_prefix.strip('/')}/{profiler.article_id}/{os.path.basename(path)}",
+                    path
+                )
+
+    def start_api_server(self):
+        """
+        在后台线程中启动批量提交HTTP接口及其处理线程
+        """
+        self.api_stopping.clear()
+        self.api_worker_threads = [
+            threading.Thread(target=self.api_worker, name=f'api-worker-{i}', daemon=True)
+            for i in range(self.api_workers)
+        ]
+        for thread in self.api_worker_threads:
+            thread.start()
+        self.api_server = ThreadingHTTPServer((self.api_host, self.api_port), BatchRequestHandler)
+        self.api_server.daemon_threads = True
+        self.api_server.service = self
+        threading.Thread(target=self.api_server.serve_forever, name='api-server', daemon=True).start()
+        self.log_remotely("INFO", f"批量提交接口已启动: http://{self.api_host}:{self.api_server.server_port}")
+
+    def stop_api_server(self):
+        """
+        停止批量提交接口：不再接收新任务，等待处理线程完成队列中已提交的任务后关闭
+        """
+        self.api_stopping.set()
+        self.api_server.shutdown()
+        # 每个处理线程取到结束标记后退出，标记排在已提交的任务之后
+        for _ in self.api_worker_threads:
+            self.api_job_queue.put(None)
+        for thread in self.api_worker_threads:
+            thread.join()
+        self.api_worker_threads = []
+        self.api_server.server_close()
+        self.log_remotely("INFO", "批量提交接口已停止")
+
+    def start_status_server(self):
+        """
+        在后台线程中启动只读的状态接口，与批量提交接口分别监听，启用状态接口不会开放任务提交
+        """
+        self.status_server = ThreadingHTTPServer((self.status_host, self.status_port), StatusRequestHandler)
+        self.status_server.daemon_threads = True
+        self.status_server.service = self
+        threading.Thread(target=self.status_server.serve_forever, name='status-server', daemon=True).start()
+        self.log_remotely("INFO", f"状态接口已启动: http://{self.status_host}:{self.status_server.server_port}/status")
+
+    def stop_status_server(self):
+        """
+        停止状态接口
+        """
+        self.status_server.shutdown()
+        self.status_server.server_close()
+        self.status_server = None
+
+    def submit_job(self, content, events):
+        """
+        提交一篇文章到批量任务队列
+        Args:
+            content: 消息内容字典
+            events: 用于回传处理事件的队列
+        Returns:
+            提交成功返回True，等待超时或接口正在停止时返回False
+        """
+        if self.api_stopping.is_set():
+            return False
+        try:
+            self.api_job_queue.put((content, events), timeout=self.api_submit_timeout)
+            return True
+        except queue.Full:
+            return False
+
+    def api_worker(self):
+        """
+        批量任务处理线程，从任务队列取出文章并回传处理结果事件，取到结束标记时退出
+        """
+        while True:
+            job = self.api_job_queue.get()
+            if job is None:
+                self.api_job_queue.task_done()
+                return
+            content, events = job
+            article_id = content.get('article_id', 'unknown') if isinstance(content, dict) else 'unknown'
+            started_at = time.time()
+            try:
+                self.process_content(content)
+                events.put({
+                    'event': 'completed',
+                    'article_id': article_id,
+                    'elapsed': round(time.time() - started_at, 3)
+                })
+            except Exception as e:
+                events.put({
+                    'event': 'failed',
+                    'article_id': article_id,
+                    'error': f'{type(e).__name__}: {e}',
+                    'error_category': classify_error(e).__name__,
+                    'elapsed': round(time.time() - started_at, 3)
+                })
+            finally:
+                self.api_job_queue.task_done()
     
-    def notice_manager(self, message):
+    def status_snapshot(self):
+        """
+        获取服务状态快照，包括处理中文章、滑动窗口吞吐量和队列积压
+        Returns:
+            状态字典
+        """
+        snapshot = self.status.snapshot()
+        snapshot['uptime'] = round(time.time() - self.start_time, 3)
+        snapshot['backlog'] = self.queue_backlog()
+        if self.concurrency_enabled:
+            snapshot['concurrency'] = self.concurrency.snapshot()
+        return snapshot
+
+    def queue_backlog(self):
+        """
+        获取队列积压，MNS队列属性按backlog_ttl缓存，避免状态查询频繁调用MNS接口
+        Returns:
+            积压字典，MNS队列属性获取失败时记录错误信息
+        """
+        backlog = {'api_pending': self.api_job_queue.qsize()}
+        if self.topic_outbox is not None:
+            backlog['outbox_pending'] = self.topic_outbox.pending_count()
+        if not hasattr(self, 'queue'):
+            return backlog
+        with self.backlog_lock:
+            if self.backlog_cache is None or time.time() - self.backlog_cache[0] >= self.backlog_ttl:
+                try:
+                    meta = self.queue.get_attributes()
+                    mns_backlog = {
+                        'mns_active': meta.active_messages,
+                        'mns_inactive': meta.inactive_messages,
+                        'mns_delayed': meta.delay_messages
+                    }
+                except Exception as e:
+                    mns_backlog = {'mns_error': f'{type(e).__name__}: {e}'}
+                self.backlog_cache = (time.time(), mns_backlog)
+            backlog.update(self.backlog_cache[1])
+        return backlog
+
+    def notice_manager(self, message, reason=None):
         """
         通知管理员
         Args:
             message: MNS消息对象
+            reason: 失败原因，为空时表示多次处理失败
         """
         if not self.notice_hook_url:
             return
         
         content = json.loads(message.message_body)
+        if reason:
+            text = f"全文数据{content['article_id']}无法处理，已跳过: {reason}; 数据详情: {message}"
+        else:
+            text = f"全文数据{content['article_id']}多次处理失败，请检查数据有效性; 数据详情: {message}"
         # 发送通知
         requests.post(self.notice_hook_url, json={
             "msgtype": "text",
             "text": {
-                "content": f"全文数据{content['article_id']}多次处理失败，请检查数据有效性; 数据详情: {message}"
+                "content": text
             }
         }, timeout=10)
 
@@ -224,41 +3476,246 @@ class PDFProcessService:
             message: MNS消息对象
         """
         try:
-            # 解析消息内容
-            content = json.loads(message.message_body)
-            article_id = content['article_id']
-            tag = content['tag']
-            pdf_url = content['pdf_url']
-            markdown_oss_file = content['markdown_file']
-            images_oss_path = content['images_path']
-            json_oss_path = content['json_path']
+            # 解析消息内容
+            content = json.loads(message.message_body)
+        except Exception as e:
+            self.log_remotely("ERROR", f"处理消息失败: {e}", {
+                "article_id": "unknown",
+                "exception_type": type(e).__name__,
+                "exc_info": True
+            })
+            raise
+        self.process_content(content)
+
+    def process_content(self, content):
+        """
+        处理单篇文章，MNS消息和批量提交接口共用该处理流程
+        同一文章ID正在处理时抛出ArticleInProgressError，MNS消息延迟重试，批量任务返回失败事件
+        Args:
+            content: 消息内容字典，字段与samples/mns_message.json相同
+        """
+        article_id = content.get('article_id', 'unknown')
+        if 'article_id' in content:
+            with self.processing_lock:
+                if article_id in self.processing_articles:
+                    raise ArticleInProgressError(f"文章 {article_id} 正在处理中")
+                self.processing_articles.add(article_id)
+        try:
+            with self.status.track(article_id), self.profile_article(article_id):
+                if self.single_flight is None:
+                    self.convert_content(content)
+                else:
+                    self.convert_content_once(content)
+        finally:
+            if 'article_id' in content:
+                with self.processing_lock:
+                    self.processing_articles.discard(article_id)
+
+    def convert_content_once(self, content):
+        """
+        对相同PDF地址的并发请求只转换一次
+        获得去重锁的worker执行转换并发布结果记录，其他worker复制已上传的产物；
+        相同PDF正在转换时不在处理流程中等待，抛出ArticleInProgressError，MNS消息延迟重试后复用结果，
+        持有者转换失败时释放锁，由重试的消息接手转换
+        Args:
+            content: 消息内容字典
+        """
+        try:
+            article_id = content['article_id']
+            outputs = resolve_outputs(content['outputs']) if 'outputs' in content else self.default_outputs
+            if 'mode' in content:
+                resolve_mode(content['mode'])
+            key = single_flight_key(content['pdf_url'], outputs, content.get('mode'))
+        except KeyError as e:
+            raise InvalidMessageError(*e.args) from e
+        except ValueError as e:
+            raise PermanentInputError(f'消息格式错误: {e}') from e
+        record = self.single_flight.load(key)
+        if record is not None:
+            self.reuse_result(content, record)
+            return
+        if not self.single_flight.acquire(key):
+            self.log_remotely("INFO", f"相同PDF正在由其他worker转换，稍后重试, 文章ID: {article_id}", {
+                "article_id": article_id,
+                "pdf_url": content['pdf_url']
+            })
+            raise ArticleInProgressError(f"相同PDF正在由其他worker转换: {content['pdf_url']}")
+        # 获取锁之前持有者可能刚刚发布了结果
+        record = self.single_flight.load(key)
+        if record is not None:
+            self.single_flight.release(key)
+            self.reuse_result(content, record)
+            return
+
+        try:
+            uploaded = self.convert_content(content)
+            if uploaded is not None:
+                self.single_flight.publish(key, {
+                    'article_id': article_id,
+                    'image_dir': self.config['temp']['image_dir'] + f'/{article_id}/',
+                    'markdown_file': content['markdown_file'],
+                    'images_path': content['images_path'],
+                    'json_path': content['json_path'],
+                    'objects': uploaded
+                })
+        finally:
+            self.single_flight.release(key)
+
+    def reuse_result(self, content, record):
+        """
+        复制其他worker已上传的转换结果到当前消息的输出路径，并发送主题消息；
+        markdown和JSON结果中的图片路径和文章ID替换为当前文章的值后上传，图片等其他对象直接复制
+        Args:
+            content: 消息内容字典
+            record: 结果记录字典
+        """
+        article_id = content['article_id']
+        image_dir = self.config['temp']['image_dir'] + f'/{article_id}/'
+        with self.stage('upload'):
+            for src_key in record['objects']:
+                dst_key = map_result_key(src_key, record, content)
+                if dst_key == src_key:
+                    continue
+                if src_key.endswith(('.md', '.json')):
+                    data = self.bucket.get_object(src_key).read()
+                    self.bucket.put_object(dst_key, rewrite_result_object(src_key, data, record, content, image_dir))
+                else:
+                    self.bucket.copy_object(self.bucket.bucket_name, src_key, dst_key)
+
+        topic_message = {
+            'article_id': article_id,
+            'tag': content['tag'],
+            'pdf_url': content['pdf_url'],
+            'markdown_file': content['markdown_file'],
+            'images_path': content['images_path'],
+            'json_path': content['json_path']
+        }
+        if 'outputs' in content:
+            topic_message['outputs'] = sorted(content['outputs'])
+        self.publish_topic_message(topic_message)
+        self.log_remotely("INFO", f"文章 {article_id} 复用文章 {record['article_id']} 的转换结果", {
+            "article_id": article_id,
+            "reused_from": record['article_id'],
+            "objects": len(record['objects']),
+            "status": "success"
+        })
+
+    def publish_topic_message(self, topic_message):
+        """
+        发送主题消息，启用发件箱时写入发件箱由后台线程发送
+        Args:
+            topic_message: 主题消息内容字典
+        """
+        if self.topic_outbox is not None:
+            self.topic_outbox.put(topic_message)
+        else:
+            self.retry_stage(self.send_topic_message, topic_message)
+
+    def convert_content(self, content):
+        """
+        下载、转换并上传单篇文章，完成后发送主题消息
+        Args:
+            content: 消息内容字典
+        Returns:
+            上传的OSS对象路径列表，转发到超大文档队列或保留已有结果时返回None
+        """
+        try:
+            try:
+                article_id = content['article_id']
+                tag = content['tag']
+                pdf_url = content['pdf_url']
+                markdown_oss_file = content['markdown_file']
+                images_oss_path = content['images_path']
+                json_oss_path = content['json_path']
+                outputs = resolve_outputs(content['outputs']) if 'outputs' in content else self.default_outputs
+                mode = resolve_mode(content.get('mode') or self.fast_path_config.get('default_mode', 'full'))
+            except KeyError as e:
+                raise InvalidMessageError(*e.args) from e
+            except ValueError as e:
+                raise PermanentInputError(f'消息格式错误: {e}') from e
             
             self.log_remotely("INFO", f"开始处理文章 {article_id}", {
                 "article_id": article_id,
                 "tag": tag,
-                "pdf_url": pdf_url
+                "pdf_url": pdf_url,
+                "outputs": sorted(outputs)
             })
             
             # 下载PDF文件
             pdf_path = os.path.join(self.config['temp']['pdf_dir'], f'{article_id}.pdf')
-            self.download_file(pdf_url, pdf_path)
+            with self.stage('download'):
+                self.retry_stage(self.download_file, pdf_url, pdf_path)
+
+            # 重新处理模式下对比输出清单，只重新转换受引擎升级影响的文档
+            action = 'full'
+            cached_layout = None
+            if content.get('reprocess'):
+                action, manifest = self.plan_article_reprocess(article_id, pdf_path, json_oss_path, outputs)
+                if action == 'reparse':
+                    try:
+                        cached_layout = self.load_layout(json_oss_path, article_id)
+                    except Exception as e:
+                        self.log_remotely("WARNING", f"读取缓存的版面结果失败，完整转换: {e}", {
+                            "article_id": article_id
+                        })
+                        action = 'full'
+                elif action == 'skip':
+                    self.refresh_manifest(json_oss_path, article_id, manifest)
+
+            # 预检PDF，确定处理路径
+            parse_method = None
+            report = None
+            if action == 'full' and self.preflight_enabled:
+                route, report = self.preflight_pdf(pdf_path, article_id, allow_oversize=content.get('oversize', False))
+                if route == 'oversize':
+                    self.forward_oversize(content)
+                    return
+                # 文字层缺失时直接走OCR；文字层看似完整时仍由ds.classify()判断，以识别乱码文字层
+                parse_method = 'ocr' if route == 'ocr' else None
+
+            # 选择解析模式：full使用完整模型流程，fast只使用PyMuPDF，auto按预检结果选择
+            if action != 'full':
+                mode = action
+            elif mode == 'auto':
+                if report is None:
+                    report = inspect_pdf(pdf_path)
+                mode = 'fast' if choose_fast_path(report, self.fast_path_config) else 'full'
             
             # 处理PDF文件
-            result = self.process_pdf(
-                pdf_path,
-                article_id,
-                self.config['temp']['image_dir']+f'/{article_id}/',
-                self.config['temp']['markdown_dir']
-            )
+            image_dir = self.config['temp']['image_dir']+f'/{article_id}/'
+            if mode == 'skip':
+                result = None
+            elif mode == 'fast':
+                result = self.process_pdf_fast(
+                    pdf_path,
+                    article_id,
+                    image_dir,
+                    self.config['temp']['markdown_dir'],
+                    outputs=outputs
+                )
+            else:
+                result = self.process_pdf(
+                    pdf_path,
+                    article_id,
+                    image_dir,
+                    self.config['temp']['markdown_dir'],
+                    parse_method=parse_method,
+                    outputs=outputs,
+                    cached_layout=cached_layout
+                )
 
             # 上传处理结果到OSS
-            self.upload_results(
-                article_id,
-                result,
-                markdown_oss_file,
-                images_oss_path,
-                json_oss_path
-            )
+            uploaded = None
+            if result is not None:
+                with self.stage('upload'):
+                    uploaded = self.retry_stage(
+                        self.upload_results,
+                        article_id,
+                        result,
+                        markdown_oss_file,
+                        images_oss_path,
+                        json_oss_path
+                    )
             
             # 发送主题消息，使用与接收到的消息相同的格式
             topic_message = {
@@ -269,12 +3726,17 @@ class PDFProcessService:
                 'images_path': images_oss_path,
                 'json_path': json_oss_path
             }
-            self.send_topic_message(topic_message)
+            if 'outputs' in content:
+                topic_message['outputs'] = sorted(outputs)
+            if content.get('reprocess'):
+                topic_message['reprocess'] = action
+            self.publish_topic_message(topic_message)
             
             self.log_remotely("INFO", f"文章 {article_id} 处理完成", {
                 "article_id": article_id,
                 "status": "success"
             })
+            return uploaded
             
         except Exception as e:
             self.log_remotely("ERROR", f"处理消息失败: {e}", {
@@ -284,7 +3746,225 @@ class PDFProcessService:
             })
             raise
 
-    def process_pdf(self, pdf_path, article_id, image_dir, markdown_dir):
+    def preflight_pdf(self, pdf_path, article_id, allow_oversize=False):
+        """
+        预检PDF并确定处理路径，未通过预检时抛出PDFRejectedError
+        Args:
+            pdf_path: PDF文件路径
+            article_id: 文章ID
+            allow_oversize: 是否允许处理超大文档
+        Returns:
+            (处理路径, 预检报告)，处理路径为oversize、txt或ocr，txt时解析方式仍由ds.classify()确认
+        """
+        report = inspect_pdf(
+            pdf_path,
+            sample_pages=self.preflight_config.get('sample_pages', 20),
+            min_text_chars=self.preflight_config.get('min_text_chars', 50)
+        )
+        route, reason = route_pdf(report, self.preflight_config, allow_oversize)
+        self.log_remotely("INFO", f"PDF预检完成, 文章ID: {article_id}, 处理路径: {route}, 原因: {reason}", dict(
+            report, article_id=article_id, route=route
+        ))
+        if route == 'reject':
+            raise PDFRejectedError(reason, report)
+        return route, report
+
+    def forward_oversize(self, content):
+        """
+        将超大文档转发到超大文档队列，由单独配置的服务实例处理
+        Args:
+            content: 消息内容字典
+        """
+        queue_name = self.preflight_config['oversize_queue']
+        oversize_queue = self.mns_account.get_queue(queue_name)
+        oversize_queue.send_message(QueueMessage(json.dumps(dict(content, oversize=True))))
+        self.log_remotely("INFO", f"文章 {content['article_id']} 已转发到超大文档队列 {queue_name}", {
+            "article_id": content['article_id'],
+            "oversize_queue": queue_name
+        })
+
+    def pipeline_version(self, mode):
+        """
+        获取当前解析流程版本，完整流程可在配置中指定版本以覆盖magic-pdf的包版本
+        Args:
+            mode: 解析模式，fast或full
+        Returns:
+            流程版本字符串
+        """
+        if mode != 'fast' and self.reprocess_config.get('pipeline_version'):
+            return self.reprocess_config['pipeline_version']
+        return engine_version(mode)
+
+    def build_manifest(self, article_id, input_hash, parse_method, outputs, page_count, layout_cached=False):
+        """
+        生成文章的输出清单，记录重新处理时需要比较的流程版本、解析方式和输入哈希
+        Args:
+            article_id: 文章ID
+            input_hash: PDF文件的sha256
+            parse_method: 实际使用的解析方式，txt、ocr或fast
+            outputs: 输出产物
+            page_count: 页数
+            layout_cached: 是否缓存了版面结果
+        Returns:
+            输出清单字典
+        """
+        return {
+            'article_id': article_id,
+            'input_hash': input_hash,
+            'parse_method': parse_method,
+            'pipeline_version': self.pipeline_version('fast' if parse_method == 'fast' else 'full'),
+            'layout_version': self.reprocess_config.get('layout_version'),
+            'layout_cached': layout_cached,
+            'outputs': sorted(outputs),
+            'page_count': page_count,
+            'created_at': time.strftime('%Y-%m-%dT%H:%M:%S%z')
+        }
+
+    def load_manifest(self, json_oss_path, article_id):
+        """
+        从OSS读取文章的输出清单
+        Args:
+            json_oss_path: JSON文件的OSS路径
+            article_id: 文章ID
+        Returns:
+            输出清单字典，不存在时返回None
+        """
+        try:
+            return json.loads(self.bucket.get_object(os.path.join(json_oss_path, f'{article_id}_manifest.json')).read())
+        except oss2.exceptions.NoSuchKey:
+            return None
+
+    def load_layout(self, json_oss_path, article_id):
+        """
+        从OSS读取缓存的版面推理结果
+        Args:
+            json_oss_path: JSON文件的OSS路径
+            article_id: 文章ID
+        Returns:
+            版面结果字典，包含parse_method和model_list
+        """
+        return json.loads(self.bucket.get_object(os.path.join(json_oss_path, f'{article_id}_layout.json')).read())
+
+    def plan_article_reprocess(self, article_id, pdf_path, json_oss_path, outputs):
+        """
+        对比输出清单和当前流程，确定文章的重新处理方式
+        Args:
+            article_id: 文章ID
+            pdf_path: 已下载的PDF文件路径
+            json_oss_path: JSON文件的OSS路径
+            outputs: 本次请求的输出产物
+        Returns:
+            (处理方式, 输出清单)，处理方式为skip、reparse或full
+        """
+        manifest = self.load_manifest(json_oss_path, article_id)
+        with open(pdf_path, 'rb') as f:
+            input_hash = hashlib.sha256(f.read()).hexdigest()
+        parse_method = manifest.get('parse_method') if manifest else None
+        pipeline_version = self.pipeline_version('fast' if parse_method == 'fast' else 'full')
+        action, reason = plan_reprocess(
+            manifest,
+            input_hash,
+            pipeline_version,
+            self.reprocess_config.get('layout_version'),
+            outputs,
+            self.reprocess_config.get('affected_parse_methods')
+        )
+        self.log_remotely("INFO", f"重新处理判断完成, 文章ID: {article_id}, 处理方式: {action}, 原因: {reason}", {
+            "article_id": article_id,
+            "action": action,
+            "parse_method": parse_method,
+            "previous_version": manifest.get('pipeline_version') if manifest else None,
+            "pipeline_version": pipeline_version
+        })
+        return action, manifest
+
+    def refresh_manifest(self, json_oss_path, article_id, manifest):
+        """
+        已有结果不受升级影响时，将输出清单的流程版本更新为当前版本
+        Args:
+            json_oss_path: JSON文件的OSS路径
+            article_id: 文章ID
+            manifest: 已有的输出清单
+        """
+        pipeline_version = self.pipeline_version('fast' if manifest.get('parse_method') == 'fast' else 'full')
+        if manifest.get('pipeline_version') == pipeline_version:
+            return
+        manifest = dict(manifest, pipeline_version=pipeline_version, verified_from=manifest.get('pipeline_version'))
+        self.bucket.put_object(
+            os.path.join(json_oss_path, f'{article_id}_manifest.json'),
+            json.dumps(manifest, ensure_ascii=False, indent=4)
+        )
+
+    def process_pdf_fast(self, pdf_path, article_id, image_dir, markdown_dir, outputs=OUTPUT_ARTIFACTS):
+        """
+        使用PyMuPDF快速处理PDF文件，不加载模型，返回结构与process_pdf相同
+        Args:
+            pdf_path: PDF文件路径
+            article_id: 文章ID
+            image_dir: 图片输出目录
+            markdown_dir: Markdown输出目录
+            outputs: 需要输出的产物，未请求的产物不写出，结果中对应路径为None
+        Returns:
+            处理结果字典
+        """
+        try:
+            self.log_remotely("INFO", f"开始快速处理PDF文件, 文章ID: {article_id}, 文件路径: {pdf_path}", {
+                "article_id": article_id,
+                "pdf_path": pdf_path,
+                "mode": "fast"
+            })
+            markdown, content_list, middle_json, page_count = extract_pdf_fast(
+                pdf_path, image_dir, extract_images='images' in outputs
+            )
+            self.status.set_pages(pages_total=page_count, pages_processed=page_count)
+
+            os.makedirs(markdown_dir, exist_ok=True)
+            markdown_path = json_middle_path = json_content_list_path = None
+            if 'markdown' in outputs:
+                markdown_path = os.path.join(markdown_dir, f'{article_id}.md')
+                with open(markdown_path, 'w', encoding='utf-8') as f:
+                    f.write(markdown)
+            if 'middle_json' in outputs:
+                json_middle_path = os.path.join(markdown_dir, f'{article_id}_middle.json')
+                with open(json_middle_path, 'w', encoding='utf-8') as f:
+                    json.dump(middle_json, f, ensure_ascii=False, indent=4)
+            if 'content_list' in outputs:
+                json_content_list_path = os.path.join(markdown_dir, f'{article_id}_content_list.json')
+                with open(json_content_list_path, 'w', encoding='utf-8') as f:
+                    json.dump(content_list, f, ensure_ascii=False, indent=4)
+
+            # 写出输出清单
+            with open(pdf_path, 'rb') as f:
+                input_hash = hashlib.sha256(f.read()).hexdigest()
+            manifest_path = os.path.join(markdown_dir, f'{article_id}_manifest.json')
+            with open(manifest_path, 'w', encoding='utf-8') as f:
+                json.dump(self.build_manifest(article_id, input_hash, 'fast', outputs, page_count), f,
+                          ensure_ascii=False, indent=4)
+
+            self.log_remotely("INFO", f"PDF文件快速处理完成, 文章ID: {article_id}, 文章路径: {markdown_path}", {
+                "article_id": article_id,
+                "markdown_path": markdown_path,
+                "mode": "fast"
+            })
+            return {
+                'markdown_path': markdown_path,
+                'json_middle_path': json_middle_path,
+                'json_content_list_path': json_content_list_path,
+                'image_dir': image_dir if 'images' in outputs else None,
+                'manifest_path': manifest_path,
+                'layout_path': None,
+                'page_count': page_count
+            }
+        except Exception as e:
+            self.log_remotely("ERROR", f"快速处理PDF文件失败: {e}", {
+                "article_id": article_id,
+                "exception_type": type(e).__name__,
+                "exc_info": True
+            })
+            raise
+
+    def process_pdf(self, pdf_path, article_id, image_dir, markdown_dir, parse_method=None, outputs=OUTPUT_ARTIFACTS,
+                    cached_layout=None):
         """
         处理PDF文件
         Args:
@@ -292,6 +3972,9 @@ class PDFProcessService:
             article_id: 文章ID
             image_dir: 图片输出目录
             markdown_dir: Markdown输出目录
+            parse_method: 解析方式，txt或ocr，为空时由ds.classify()判断
+            outputs: 需要输出的产物，未请求的产物不导出，结果中对应路径为None
+            cached_layout: 缓存的版面结果，包含parse_method和model_list，不为空时跳过模型推理直接解析
         Returns:
             处理结果字典
         """
@@ -304,64 +3987,68 @@ class PDFProcessService:
             # 读取PDF文件
             with open(pdf_path, 'rb') as f:
                 pdf_bytes = f.read()
+            input_hash = hashlib.sha256(pdf_bytes).hexdigest()
+            content_hash = input_hash[:16]
                 
             # 创建数据集实例
+            import_magic_pdf(with_models=self.inference_client is None)
             ds = PymuDocDataset(pdf_bytes)
+            if self.page_cache is not None:
+                ds = self.page_cache.wrap(ds, content_hash)
             
-            # 配置输出writer
-            image_writer = FileBasedDataWriter(image_dir)
+            # 配置输出writer，未请求图片产物时不写出截图
+            image_writer = FileBasedDataWriter(image_dir) if 'images' in outputs else NullDataWriter()
             md_writer = FileBasedDataWriter(markdown_dir)
             
-            # 处理PDF - 添加异常处理
+            # 处理PDF - 模型推理在各入口之间共享，需串行执行
             self.log_remotely("INFO", f"分析PDF文件", {"article_id": article_id})
-            try:
-                if ds.classify() == SupportedPdfParseMethod.OCR:
-                    infer_result = ds.apply(doc_analyze, ocr=True)
-                    pipe_result = infer_result.pipe_ocr_mode(image_writer)
+            with self.stage('inference'):
+                if cached_layout is not None:
+                    used_method = cached_layout['parse_method']
+                    self.status.set_pages(pages_total=len(ds), pages_processed=len(ds))
+                    infer_result = InferenceResult(cached_layout['model_list'], ds)
+                    if used_method == 'ocr':
+                        pipe_result = infer_result.pipe_ocr_mode(image_writer)
+                    else:
+                        pipe_result = infer_result.pipe_txt_mode(image_writer)
                 else:
-                    infer_result = ds.apply(doc_analyze, ocr=False)
-                    pipe_result = infer_result.pipe_txt_mode(image_writer)
-            except KeyError as e:
-                # 当遇到Length1等字体相关错误时，强制使用OCR模式
-                if 'Length1' in str(e) or 'fontfile' in str(e):
-                    self.log_remotely("WARNING", f"PDF字体解析失败，强制使用OCR模式处理, 错误: {e}", {
-                        "article_id": article_id,
-                        "error_type": "font_parse_error",
-                        "fallback_mode": "ocr"
-                    })
-                    infer_result = ds.apply(doc_analyze, ocr=True)
-                    pipe_result = infer_result.pipe_ocr_mode(image_writer)
+                    pipe_result, infer_result, used_method = self.run_pipeline(
+                        ds, image_writer, article_id, content_hash, parse_method
+                    )
+
+            # 只导出请求的结果文件，中间JSON的序列化开销较大
+            self.status.set_stage('export')
+            markdown_path = json_middle_path = json_content_list_path = None
+            if 'markdown' in outputs:
+                markdown_path = os.path.join(markdown_dir, f'{article_id}.md')
+                if 'images' in outputs:
+                    pipe_result.dump_md(md_writer, f'{article_id}.md', image_dir)
                 else:
-                    # 其他KeyError继续抛出
-                    raise
-            except Exception as e:
-                # 其他异常也尝试使用OCR模式
-                self.log_remotely("WARNING", f"PDF解析异常，尝试使用OCR模式处理, 错误: {e}", {
-                    "article_id": article_id,
-                    "error_type": "parse_error",
-                    "fallback_mode": "ocr"
-                })
-                try:
-                    infer_result = ds.apply(doc_analyze, ocr=True)
-                    pipe_result = infer_result.pipe_ocr_mode(image_writer)
-                except Exception as ocr_error:
-                    # OCR模式也失败，记录错误并抛出
-                    self.log_remotely("ERROR", f"OCR模式处理也失败: {ocr_error}", {
-                        "article_id": article_id,
-                        "original_error": str(e),
-                        "ocr_error": str(ocr_error)
-                    })
-                    raise ocr_error
-                
-            # 获取处理结果
-            markdown_path = os.path.join(markdown_dir, f'{article_id}.md')
-            json_middle_path = os.path.join(markdown_dir, f'{article_id}_middle.json')
-            json_content_list_path = os.path.join(markdown_dir, f'{article_id}_content_list.json')
-            
-            # 导出结果文件
-            pipe_result.dump_md(md_writer, f'{article_id}.md', image_dir)
-            pipe_result.dump_middle_json(md_writer, f'{article_id}_middle.json')
-            pipe_result.dump_content_list(md_writer, f"{article_id}_content_list.json", image_dir)
+                    md_writer.write_string(f'{article_id}.md', strip_image_links(pipe_result.get_markdown(image_dir)))
+            if 'middle_json' in outputs:
+                json_middle_path = os.path.join(markdown_dir, f'{article_id}_middle.json')
+                pipe_result.dump_middle_json(md_writer, f'{article_id}_middle.json')
+            if 'content_list' in outputs:
+                json_content_list_path = os.path.join(markdown_dir, f'{article_id}_content_list.json')
+                pipe_result.dump_content_list(md_writer, f"{article_id}_content_list.json", image_dir)
+
+            # 缓存版面推理结果，引擎升级未涉及模型时可跳过推理重新解析
+            layout_path = None
+            if self.cache_layout:
+                layout_path = os.path.join(markdown_dir, f'{article_id}_layout.json')
+                with open(layout_path, 'w', encoding='utf-8') as f:
+                    json.dump({'parse_method': used_method, 'model_list': infer_result.get_infer_res()}, f,
+                              ensure_ascii=False)
+
+            # 写出输出清单
+            manifest_path = os.path.join(markdown_dir, f'{article_id}_manifest.json')
+            with open(manifest_path, 'w', encoding='utf-8') as f:
+                json.dump(self.build_manifest(article_id, input_hash, used_method, outputs, len(ds),
+                                              layout_cached=layout_path is not None), f, ensure_ascii=False, indent=4)
+
+            # 结果导出完成后清理检查点
+            if self.checkpoint_enabled:
+                self.checkpoint_store.clear(article_id)
             
             self.log_remotely("INFO", f"PDF文件处理完成, 文章ID: {article_id}, 文章路径: {markdown_path}", {
                 "article_id": article_id,
@@ -372,7 +4059,10 @@ class PDFProcessService:
                 'markdown_path': markdown_path,
                 'json_middle_path': json_middle_path,
                 'json_content_list_path': json_content_list_path,
-                'image_dir': image_dir
+                'image_dir': image_dir if 'images' in outputs else None,
+                'manifest_path': manifest_path,
+                'layout_path': layout_path,
+                'page_count': len(ds)
             }
         except Exception as e:
             self.log_remotely("ERROR", f"处理PDF文件失败: {e}", {
@@ -381,6 +4071,378 @@ class PDFProcessService:
                 "exc_info": True
             })
             raise
+        finally:
+            # 页面图像只在处理期间使用，处理结束后释放共享内存
+            if self.page_cache is not None and 'content_hash' in locals():
+                self.page_cache.clear(content_hash)
+
+    def run_pipeline(self, ds, image_writer, article_id, content_hash, parse_method=None):
+        """
+        对PDF执行分类、推理和解析，解析失败时回退到OCR模式
+        Args:
+            ds: PymuDocDataset实例
+            image_writer: 图片输出writer
+            article_id: 文章ID
+            content_hash: PDF内容哈希
+            parse_method: 预检确定的解析方式，txt或ocr，为空时由ds.classify()判断
+        Returns:
+            (PipeResult解析结果, InferenceResult推理结果, 实际使用的解析方式)
+        """
+        try:
+            if parse_method is None:
+                use_ocr = ds.classify() == SupportedPdfParseMethod.OCR
+            else:
+                use_ocr = parse_method == 'ocr'
+            if use_ocr:
+                used_method = 'ocr'
+                infer_result = self.analyze_pdf(ds, True, article_id, content_hash)
+                pipe_result = infer_result.pipe_ocr_mode(image_writer)
+            else:
+                used_method = 'txt'
+                infer_result = self.analyze_pdf(ds, False, article_id, content_hash)
+                pipe_result = infer_result.pipe_txt_mode(image_writer)
+        except KeyError as e:
+            # 当遇到Length1等字体相关错误时，强制使用OCR模式
+            if 'Length1' in str(e) or 'fontfile' in str(e):
+                self.log_remotely("WARNING", f"PDF字体解析失败，强制使用OCR模式处理, 错误: {e}", {
+                    "article_id": article_id,
+                    "error_type": "font_parse_error",
+                    "fallback_mode": "ocr"
+                })
+                used_method = 'ocr'
+                infer_result = self.analyze_pdf(ds, True, article_id, content_hash)
+                pipe_result = infer_result.pipe_ocr_mode(image_writer)
+            else:
+                # 其他KeyError继续抛出
+                raise
+        except Exception as e:
+            # 其他异常也尝试使用OCR模式
+            self.log_remotely("WARNING", f"PDF解析异常，尝试使用OCR模式处理, 错误: {e}", {
+                "article_id": article_id,
+                "error_type": "parse_error",
+                "fallback_mode": "ocr"
+            })
+            try:
+                used_method = 'ocr'
+                infer_result = self.analyze_pdf(ds, True, article_id, content_hash)
+                pipe_result = infer_result.pipe_ocr_mode(image_writer)
+            except Exception as ocr_error:
+                # OCR模式也失败，记录错误并抛出
+                self.log_remotely("ERROR", f"OCR模式处理也失败: {ocr_error}", {
+                    "article_id": article_id,
+                    "original_error": str(e),
+                    "ocr_error": str(ocr_error)
+                })
+                raise ocr_error
+
+        return pipe_result, infer_result, used_method
+
+    def analyze_pdf(self, ds, ocr, article_id, content_hash):
+        """
+        对PDF执行模型推理
+        启用检查点时按页码区间分段推理，每完成一个区间即保存推理结果，
+        重试时直接加载已完成的区间，只推理剩余页面；未启用检查点但启用状态接口时按status.progress_pages分段推理，
+        每完成一段更新已处理页数，状态接口不会把长时间的推理误判为停滞；
+        启用多节点协同处理时，页数达到阈值的文档由多个节点分区间推理
+        Args:
+            ds: PymuDocDataset实例
+            ocr: 是否使用OCR模式
+            article_id: 文章ID
+            content_hash: PDF内容哈希
+        Returns:
+            InferenceResult推理结果
+        """
+        import_magic_pdf(with_models=self.inference_client is None)
+        page_count = len(ds)
+        self.status.set_pages(pages_total=page_count, pages_processed=0)
+        profiler = self.current_profiler()
+        # 检查点区间需在重试之间保持一致，未启用检查点时才使用性能分析的区间大小
+        if self.checkpoint_enabled:
+            range_pages = self.checkpoint_pages
+        else:
+            # 只在启用状态接口时为报告进度分段推理，未启用时不改变推理的批量大小
+            range_pages = ((profiler.pages_per_range if profiler is not None else 0)
+                           or (self.progress_pages if self.status_enabled else 0))
+        if not range_pages or page_count <= range_pages:
+            started_at = time.time()
+            infer_result = self.infer_pages(ds, ocr)
+            if profiler is not None:
+                profiler.record_pages(0, page_count - 1, time.time() - started_at)
+            self.status.set_pages(pages_processed=page_count)
+            return infer_result
+
+        parse_method = 'ocr' if ocr else 'txt'
+        if (self.subtask_queue is not None and self.checkpoint_enabled
+                and page_count >= self.distributed_config.get('min_pages', 200)):
+            return InferenceResult(self.analyze_pdf_distributed(ds, ocr, article_id, content_hash, range_pages), ds)
+
+        model_list = []
+        resumed_pages = 0
+        for start_page in range(0, page_count, range_pages):
+            end_page = min(start_page + range_pages, page_count) - 1
+            page_results = None
+            if self.checkpoint_enabled:
+                page_results = self.load_checkpoint_range(article_id, content_hash, parse_method, start_page, end_page)
+
+            if page_results is not None:
+                resumed_pages += len(page_results)
+            else:
+                page_results = self.infer_range(ds, ocr, article_id, content_hash, start_page, end_page)
+            model_list.extend(page_results)
+            self.status.set_pages(add=len(page_results))
+
+        if resumed_pages:
+            self.log_remotely("INFO", f"从检查点恢复 {resumed_pages}/{page_count} 页推理结果, 文章ID: {article_id}", {
+                "article_id": article_id,
+                "resumed_pages": resumed_pages,
+                "page_count": page_count
+            })
+        return InferenceResult(model_list, ds)
+
+    def analyze_pdf_distributed(self, ds, ocr, article_id, content_hash, range_pages):
+        """
+        多节点协同推理超大文档
+        将各页码区间发布为子任务后，本节点也按顺序认领并推理区间；其他节点认领的区间等待其保存检查点，
+        等待期间让出推理阶段的名额和推理锁，认领超时的区间由本节点接管；超过总等待时间后不再等待，剩余区间由本节点直接推理；
+        全部区间完成后按页码顺序合并推理结果
+        Args:
+            ds: PymuDocDataset实例
+            ocr: 是否使用OCR模式
+            article_id: 文章ID
+            content_hash: PDF内容哈希
+            range_pages: 每个区间的页数
+        Returns:
+            按页码顺序合并的每页推理结果列表
+        """
+        page_count = len(ds)
+        parse_method = 'ocr' if ocr else 'txt'
+        claim_ttl = self.distributed_config.get('claim_ttl', 1800)
+        deadline = time.time() + self.distributed_config.get('wait_timeout', 7200)
+        ranges = [(start_page, min(start_page + range_pages, page_count) - 1)
+                  for start_page in range(0, page_count, range_pages)]
+        results = {}
+        for start_page, end_page in ranges:
+            page_results = self.load_checkpoint_range(article_id, content_hash, parse_method, start_page, end_page)
+            if page_results is not None:
+                results[(start_page, end_page)] = page_results
+                self.status.set_pages(add=len(page_results))
+
+        pending = [page_range for page_range in ranges if page_range not in results]
+        if pending:
+            # 其他节点从检查点存储读取PDF原文件
+            self.checkpoint_store.save_source(article_id, content_hash, ds.data_bits())
+            for start_page, end_page in pending:
+                self.subtask_queue.put({
+                    'article_id': article_id,
+                    'content_hash': content_hash,
+                    'parse_method': parse_method,
+                    'start_page': start_page,
+                    'end_page': end_page
+                })
+            self.log_remotely("INFO", f"发布 {len(pending)} 个页码区间子任务, 文章ID: {article_id}", {
+                "article_id": article_id,
+                "subtask_count": len(pending),
+                "page_count": page_count
+            })
+
+        local_ranges = 0
+        while pending:
+            waiting = []
+            expired = time.time() >= deadline
+            if expired:
+                self.log_remotely("WARNING", f"等待其他节点超时，本节点推理剩余 {len(pending)} 个区间, 文章ID: {article_id}", {
+                    "article_id": article_id,
+                    "pending_ranges": len(pending)
+                })
+            for start_page, end_page in pending:
+                page_results = self.load_checkpoint_range(article_id, content_hash, parse_method, start_page, end_page)
+                if page_results is None and expired:
+                    page_results = self.infer_range(ds, ocr, article_id, content_hash, start_page, end_page)
+                    local_ranges += 1
+                elif page_results is None and self.checkpoint_store.claim_range(
+                        article_id, content_hash, parse_method, start_page, end_page, self.node_id, claim_ttl):
+                    page_results = self.infer_claimed_range(ds, ocr, article_id, content_hash, start_page, end_page)
+                    local_ranges += 1
+                if page_results is None:
+                    waiting.append((start_page, end_page))
+                else:
+                    results[(start_page, end_page)] = page_results
+                    self.status.set_pages(add=len(page_results))
+            pending = waiting
+            if pending:
+                # 等待期间让出推理名额和推理锁，本节点的其他文档可以继续推理
+                with self.released_stage('inference'):
+                    time.sleep(self.distributed_config.get('poll_interval', 5))
+
+        self.log_remotely("INFO", f"多节点协同推理完成，本节点推理 {local_ranges}/{len(ranges)} 个区间, 文章ID: {article_id}", {
+            "article_id": article_id,
+            "local_ranges": local_ranges,
+            "range_count": len(ranges)
+        })
+        return [page for page_range in ranges for page in results[page_range]]
+
+    def load_checkpoint_range(self, article_id, content_hash, parse_method, start_page, end_page):
+        """
+        读取页码区间的检查点，读取失败时视为未完成
+        Returns:
+            该区间每页的推理结果列表，不存在或读取失败时返回None
+        """
+        try:
+            return self.checkpoint_store.load_range(article_id, content_hash, parse_method, start_page, end_page)
+        except Exception as e:
+            self.log_remotely("WARNING", f"读取检查点失败，重新推理该区间: {e}", {
+                "article_id": article_id,
+                "start_page": start_page,
+                "end_page": end_page
+            })
+            return None
+
+    def infer_range(self, ds, ocr, article_id, content_hash, start_page, end_page):
+        """
+        推理一个页码区间，启用检查点时保存该区间的推理结果
+        Args:
+            ds: PymuDocDataset实例
+            ocr: 是否使用OCR模式
+            article_id: 文章ID
+            content_hash: PDF内容哈希
+            start_page: 起始页码（包含）
+            end_page: 结束页码（包含）
+        Returns:
+            该区间每页的推理结果列表
+        """
+        page_count = len(ds)
+        profiler = self.current_profiler()
+        started_at = time.time()
+        infer_result = self.infer_pages(ds, ocr, start_page, end_page)
+        page_results = infer_result.get_infer_res()[start_page:end_page + 1]
+        if profiler is not None:
+            profiler.record_pages(start_page, end_page, time.time() - started_at)
+        if self.checkpoint_enabled:
+            try:
+                self.checkpoint_store.save_range(
+                    article_id, content_hash, 'ocr' if ocr else 'txt', start_page, end_page, page_results
+                )
+            except Exception as e:
+                self.log_remotely("WARNING", f"保存检查点失败: {e}", {
+                    "article_id": article_id,
+                    "start_page": start_page,
+                    "end_page": end_page
+                })
+        self.log_remotely("INFO", f"完成页码区间推理 {start_page}-{end_page}/{page_count}, 文章ID: {article_id}", {
+            "article_id": article_id,
+            "start_page": start_page,
+            "end_page": end_page,
+            "page_count": page_count
+        })
+        return page_results
+
+    def process_subtask(self, task):
+        """
+        推理其他节点发布的页码区间子任务
+        文档已处理完成、区间已完成或已被其他节点认领时跳过
+        Args:
+            task: 子任务字典，包含article_id、content_hash、parse_method、start_page和end_page
+        Returns:
+            本节点推理了该区间时返回True
+        """
+        article_id = task['article_id']
+        content_hash = task['content_hash']
+        parse_method = task['parse_method']
+        start_page = task['start_page']
+        end_page = task['end_page']
+        pdf_bytes = self.checkpoint_store.load_source(article_id, content_hash)
+        if pdf_bytes is None:
+            return False
+
+        import_magic_pdf(with_models=self.inference_client is None)
+        ds = PymuDocDataset(pdf_bytes)
+        # 取得推理执行名额后再认领，避免认领后长时间等待本节点正在推理的文档
+        with self.stage('inference'):
+            if self.load_checkpoint_range(article_id, content_hash, parse_method, start_page, end_page) is not None:
+                return False
+            if not self.checkpoint_store.claim_range(article_id, content_hash, parse_method, start_page, end_page,
+                                                     self.node_id, self.distributed_config.get('claim_ttl', 1800)):
+                return False
+            self.log_remotely("INFO", f"认领页码区间子任务 {start_page}-{end_page}, 文章ID: {article_id}", {
+                "article_id": article_id,
+                "start_page": start_page,
+                "end_page": end_page
+            })
+            self.infer_claimed_range(ds, parse_method == 'ocr', article_id, content_hash, start_page, end_page)
+        return True
+
+    def infer_claimed_range(self, ds, ocr, article_id, content_hash, start_page, end_page):
+        """
+        推理本节点已认领的页码区间，完成后停止认领续期，推理失败时释放认领
+        Args:
+            ds: PymuDocDataset实例
+            ocr: 是否使用OCR模式
+            article_id: 文章ID
+            content_hash: PDF内容哈希
+            start_page: 起始页码（包含）
+            end_page: 结束页码（包含）
+        Returns:
+            该区间每页的推理结果列表
+        """
+        parse_method = 'ocr' if ocr else 'txt'
+        try:
+            page_results = self.infer_range(ds, ocr, article_id, content_hash, start_page, end_page)
+        except Exception:
+            with contextlib.suppress(Exception):
+                self.checkpoint_store.release_range(article_id, content_hash, parse_method,
+                                                    start_page, end_page, self.node_id)
+            raise
+        self.checkpoint_store.finish_range(article_id, content_hash, parse_method, start_page, end_page, self.node_id)
+        return page_results
+
+    def subtask_loop(self):
+        """
+        接收并处理页码区间子任务，直到服务停止
+        子任务处理失败时不重新发布，由发布子任务的节点在认领超时后接管该区间
+        """
+        while not self.subtask_stop.is_set():
+            try:
+                item = self.subtask_queue.get(wait_seconds=self.wait_seconds)
+                if item is None:
+                    continue
+                handle, task = item
+                try:
+                    self.process_subtask(task)
+                finally:
+                    self.subtask_queue.done(handle)
+            except Exception as e:
+                self.log_remotely("ERROR", f"处理页码区间子任务失败: {e}", {"exception_type": type(e).__name__, "exc_info": True})
+                self.subtask_stop.wait(self.distributed_config.get('poll_interval', 5))
+
+    def infer_pages(self, ds, ocr, start_page_id=None, end_page_id=None):
+        """
+        对PDF的全部页面或指定页码区间执行模型推理，启用共享推理服务时由推理服务执行
+        Args:
+            ds: PymuDocDataset实例
+            ocr: 是否使用OCR模式
+            start_page_id: 起始页码，为空时推理全部页面
+            end_page_id: 结束页码（包含）
+        Returns:
+            InferenceResult推理结果
+        """
+        if self.inference_client is not None:
+            page_cache = None
+            if isinstance(ds, CachedPageDataset):
+                page_cache = {'dir': ds.cache.cache_dir, 'key': ds.key, 'page_offset': ds.page_offset,
+                              'max_bytes': ds.cache.max_bytes}
+            if start_page_id is None:
+                model_list = self.inference_client.analyze(ds.data_bits(), ocr, page_count=len(ds), page_cache=page_cache)
+                return InferenceResult(model_list, ds)
+            # 只发送区间内的页面，推理服务无需接收和解析整个文档
+            pdf_bytes, page_count, end_page_id = slice_pdf_pages(ds.data_bits(), start_page_id, end_page_id)
+            range_pages = end_page_id - start_page_id + 1
+            if page_cache is not None:
+                page_cache['page_offset'] += start_page_id
+            model_list = self.inference_client.analyze(pdf_bytes, ocr, page_count=range_pages, page_cache=page_cache)
+            return InferenceResult(expand_page_results(model_list[:range_pages], page_count, start_page_id), ds)
+        if start_page_id is None:
+            return ds.apply(doc_analyze, ocr=ocr)
+        return ds.apply(doc_analyze, ocr=ocr, start_page_id=start_page_id, end_page_id=end_page_id)
 
     def download_file(self, url, local_path):
         """
@@ -413,13 +4475,15 @@ class PDFProcessService:
 
     def upload_results(self, article_id, result, markdown_oss_file, images_oss_path, json_oss_path):
         """
-        上传处理结果到OSS
+        上传处理结果到OSS，结果中路径为None的产物未被请求，不上传
         Args:
             article_id: 文章ID
             result: 处理结果字典
             markdown_oss_path: Markdown文件的OSS路径
             images_oss_path: 图片文件的OSS路径
             json_oss_path: JSON文件的OSS路径
+        Returns:
+            按上传顺序排列的OSS对象路径列表
         """
         try:
             self.log_remotely("INFO", f"开始上传处理结果到OSS, 文章ID: {article_id}", {
@@ -427,30 +4491,37 @@ class PDFProcessService:
                 "markdown_oss_file": markdown_oss_file,
                 "images_oss_path": images_oss_path
             })
+            uploaded = []
             
             # 上传Markdown文件
-            self.bucket.put_object_from_file(
-                markdown_oss_file,
-                result['markdown_path']
-            )
+            if result['markdown_path']:
+                self.bucket.put_object_from_file(
+                    markdown_oss_file,
+                    result['markdown_path']
+                )
+                uploaded.append(markdown_oss_file)
             
             # 上传JSON文件
             # 上传中间JSON文件
-            json_middle_name = os.path.basename(result['json_middle_path'])
-            self.bucket.put_object_from_file(
-                os.path.join(json_oss_path, json_middle_name),
-                result['json_middle_path']
-            )
+            if result['json_middle_path']:
+                json_middle_name = os.path.basename(result['json_middle_path'])
+                self.bucket.put_object_from_file(
+                    os.path.join(json_oss_path, json_middle_name),
+                    result['json_middle_path']
+                )
+                uploaded.append(os.path.join(json_oss_path, json_middle_name))
             
             # 上传内容列表JSON文件
-            json_content_list_name = os.path.basename(result['json_content_list_path']) 
-            self.bucket.put_object_from_file(
-                os.path.join(json_oss_path, json_content_list_name),
-                result['json_content_list_path']
-            )
+            if result['json_content_list_path']:
+                json_content_list_name = os.path.basename(result['json_content_list_path']) 
+                self.bucket.put_object_from_file(
+                    os.path.join(json_oss_path, json_content_list_name),
+                    result['json_content_list_path']
+                )
+                uploaded.append(os.path.join(json_oss_path, json_content_list_name))
             
             # 上传图片文件(如果存在图片目录)
-            if os.path.exists(result['image_dir']):
+            if result['image_dir'] and os.path.exists(result['image_dir']):
                 for image_name in os.listdir(result['image_dir']):
                     if image_name.endswith(('.png', '.jpg', '.jpeg')):
                         image_path = os.path.join(result['image_dir'], image_name)
@@ -459,11 +4530,22 @@ class PDFProcessService:
                             oss_image_path,
                             image_path
                         )
+                        uploaded.append(oss_image_path)
+
+            # 上传缓存的版面结果和输出清单，输出清单最后上传，存在即表示本次结果已完整上传
+            for key in ('layout_path', 'manifest_path'):
+                if result.get(key):
+                    self.bucket.put_object_from_file(
+                        os.path.join(json_oss_path, os.path.basename(result[key])),
+                        result[key]
+                    )
+                    uploaded.append(os.path.join(json_oss_path, os.path.basename(result[key])))
                         
             self.log_remotely("INFO", f"处理结果上传完成, 文章ID: {article_id}", {
                 "article_id": article_id,
                 "status": "success"
             })
+            return uploaded
         except Exception as e:
             self.log_remotely("ERROR", f"上传处理结果失败: {e}", {
                 "article_id": article_id,
@@ -524,20 +4606,249 @@ class PDFProcessService:
         """
         current_time = time.time()
         if current_time - self.last_heartbeat_time >= self.log_heartbeat_period:  # 默认5分钟 = 300秒
-            self.log_remotely("INFO", "PDF处理服务心跳检测", {
+            heartbeat_fields = {
                 "uptime": current_time - self.start_time,
                 "memory_usage": psutil.Process().memory_info().rss / 1024 / 1024  # 转换为MB
-            })
+            }
+            heartbeat_message = "PDF处理服务心跳检测"
+            if self.concurrency_enabled:
+                heartbeat_fields["concurrency"] = json.dumps(self.concurrency.snapshot())
+                heartbeat_message += f", 并发状态: {heartbeat_fields['concurrency']}"
+            self.log_remotely("INFO", heartbeat_message, heartbeat_fields)
             self.last_heartbeat_time = current_time
 
+# 批量转换子进程中的服务实例，每个进程初始化一次
+_convert_service = None
+
+def _convert_worker_init(config_path):
+    """
+    批量转换子进程初始化，创建不连接MNS的服务实例
+    Args:
+        config_path: 配置文件路径
+    """
+    global _convert_service
+    setup_logging()
+    _convert_service = PDFProcessService(config_path, connect_mns=False)
+
+def _convert_one(task, output, force, mode='full'):
+    """
+    在子进程中转换单个PDF
+    Args:
+        task: 转换任务字典，包含article_id和pdf_path或pdf_url
+        output: 输出位置，本地目录或oss://前缀
+        force: 是否覆盖已存在的输出
+        mode: 解析模式，full、fast或auto，任务中的mode字段优先
+    Returns:
+        转换结果字典，包含status、页数和耗时
+    """
+    service = _convert_service
+    article_id = task['article_id']
+    started_at = time.time()
+    try:
+        outputs = resolve_outputs(task['outputs']) if 'outputs' in task else service.default_outputs
+        mode = resolve_mode(task.get('mode') or mode)
+        if output.startswith('oss://'):
+            prefix = output[len('oss://'):].strip('/')
+            markdown_oss_file = task.get('markdown_file', f'{prefix}/markdown/{article_id}.md')
+            images_oss_path = task.get('images_path', f'{prefix}/images/{article_id}')
+            json_oss_path = task.get('json_path', f'{prefix}/json/{article_id}')
+            # 输出清单最后上传，存在即表示上次转换已完整上传
+            manifest = None if force else service.load_manifest(json_oss_path, article_id)
+            markdown_dir = service.config['temp']['markdown_dir']
+            image_dir = service.config['temp']['image_dir'] + f'/{article_id}/'
+        else:
+            markdown_dir = os.path.join(output, article_id)
+            image_dir = os.path.join(output, article_id, 'images') + '/'
+            # 输出清单在结果文件全部写出后写入，只存在部分结果文件时重新转换
+            manifest = None
+            manifest_path = os.path.join(markdown_dir, f'{article_id}_manifest.json')
+            if not force and os.path.exists(manifest_path):
+                with open(manifest_path, 'r', encoding='utf-8') as f:
+                    manifest = json.load(f)
+        # 上次转换的产物覆盖本次请求的产物时跳过
+        if manifest is not None and outputs <= set(manifest.get('outputs', [])):
+            return {'article_id': article_id, 'status': 'skipped'}
+
+        pdf_path = task.get('pdf_path')
+        if not pdf_path:
+            pdf_path = os.path.join(service.config['temp']['pdf_dir'], f'{article_id}.pdf')
+            service.download_file(task['pdf_url'], pdf_path)
+
+        if mode == 'auto':
+            mode = 'fast' if choose_fast_path(inspect_pdf(pdf_path), service.fast_path_config) else 'full'
+        if mode == 'fast':
+            result = service.process_pdf_fast(pdf_path, article_id, image_dir, markdown_dir, outputs=outputs)
+        else:
+            result = service.process_pdf(pdf_path, article_id, image_dir, markdown_dir, outputs=outputs)
+        if output.startswith('oss://'):
+            service.upload_results(article_id, result, markdown_oss_file, images_oss_path, json_oss_path)
+        return {
+            'article_id': article_id,
+            'status': 'converted',
+            'pages': result.get('page_count', 0),
+            'elapsed': time.time() - started_at
+        }
+    except Exception as e:
+        return {
+            'article_id': article_id,
+            'status': 'failed',
+            'error': f'{type(e).__name__}: {e}',
+            'elapsed': time.time() - started_at
+        }
+
+def load_convert_tasks(input_path):
+    """
+    读取批量转换任务
+    支持PDF目录（递归查找.pdf文件）、JSON Lines清单（字段与MNS消息相同，
+    pdf_url可替换为本地pdf_path）和每行一个PDF路径的文本清单
+    Args:
+        input_path: 目录或清单文件路径
+    Returns:
+        转换任务字典列表
+    """
+    tasks = []
+    if os.path.isdir(input_path):
+        for root, dirs, files in os.walk(input_path):
+            dirs.sort()
+            for name in sorted(files):
+                if not name.lower().endswith('.pdf'):
+                    continue
+                pdf_path = os.path.join(root, name)
+                relative_path = os.path.splitext(os.path.relpath(pdf_path, input_path))[0]
+                tasks.append({
+                    'article_id': relative_path.replace(os.sep, '_'),
+                    'pdf_path': pdf_path
+                })
+        return tasks
+
+    with open(input_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            if line.startswith('{'):
+                tasks.append(json.loads(line))
+            else:
+                tasks.append({
+                    'article_id': os.path.splitext(os.path.basename(line))[0],
+                    'pdf_path': line
+                })
+    return tasks
+
+def default_convert_workers(mode, worker_memory_mb=6144):
+    """
+    计算批量转换的默认进程数
+    快速路径不加载模型，使用全部CPU核心；完整解析时每个进程各自加载一套模型，按可用内存限制进程数
+    Args:
+        mode: 解析模式，full、fast或auto
+        worker_memory_mb: 完整解析时每个进程预估占用的内存(MB)
+    Returns:
+        进程数
+    """
+    cpu_count = os.cpu_count() or 1
+    if mode == 'fast':
+        return cpu_count
+    available_mb = psutil.virtual_memory().available / 1024 / 1024
+    return max(1, min(cpu_count, int(available_mb // worker_memory_mb)))
+
+def run_convert(config_path, input_path, output, workers=None, force=False, mode='full'):
+    """
+    本地批量转换，使用进程池并行调用process_pdf，结束后输出吞吐统计
+    Args:
+        config_path: 配置文件路径
+        input_path: PDF目录或清单文件路径
+        output: 输出位置，本地目录或oss://前缀
+        workers: 进程数，默认按可用内存和convert.worker_memory_mb计算（快速路径使用全部CPU核心）
+        force: 是否覆盖已存在的输出
+        mode: 解析模式，full、fast或auto
+    Returns:
+        统计信息字典
+    """
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+
+    tasks = load_convert_tasks(input_path)
+    if not workers:
+        with open(config_path, 'r') as f:
+            convert_config = (yaml.safe_load(f) or {}).get('convert', {})
+        workers = default_convert_workers(mode, convert_config.get('worker_memory_mb', 6144))
+    stats = {'total': len(tasks), 'converted': 0, 'skipped': 0, 'failed': 0, 'pages': 0}
+    logger.info(f"开始批量转换 {len(tasks)} 个PDF, 进程数: {workers}, 输出位置: {output}")
+
+    started_at = time.time()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_convert_worker_init,
+                             initargs=(config_path,)) as executor:
+        futures = [executor.submit(_convert_one, task, output, force, mode) for task in tasks]
+        for done, future in enumerate(as_completed(futures), 1):
+            result = future.result()
+            stats[result['status']] += 1
+            stats['pages'] += result.get('pages', 0)
+            if result['status'] == 'failed':
+                logger.error(f"[{done}/{len(tasks)}] 转换失败 {result['article_id']}: {result['error']}")
+            else:
+                logger.info(f"[{done}/{len(tasks)}] {result['status']} {result['article_id']}")
+
+    elapsed = time.time() - started_at
+    stats['elapsed'] = round(elapsed, 1)
+    stats['articles_per_minute'] = round(stats['converted'] / elapsed * 60, 2) if elapsed else 0
+    stats['pages_per_second'] = round(stats['pages'] / elapsed, 2) if elapsed else 0
+    print(
+        f"批量转换完成: 共 {stats['total']} 个, 转换 {stats['converted']} 个, "
+        f"跳过 {stats['skipped']} 个, 失败 {stats['failed']} 个, 耗时 {stats['elapsed']} 秒, "
+        f"{stats['articles_per_minute']} 篇/分钟, {stats['pages_per_second']} 页/秒"
+    )
+    return stats
+
+def run_inference_server(config_path):
+    """
+    启动共享推理服务并阻塞运行，收到SIGTERM或Ctrl+C时退出
+    Args:
+        config_path: 配置文件路径
+    """
+    with open(config_path, 'r', encoding='utf-8') as f:
+        config = yaml.safe_load(f)
+    inference_server_config = config.get('inference_server', {})
+    server = InferenceServer(
+        inference_server_config.get('address', DEFAULT_INFERENCE_ADDRESS),
+        resolve_inference_authkey(inference_server_config, create=True),
+        batch_size=inference_server_config.get('batch_size', 32),
+        max_wait=inference_server_config.get('max_wait', 0.05)
+    )
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    server.start()
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+        logger.info("共享推理服务已停止")
+
 if __name__ == '__main__':
     parser = argparse.ArgumentParser(description='PDF处理服务')
     parser.add_argument('--config', '-c', type=str, default='config/config.yaml', help='配置文件路径')
     parser.add_argument('--wait-seconds', '-w', type=int, default=30, help='消息队列等待时长(秒)')
     parser.add_argument('--max-runtime', '-m', type=int, default=3600*6, help='最大运行时长(秒)')
     parser.add_argument('--log-heartbeat-period', '-l', type=int, default=300, help='心跳检测周期(秒)')
+    subparsers = parser.add_subparsers(dest='command')
+    convert_parser = subparsers.add_parser('convert', help='本地批量转换PDF目录或清单')
+    convert_parser.add_argument('input', type=str, help='PDF目录或清单文件(.jsonl/.txt)路径')
+    convert_parser.add_argument('--output', '-o', type=str, required=True, help='输出目录或oss://前缀')
+    convert_parser.add_argument('--workers', '-j', type=int, default=None, help='进程数，默认按可用内存计算')
+    convert_parser.add_argument('--force', action='store_true', help='覆盖已存在的输出')
+    convert_parser.add_argument('--mode', type=str, choices=['full', 'fast', 'auto'], default='full',
+                                help='解析模式：full完整模型流程，fast只使用PyMuPDF，auto按预检结果选择')
+    subparsers.add_parser('serve-inference', help='启动共享推理服务，供同一节点上的服务进程共用模型')
     args = parser.parse_args()
+    setup_logging()
+
+    if args.command == 'convert':
+        stats = run_convert(args.config, args.input, args.output, args.workers, args.force, args.mode)
+        sys.exit(1 if stats['failed'] else 0)
+    if args.command == 'serve-inference':
+        run_inference_server(args.config)
+        sys.exit(0)
 
     logger.info("开始启动PDF处理服务")
     service = PDFProcessService(args.config, args.wait_seconds, args.max_runtime, args.log_heartbeat_period)
-    service.start() 
\ No newline at end of file
+    service.start()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+性能测试语料生成脚本
+生成tests/perf/corpus下的PDF文件，内容固定，语料需要调整时修改本脚本重新生成并更新基线
+"""
+
+import os
+import random
+import fitz
+
+CORPUS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'corpus')
+
+WORDS = ('model layout table figure result method dataset training inference page section value '
+         'analysis document extraction accuracy baseline experiment sample feature network').split()
+
+
+def paragraph(rng, sentences=6):
+    """
+    生成一段固定随机种子的英文正文
+    """
+    return ' '.join(
+        ' '.join(rng.choice(WORDS) for _ in range(rng.randint(8, 16))).capitalize() + '.'
+        for _ in range(sentences)
+    )
+
+
+def figure(rng, width=160, height=120):
+    """
+    生成一张带色块的图片
+    """
+    pixmap = fitz.Pixmap(fitz.csRGB, fitz.IRect(0, 0, width, height), False)
+    pixmap.set_rect(pixmap.irect, (255, 255, 255))
+    for _ in range(6):
+        x, y = rng.randint(0, width - 40), rng.randint(0, height - 30)
+        pixmap.set_rect(fitz.IRect(x, y, x + 40, y + 30), (rng.randint(0, 255), rng.randint(0, 255), rng.randint(0, 255)))
+    return pixmap
+
+
+def make_pdf(path, page_count, images_per_page=0, seed=0):
+    """
+    生成带标题、正文和图片的PDF
+    Args:
+        path: 输出路径
+        page_count: 页数
+        images_per_page: 每页图片数
+        seed: 随机种子
+    """
+    rng = random.Random(seed)
+    doc = fitz.open()
+    for page_no in range(page_count):
+        page = doc.new_page()
+        y = 60
+        if page_no == 0:
+            page.insert_text((50, y), 'Benchmark Document', fontsize=24)
+            y += 40
+        page.insert_text((50, y), f'Section {page_no + 1}', fontsize=15)
+        y += 15
+        text_height = 620 if not images_per_page else 300
+        page.insert_textbox(fitz.Rect(50, y, 550, y + text_height), paragraph(rng, 12), fontsize=10)
+        y += text_height + 10
+        for i in range(images_per_page):
+            x = 50 + i * 170
+            page.insert_image(fitz.Rect(x, y, x + 160, y + 120), pixmap=figure(rng))
+    doc.set_metadata({'title': os.path.basename(path), 'creationDate': '', 'modDate': '', 'producer': ''})
+    doc.save(path, garbage=4, deflate=True, no_new_id=True)
+    doc.close()
+
+
+def main():
+    """
+    生成全部语料
+    """
+    os.makedirs(CORPUS_DIR, exist_ok=True)
+    make_pdf(os.path.join(CORPUS_DIR, 'text_short.pdf'), 4, seed=1)
+    make_pdf(os.path.join(CORPUS_DIR, 'text_long.pdf'), 60, seed=2)
+    make_pdf(os.path.join(CORPUS_DIR, 'figures.pdf'), 8, images_per_page=3, seed=3)
+    make_pdf(os.path.join(CORPUS_DIR, 'mixed.pdf'), 20, images_per_page=1, seed=4)
+
+
+if __name__ == '__main__':
+    main()
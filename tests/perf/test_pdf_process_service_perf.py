@@ -0,0 +1,384 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+性能回归测试脚本
+在tests/perf/corpus的固定语料上运行process_pdf_fast、process_pdf和upload_results，
+记录各阶段的耗时、每秒页数、峰值内存增量和输出大小，超出baseline.json基线容差时失败；
+耗时基线按固定CPU负载的校准耗时换算到当前机器，不同机器上可以使用同一份基线
+
+默认跳过，设置环境变量后运行:
+    PDF2MD_PERF=1 python -m pytest -s tests/perf
+更新基线:
+    PDF2MD_PERF=1 PDF2MD_PERF_UPDATE=1 python -m pytest -s tests/perf
+"""
+
+import sys
+import os
+import io
+import json
+import time
+import zlib
+import logging
+import itertools
+import yaml
+import shutil
+import tempfile
+import threading
+import unittest
+import importlib.util
+from unittest.mock import patch
+import psutil
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from src.pdf_process_service import PDFProcessService, logger
+
+PERF_DIR = os.path.dirname(os.path.abspath(__file__))
+CORPUS_DIR = os.path.join(PERF_DIR, 'corpus')
+BASELINE_PATH = os.path.join(PERF_DIR, 'baseline.json')
+
+# 与基线比较的指标，每秒页数由耗时换算，只记录不单独比较
+COMPARED_METRICS = ('wall_time', 'peak_rss_mb', 'output_bytes')
+
+
+class LocalBucket:
+    """
+    OSS Bucket的本地替身，对象写入本地目录
+    """
+
+    def __init__(self, root):
+        """
+        初始化本地Bucket
+        Args:
+            root: 对象存储目录
+        """
+        self.root = root
+
+    def object_path(self, key):
+        """
+        获取对象的本地路径
+        """
+        path = os.path.join(self.root, key.lstrip('/'))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        return path
+
+    def put_object_from_file(self, key, filename):
+        """
+        上传本地文件
+        """
+        shutil.copyfile(filename, self.object_path(key))
+
+    def put_object(self, key, data, headers=None):
+        """
+        上传对象内容
+        """
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        with open(self.object_path(key), 'wb') as f:
+            f.write(data)
+
+    def get_object(self, key):
+        """
+        读取对象内容
+        """
+        with open(self.object_path(key), 'rb') as f:
+            return io.BytesIO(f.read())
+
+
+class StageMeter:
+    """
+    阶段性能计量，在后台线程中采样进程RSS，记录耗时和相对阶段开始时的峰值内存增量
+    """
+
+    def __init__(self, interval=0.005):
+        """
+        初始化计量器
+        Args:
+            interval: RSS采样间隔(秒)
+        """
+        self.interval = interval
+        self.process = psutil.Process()
+        self.wall_time = 0
+        self.peak_rss_mb = 0
+
+    def sample(self):
+        """
+        采样RSS直到阶段结束
+        """
+        while not self.done.wait(self.interval):
+            self.peak_rss = max(self.peak_rss, self.process.memory_info().rss)
+
+    def __enter__(self):
+        self.done = threading.Event()
+        self.start_rss = self.peak_rss = self.process.memory_info().rss
+        self.sampler = threading.Thread(target=self.sample, daemon=True)
+        self.sampler.start()
+        self.started_at = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.wall_time = time.perf_counter() - self.started_at
+        self.done.set()
+        self.sampler.join()
+        self.peak_rss = max(self.peak_rss, self.process.memory_info().rss)
+        self.peak_rss_mb = (self.peak_rss - self.start_rss) / 1024 / 1024
+        return False
+
+
+def directory_size(*paths):
+    """
+    统计目录下全部文件的字节数
+    """
+    total = 0
+    for path in paths:
+        for root, _, files in os.walk(path):
+            total += sum(os.path.getsize(os.path.join(root, name)) for name in files)
+    return total
+
+
+def calibrate(repeat=5):
+    """
+    运行固定的CPU负载（JSON序列化和zlib压缩），返回最短耗时，用于将耗时基线换算到当前机器
+    Args:
+        repeat: 运行次数
+    Returns:
+        最短耗时(秒)
+    """
+    data = json.dumps([{'page_no': i, 'text': f'calibration page {i} ' * 20} for i in range(2000)])
+    best = None
+    for _ in range(repeat):
+        started_at = time.perf_counter()
+        for _ in range(5):
+            zlib.compress(json.dumps(json.loads(data)).encode('utf-8'))
+        elapsed = time.perf_counter() - started_at
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def find_regressions(stage, measured, baseline, speed=1.0):
+    """
+    将测量结果与基线比较
+    上限为基线乘以容差倍数再加上固定余量，且不低于下限；耗时基线先乘以机器速度比，
+    耗时没有固定余量，只设绝对下限，毫秒级阶段的调度和文件系统抖动不会造成误报
+    Args:
+        stage: 阶段名称
+        measured: {文档名: 指标字典}
+        baseline: 基线文件内容
+        speed: 当前机器与记录基线的机器的校准耗时之比，大于1表示当前机器更慢
+    Returns:
+        超出容差的指标描述和缺少基线的文档列表
+    """
+    regressions = []
+    stage_baseline = baseline.get('stages', {}).get(stage, {})
+    for name, metrics in measured.items():
+        expected = stage_baseline.get(name)
+        if expected is None:
+            regressions.append(f'{stage}/{name}: 缺少基线，使用PDF2MD_PERF_UPDATE=1更新基线')
+            continue
+        for metric in COMPARED_METRICS:
+            scale = speed if metric == 'wall_time' else 1.0
+            limit = expected[metric] * scale * baseline['tolerance'][metric] + baseline['slack'].get(metric, 0)
+            limit = max(limit, baseline.get('floor', {}).get(metric, 0))
+            if metrics[metric] > limit:
+                regressions.append(f'{stage}/{name} {metric}: {metrics[metric]:.4g} > {limit:.4g} (基线 {expected[metric]:.4g})')
+    return regressions
+
+
+class TestFindRegressions(unittest.TestCase):
+    """
+    基线比较测试类
+    """
+
+    def test_find_regressions(self):
+        """
+        测试超出容差和余量的指标被报告，没有基线的文档作为失败报告
+        """
+        baseline = {
+            'tolerance': {'wall_time': 2.0, 'peak_rss_mb': 1.5, 'output_bytes': 1.1},
+            'slack': {'peak_rss_mb': 32, 'output_bytes': 1024},
+            'floor': {'wall_time': 0.02},
+            'stages': {'upload_results': {'a.pdf': {'wall_time': 1.0, 'peak_rss_mb': 10, 'output_bytes': 1000}}}
+        }
+        measured = {
+            'a.pdf': {'wall_time': 2.1, 'peak_rss_mb': 47, 'output_bytes': 2100},
+            'b.pdf': {'wall_time': 100, 'peak_rss_mb': 1000, 'output_bytes': 10 ** 9}
+        }
+        regressions = find_regressions('upload_results', measured, baseline)
+        self.assertEqual(len(regressions), 2)
+        self.assertTrue(regressions[0].startswith('upload_results/a.pdf wall_time'))
+        self.assertTrue(regressions[1].startswith('upload_results/b.pdf: 缺少基线'))
+
+        measured['a.pdf']['output_bytes'] = 2125
+        self.assertEqual(len(find_regressions('upload_results', measured, baseline)), 3)
+
+        # 耗时基线按机器速度比换算
+        measured = {'a.pdf': {'wall_time': 3.0, 'peak_rss_mb': 0, 'output_bytes': 0}}
+        self.assertEqual(len(find_regressions('upload_results', measured, baseline)), 1)
+        self.assertEqual(find_regressions('upload_results', measured, baseline, speed=2.0), [])
+
+        # 毫秒级阶段的耗时上限不低于绝对下限
+        baseline['stages']['upload_results']['a.pdf']['wall_time'] = 0.005
+        measured['a.pdf']['wall_time'] = 0.015
+        self.assertEqual(find_regressions('upload_results', measured, baseline), [])
+        measured['a.pdf']['wall_time'] = 0.025
+        self.assertEqual(len(find_regressions('upload_results', measured, baseline)), 1)
+
+
+@unittest.skipUnless(os.environ.get('PDF2MD_PERF'), '设置PDF2MD_PERF=1后运行性能回归测试')
+class TestPipelinePerformance(unittest.TestCase):
+    """
+    处理流程性能回归测试类
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        """
+        使用本地Bucket初始化服务，MNS队列和主题在这些阶段中不使用，不初始化；
+        在临时目录中运行且不配置日志文件，不在工作目录写入日志，也不向标准输出打印处理日志
+        """
+        cls.temp_dir = tempfile.mkdtemp()
+        cls.cwd = os.getcwd()
+        os.chdir(cls.temp_dir)
+        cls.log_level = logger.level
+        logger.setLevel(logging.WARNING)
+        cls.config_path = os.path.join(cls.temp_dir, 'test_config.yaml')
+        config = {
+            'oss': {
+                'endpoint': 'https://oss-cn-hangzhou.aliyuncs.com',
+                'access_id': 'test_access_id',
+                'access_key': 'test_access_key',
+                'bucket_name': 'test_bucket'
+            },
+            'temp': {
+                'pdf_dir': os.path.join(cls.temp_dir, 'temp', 'pdf_dir'),
+                'image_dir': os.path.join(cls.temp_dir, 'temp', 'image_dir'),
+                'markdown_dir': os.path.join(cls.temp_dir, 'temp', 'markdown_dir')
+            }
+        }
+        with open(cls.config_path, 'w', encoding='utf-8') as f:
+            yaml.dump(config, f, default_flow_style=False, allow_unicode=True)
+
+        cls.bucket_dir = os.path.join(cls.temp_dir, 'bucket')
+        with patch('src.pdf_process_service.setup_logging'), \
+                patch('src.pdf_process_service.oss2.Auth'), \
+                patch('src.pdf_process_service.oss2.Bucket', return_value=LocalBucket(cls.bucket_dir)):
+            cls.service = PDFProcessService(cls.config_path, connect_mns=False)
+
+        cls.corpus = sorted(name for name in os.listdir(CORPUS_DIR) if name.endswith('.pdf'))
+        cls.repeat = int(os.environ.get('PDF2MD_PERF_REPEAT', 3))
+        cls.min_time = float(os.environ.get('PDF2MD_PERF_MIN_TIME', 0.5))
+        with open(BASELINE_PATH, 'r', encoding='utf-8') as f:
+            cls.baseline = json.load(f)
+        cls.calibration = calibrate()
+        cls.speed = cls.calibration / cls.baseline['calibration'] if cls.baseline.get('calibration') else 1.0
+        print(f"校准耗时 {cls.calibration:.4f}s，相对基线机器的速度比 {cls.speed:.2f}")
+        cls.fast_results = {}
+
+    @classmethod
+    def tearDownClass(cls):
+        """
+        测试后的清理工作，更新基线时写回baseline.json
+        """
+        os.chdir(cls.cwd)
+        logger.setLevel(cls.log_level)
+        shutil.rmtree(cls.temp_dir, ignore_errors=True)
+        if os.environ.get('PDF2MD_PERF_UPDATE'):
+            cls.baseline['calibration'] = round(cls.calibration, 4)
+            with open(BASELINE_PATH, 'w', encoding='utf-8') as f:
+                json.dump(cls.baseline, f, ensure_ascii=False, indent=2, sort_keys=True)
+                f.write('\n')
+
+    def measure(self, stage, run):
+        """
+        对每篇语料先预热运行一次，再重复运行阶段，取最短耗时和最大内存增量，并与基线比较；
+        耗时很短的阶段重复运行到累计耗时不少于min_time秒，使最短耗时不受偶发抖动影响；
+        阶段没有基线时失败，需先使用PDF2MD_PERF_UPDATE=1记录基线
+        Args:
+            stage: 阶段名称
+            run: 函数run(pdf_path, article_id, work_dir)，返回(页数, 输出字节数)
+        """
+        updating = bool(os.environ.get('PDF2MD_PERF_UPDATE'))
+        if not updating and stage not in self.baseline.get('stages', {}):
+            self.fail(f'基线中没有{stage}阶段，使用PDF2MD_PERF_UPDATE=1记录基线后提交baseline.json')
+        measured = {}
+        for name in self.corpus:
+            article_id = os.path.splitext(name)[0]
+            metrics = None
+            # 预热运行，排除首次加载字体、分配缓存等一次性开销
+            run(os.path.join(CORPUS_DIR, name), article_id, os.path.join(self.temp_dir, stage, article_id, 'warmup'))
+            total_time = 0
+            for i in itertools.count():
+                if i >= self.repeat and total_time >= self.min_time:
+                    break
+                work_dir = os.path.join(self.temp_dir, stage, article_id, str(i))
+                with StageMeter() as meter:
+                    page_count, output_bytes = run(os.path.join(CORPUS_DIR, name), article_id, work_dir)
+                if metrics is None:
+                    metrics = {'wall_time': meter.wall_time, 'peak_rss_mb': meter.peak_rss_mb}
+                metrics['wall_time'] = min(metrics['wall_time'], meter.wall_time)
+                metrics['peak_rss_mb'] = max(metrics['peak_rss_mb'], meter.peak_rss_mb)
+                metrics['output_bytes'] = output_bytes
+                total_time += meter.wall_time
+            metrics['pages_per_sec'] = page_count / metrics['wall_time'] if metrics['wall_time'] else 0
+            measured[name] = metrics
+            print(f"{stage:<20} {name:<16} {metrics['wall_time']:8.4f}s {metrics['pages_per_sec']:9.1f} 页/秒 "
+                  f"{metrics['peak_rss_mb']:7.1f}MB {metrics['output_bytes']:10d}B")
+
+        if updating:
+            self.baseline.setdefault('stages', {})[stage] = {
+                name: {key: round(value, 4) for key, value in metrics.items()} for name, metrics in measured.items()
+            }
+            return
+        regressions = find_regressions(stage, measured, self.baseline, self.speed)
+        self.assertFalse(regressions, '性能回归:\n' + '\n'.join(regressions))
+
+    def run_fast(self, pdf_path, article_id, work_dir):
+        """
+        运行快速解析阶段
+        """
+        image_dir = os.path.join(work_dir, 'images')
+        markdown_dir = os.path.join(work_dir, 'markdown')
+        result = self.service.process_pdf_fast(pdf_path, article_id, image_dir, markdown_dir)
+        self.fast_results[article_id] = result
+        return result['page_count'], directory_size(image_dir, markdown_dir)
+
+    def test_1_process_pdf_fast(self):
+        """
+        测试快速解析路径的性能
+        """
+        self.measure('process_pdf_fast', self.run_fast)
+
+    @unittest.skipIf(importlib.util.find_spec('magic_pdf') is None, '未安装magic_pdf')
+    def test_2_process_pdf(self):
+        """
+        测试完整解析流程的性能（需要magic_pdf和模型）
+        baseline.json尚未包含该阶段，安装magic_pdf和模型后本测试失败，需记录基线后提交
+        """
+        def run(pdf_path, article_id, work_dir):
+            image_dir = os.path.join(work_dir, 'images')
+            markdown_dir = os.path.join(work_dir, 'markdown')
+            os.makedirs(markdown_dir, exist_ok=True)
+            result = self.service.process_pdf(pdf_path, article_id, image_dir, markdown_dir)
+            return result['page_count'], directory_size(image_dir, markdown_dir)
+
+        self.measure('process_pdf', run)
+
+    def test_3_upload_results(self):
+        """
+        测试上传快速解析结果到本地Bucket的性能
+        """
+        def run(pdf_path, article_id, work_dir):
+            if article_id not in self.fast_results:
+                self.run_fast(pdf_path, article_id, os.path.join(self.temp_dir, 'upload_input', article_id))
+            result = self.fast_results[article_id]
+            self.service.bucket.root = work_dir
+            self.service.upload_results(article_id, result, f'markdown/{article_id}.md', f'images/{article_id}',
+                                        f'json/{article_id}')
+            return result['page_count'], directory_size(work_dir)
+
+        self.measure('upload_results', run)
+
+
+if __name__ == '__main__':
+    unittest.main()
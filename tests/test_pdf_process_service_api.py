@@ -0,0 +1,183 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+批量提交接口测试脚本
+测试POST /jobs的任务提交和NDJSON事件流
+"""
+
+import sys
+import os
+import json
+import yaml
+import unittest
+from unittest.mock import Mock, patch
+import tempfile
+import shutil
+import time
+import queue
+import threading
+import requests
+
+# 添加src目录到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from pdf_process_service import PDFProcessService, ArticleInProgressError, TransientIOError, classify_error
+
+
+class TestBatchApi(unittest.TestCase):
+    """
+    批量提交接口测试类
+    """
+
+    def setUp(self):
+        """
+        测试前的准备工作
+        """
+        self.temp_dir = tempfile.mkdtemp()
+        self.config_path = os.path.join(self.temp_dir, 'test_config.yaml')
+        config = {
+            'mns': {
+                'endpoint': 'https://123456789.mns.cn-hangzhou.aliyuncs.com',
+                'access_id': 'test_access_id',
+                'access_key': 'test_access_key',
+                'queue_name': 'test_queue'
+            },
+            'oss': {
+                'endpoint': 'https://oss-cn-hangzhou.aliyuncs.com',
+                'access_id': 'test_access_id',
+                'access_key': 'test_access_key',
+                'bucket_name': 'test_bucket'
+            },
+            'temp': {
+                'pdf_dir': os.path.join(self.temp_dir, 'temp', 'pdf_dir'),
+                'image_dir': os.path.join(self.temp_dir, 'temp', 'image_dir'),
+                'markdown_dir': os.path.join(self.temp_dir, 'temp', 'markdown_dir')
+            },
+            'api': {
+                'enabled': True,
+                'host': '127.0.0.1',
+                'port': 0,
+                'max_pending': 2
+            }
+        }
+        with open(self.config_path, 'w', encoding='utf-8') as f:
+            yaml.dump(config, f, default_flow_style=False, allow_unicode=True)
+
+    def tearDown(self):
+        """
+        测试后的清理工作
+        """
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    @patch('pdf_process_service.Account')
+    @patch('pdf_process_service.oss2.Auth')
+    @patch('pdf_process_service.oss2.Bucket')
+    def test_batch_job_streams_events(self, mock_bucket, mock_auth, mock_account):
+        """
+        测试批量任务逐篇返回完成和失败事件
+        """
+        service = PDFProcessService(self.config_path)
+
+        def fake_process_content(content):
+            if content['article_id'] == 'bad':
+                raise ValueError('broken pdf')
+
+        service.process_content = Mock(side_effect=fake_process_content)
+        service.start_api_server()
+        try:
+            messages = [{'article_id': f'a{i}'} for i in range(4)] + [{'article_id': 'bad'}]
+            response = requests.post(
+                f'http://127.0.0.1:{service.api_server.server_port}/jobs',
+                json={'messages': messages},
+                stream=True,
+                timeout=10
+            )
+            events = [json.loads(line) for line in response.iter_lines() if line]
+        finally:
+            service.api_server.shutdown()
+            service.api_server.server_close()
+
+        self.assertEqual(service.process_content.call_count, 5)
+        completed = {e['article_id'] for e in events if e['event'] == 'completed'}
+        failed = {e['article_id'] for e in events if e['event'] == 'failed'}
+        self.assertEqual(completed, {'a0', 'a1', 'a2', 'a3'})
+        self.assertEqual(failed, {'bad'})
+        self.assertEqual(events[-1], {'event': 'batch_completed', 'total': 5, 'succeeded': 4, 'failed': 1})
+
+    @patch('pdf_process_service.Account')
+    @patch('pdf_process_service.oss2.Auth')
+    @patch('pdf_process_service.oss2.Bucket')
+    def test_invalid_payload(self, mock_bucket, mock_auth, mock_account):
+        """
+        测试请求格式错误时返回400
+        """
+        service = PDFProcessService(self.config_path)
+        service.start_api_server()
+        try:
+            response = requests.post(
+                f'http://127.0.0.1:{service.api_server.server_port}/jobs',
+                data='not json',
+                timeout=10
+            )
+        finally:
+            service.api_server.shutdown()
+            service.api_server.server_close()
+        self.assertEqual(response.status_code, 400)
+
+    @patch('pdf_process_service.Account')
+    @patch('pdf_process_service.oss2.Auth')
+    @patch('pdf_process_service.oss2.Bucket')
+    def test_duplicate_article_rejected(self, mock_bucket, mock_auth, mock_account):
+        """
+        测试同一文章正在处理时再次提交被拒绝，处理完成后可再次处理
+        """
+        service = PDFProcessService(self.config_path)
+        started = threading.Event()
+        release = threading.Event()
+
+        def fake_convert_content(content):
+            started.set()
+            release.wait(10)
+
+        service.convert_content = Mock(side_effect=fake_convert_content)
+        worker = threading.Thread(target=service.process_content, args=({'article_id': 'a1'},))
+        worker.start()
+        self.assertTrue(started.wait(10))
+        with self.assertRaises(ArticleInProgressError):
+            service.process_content({'article_id': 'a1'})
+        self.assertIs(classify_error(ArticleInProgressError('a1')), TransientIOError)
+        release.set()
+        worker.join()
+
+        service.process_content({'article_id': 'a1'})
+        self.assertEqual(service.convert_content.call_count, 2)
+
+    @patch('pdf_process_service.Account')
+    @patch('pdf_process_service.oss2.Auth')
+    @patch('pdf_process_service.oss2.Bucket')
+    def test_stop_drains_submitted_jobs(self, mock_bucket, mock_auth, mock_account):
+        """
+        测试停止接口时等待已提交的任务处理完成，停止后不再接收任务
+        """
+        service = PDFProcessService(self.config_path)
+        processed = []
+
+        def fake_process_content(content):
+            time.sleep(0.05)
+            processed.append(content['article_id'])
+
+        service.process_content = Mock(side_effect=fake_process_content)
+        service.start_api_server()
+        events = queue.Queue()
+        self.assertTrue(service.submit_job({'article_id': 'a1'}, events))
+        self.assertTrue(service.submit_job({'article_id': 'a2'}, events))
+        service.stop_api_server()
+
+        self.assertEqual(processed, ['a1', 'a2'])
+        self.assertEqual([events.get_nowait()['event'] for _ in range(2)], ['completed', 'completed'])
+        self.assertFalse(service.submit_job({'article_id': 'a3'}, events))
+
+
+if __name__ == '__main__':
+    unittest.main()
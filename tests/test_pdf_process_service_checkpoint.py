@@ -0,0 +1,146 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+推理检查点测试脚本
+测试CheckpointStore的读写以及analyze_pdf从检查点恢复的功能
+"""
+
+import sys
+import os
+import yaml
+import unittest
+from unittest.mock import Mock, patch
+import tempfile
+import shutil
+
+# 添加src目录到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from pdf_process_service import PDFProcessService, CheckpointStore
+
+
+class TestCheckpointStore(unittest.TestCase):
+    """
+    检查点存储测试类
+    """
+
+    def setUp(self):
+        """
+        测试前的准备工作
+        """
+        self.temp_dir = tempfile.mkdtemp()
+        self.store = CheckpointStore(backend='local', local_dir=self.temp_dir)
+
+    def tearDown(self):
+        """
+        测试后的清理工作
+        """
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_save_and_load_range(self):
+        """
+        测试保存并读取页码区间检查点
+        """
+        page_results = [{'layout_dets': [], 'page_info': {'page_no': 0, 'width': 10, 'height': 20}}]
+        self.assertIsNone(self.store.load_range('a1', 'hash', 'txt', 0, 0))
+        self.store.save_range('a1', 'hash', 'txt', 0, 0, page_results)
+        self.assertEqual(self.store.load_range('a1', 'hash', 'txt', 0, 0), page_results)
+        # 内容哈希或解析方式不同时不应命中
+        self.assertIsNone(self.store.load_range('a1', 'other', 'txt', 0, 0))
+        self.assertIsNone(self.store.load_range('a1', 'hash', 'ocr', 0, 0))
+
+    def test_clear(self):
+        """
+        测试清理文章的全部检查点
+        """
+        self.store.save_range('a1', 'hash', 'txt', 0, 0, [])
+        self.store.clear('a1')
+        self.assertIsNone(self.store.load_range('a1', 'hash', 'txt', 0, 0))
+
+
+class TestAnalyzePdfCheckpoint(unittest.TestCase):
+    """
+    analyze_pdf检查点恢复测试类
+    """
+
+    def setUp(self):
+        """
+        测试前的准备工作
+        """
+        self.temp_dir = tempfile.mkdtemp()
+        self.config_path = os.path.join(self.temp_dir, 'test_config.yaml')
+        config = {
+            'mns': {
+                'endpoint': 'https://123456789.mns.cn-hangzhou.aliyuncs.com',
+                'access_id': 'test_access_id',
+                'access_key': 'test_access_key',
+                'queue_name': 'test_queue'
+            },
+            'oss': {
+                'endpoint': 'https://oss-cn-hangzhou.aliyuncs.com',
+                'access_id': 'test_access_id',
+                'access_key': 'test_access_key',
+                'bucket_name': 'test_bucket'
+            },
+            'temp': {
+                'pdf_dir': os.path.join(self.temp_dir, 'temp', 'pdf_dir'),
+                'image_dir': os.path.join(self.temp_dir, 'temp', 'image_dir'),
+                'markdown_dir': os.path.join(self.temp_dir, 'temp', 'markdown_dir')
+            },
+            'checkpoint': {
+                'enabled': True,
+                'pages_per_range': 2,
+                'backend': 'local',
+                'local_dir': os.path.join(self.temp_dir, 'checkpoints')
+            }
+        }
+        with open(self.config_path, 'w', encoding='utf-8') as f:
+            yaml.dump(config, f, default_flow_style=False, allow_unicode=True)
+
+    def tearDown(self):
+        """
+        测试后的清理工作
+        """
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    @patch('pdf_process_service.InferenceResult')
+    @patch('pdf_process_service.Account')
+    @patch('pdf_process_service.oss2.Auth')
+    @patch('pdf_process_service.oss2.Bucket')
+    def test_resume_from_checkpoint(self, mock_bucket, mock_auth, mock_account, mock_inference_result):
+        """
+        测试已完成的区间从检查点加载，只推理剩余区间
+        """
+        service = PDFProcessService(self.config_path)
+        # 模拟第一个区间已在上次处理中完成
+        saved_pages = [{'layout_dets': [], 'page_info': {'page_no': i}} for i in range(2)]
+        service.checkpoint_store.save_range('a1', 'hash', 'txt', 0, 1, saved_pages)
+
+        def fake_apply(func, ocr, start_page_id, end_page_id):
+            infer_result = Mock()
+            infer_result.get_infer_res.return_value = [
+                {'layout_dets': [], 'page_info': {'page_no': i}} for i in range(5)
+            ]
+            return infer_result
+
+        ds = Mock()
+        ds.__len__ = Mock(return_value=5)
+        ds.apply = Mock(side_effect=fake_apply)
+
+        service.analyze_pdf(ds, False, 'a1', 'hash')
+
+        # 只推理剩余的两个区间
+        called_ranges = [(c.kwargs['start_page_id'], c.kwargs['end_page_id']) for c in ds.apply.call_args_list]
+        self.assertEqual(called_ranges, [(2, 3), (4, 4)])
+
+        # 合并后的推理结果按页码顺序覆盖全部页面
+        model_list = mock_inference_result.call_args[0][0]
+        self.assertEqual([page['page_info']['page_no'] for page in model_list], [0, 1, 2, 3, 4])
+
+        # 新完成的区间已保存为检查点
+        self.assertIsNotNone(service.checkpoint_store.load_range('a1', 'hash', 'txt', 2, 3))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,212 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+自适应并发控制测试脚本
+测试AdaptiveLimiter和AdaptiveConcurrencyController的调整策略
+"""
+
+import sys
+import os
+import time
+import threading
+import unittest
+from unittest.mock import patch
+import tempfile
+import shutil
+import yaml
+
+# 添加src目录到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from pdf_process_service import AdaptiveLimiter, AdaptiveConcurrencyController, PDFProcessService
+
+
+class TestAdaptiveLimiter(unittest.TestCase):
+    """
+    并发限制器测试类
+    """
+
+    def test_limit_and_waiting(self):
+        """
+        测试达到上限时排队，调高上限后放行
+        """
+        limiter = AdaptiveLimiter(1)
+        limiter.acquire()
+        acquired = threading.Event()
+
+        def worker():
+            limiter.acquire()
+            acquired.set()
+
+        thread = threading.Thread(target=worker, daemon=True)
+        thread.start()
+        time.sleep(0.1)
+        self.assertFalse(acquired.is_set())
+        self.assertEqual(limiter.waiting, 1)
+
+        limiter.set_limit(2)
+        self.assertTrue(acquired.wait(1))
+        self.assertEqual(limiter.active, 2)
+        self.assertEqual(limiter.waiting, 0)
+
+
+class TestAdaptiveConcurrencyController(unittest.TestCase):
+    """
+    自适应并发控制器测试类
+    """
+
+    def setUp(self):
+        """
+        测试前的准备工作
+        """
+        self.controller = AdaptiveConcurrencyController({
+            'stages': {
+                'download': {'min': 1, 'max': 4, 'initial': 2},
+                'inference': {'min': 1, 'max': 2, 'initial': 1},
+                'upload': {'min': 1, 'max': 4, 'initial': 4}
+            }
+        })
+
+    @patch.object(AdaptiveConcurrencyController, 'memory_percent', return_value=10)
+    def test_increase_when_queued(self, mock_memory):
+        """
+        测试有排队时增加并发数，且不超过上限
+        """
+        self.controller.stages['download']['limiter'].waiting = 3
+        self.controller.stages['upload']['limiter'].waiting = 3
+        decisions = self.controller.adjust()
+        self.assertEqual(decisions['download'], 'increase:queued')
+        self.assertEqual(decisions['inference'], 'hold')
+        self.assertEqual(decisions['upload'], 'hold')
+        snapshot = self.controller.snapshot()
+        self.assertEqual(snapshot['download']['limit'], 3)
+        self.assertEqual(snapshot['upload']['limit'], 4)
+
+    @patch.object(AdaptiveConcurrencyController, 'memory_percent', return_value=95)
+    def test_decrease_when_memory_high(self, mock_memory):
+        """
+        测试内存占用过高时减半并发数，且不低于下限
+        """
+        decisions = self.controller.adjust()
+        self.assertEqual(decisions['upload'], 'decrease:memory')
+        snapshot = self.controller.snapshot()
+        self.assertEqual(snapshot['upload']['limit'], 2)
+        self.assertEqual(snapshot['inference']['limit'], 1)
+
+    @patch.object(AdaptiveConcurrencyController, 'memory_percent', return_value=10)
+    def test_decrease_when_latency_degrades(self, mock_memory):
+        """
+        测试阶段延迟明显恶化且吞吐未提升时减半并发数
+        """
+        stage = self.controller.stages['upload']
+        stage['latency'] = 1.0
+        self.controller.adjust()
+        stage['latency'] = 5.0
+        decisions = self.controller.adjust()
+        self.assertEqual(decisions['upload'], 'decrease:latency')
+        self.assertEqual(stage['limiter'].limit, 2)
+
+    @patch.object(AdaptiveConcurrencyController, 'memory_percent', return_value=10)
+    def test_stage_records_latency(self, mock_memory):
+        """
+        测试阶段执行后记录延迟和完成数
+        """
+        with self.controller.stage('inference'):
+            self.assertEqual(self.controller.stages['inference']['limiter'].active, 1)
+        stage = self.controller.stages['inference']
+        self.assertEqual(stage['limiter'].active, 0)
+        self.assertEqual(stage['completed'], 1)
+        self.assertIsNotNone(stage['latency'])
+
+    @patch.object(AdaptiveConcurrencyController, 'memory_percent', return_value=10)
+    def test_acquire_slot_bounded_by_stage_limits(self, mock_memory):
+        """
+        测试处理中的文章数不超过各阶段并发上限之和
+        """
+        max_in_flight = self.controller.max_in_flight()
+        for _ in range(max_in_flight):
+            self.assertTrue(self.controller.acquire_slot(timeout=0.1))
+        self.assertFalse(self.controller.acquire_slot(timeout=0.1))
+        self.controller.release_slot()
+        self.assertTrue(self.controller.acquire_slot(timeout=0.1))
+
+
+class TestInferenceStageSerialized(unittest.TestCase):
+    """
+    并发模式下模型推理串行执行测试类
+    """
+
+    def setUp(self):
+        """
+        测试前的准备工作
+        """
+        self.temp_dir = tempfile.mkdtemp()
+        self.config_path = os.path.join(self.temp_dir, 'test_config.yaml')
+        config = {
+            'mns': {
+                'endpoint': 'https://123456789.mns.cn-hangzhou.aliyuncs.com',
+                'access_id': 'test_access_id',
+                'access_key': 'test_access_key',
+                'queue_name': 'test_queue'
+            },
+            'oss': {
+                'endpoint': 'https://oss-cn-hangzhou.aliyuncs.com',
+                'access_id': 'test_access_id',
+                'access_key': 'test_access_key',
+                'bucket_name': 'test_bucket'
+            },
+            'temp': {
+                'pdf_dir': os.path.join(self.temp_dir, 'temp', 'pdf_dir'),
+                'image_dir': os.path.join(self.temp_dir, 'temp', 'image_dir'),
+                'markdown_dir': os.path.join(self.temp_dir, 'temp', 'markdown_dir')
+            },
+            'concurrency': {
+                'enabled': True,
+                'stages': {'inference': {'min': 1, 'max': 2, 'initial': 2}}
+            }
+        }
+        with open(self.config_path, 'w', encoding='utf-8') as f:
+            yaml.dump(config, f, default_flow_style=False, allow_unicode=True)
+
+    def tearDown(self):
+        """
+        测试后的清理工作
+        """
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_default_inference_limit(self):
+        """
+        测试推理阶段默认并发上限为1
+        """
+        self.assertEqual(AdaptiveConcurrencyController({}).stages['inference']['max'], 1)
+
+    @patch('pdf_process_service.Account')
+    @patch('pdf_process_service.oss2.Auth')
+    @patch('pdf_process_service.oss2.Bucket')
+    def test_inference_lock_kept(self, mock_bucket, mock_auth, mock_account):
+        """
+        测试推理阶段并发上限大于1时进程内推理仍持有推理锁串行执行
+        """
+        service = PDFProcessService(self.config_path)
+        active = []
+        overlaps = []
+
+        def worker():
+            with service.stage('inference'):
+                active.append(1)
+                overlaps.append(len(active))
+                time.sleep(0.05)
+                active.pop()
+
+        threads = [threading.Thread(target=worker) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(overlaps, [1, 1])
+        service.executor.shutdown()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,149 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+本地批量转换测试脚本
+测试转换任务读取和单个PDF转换的跳过逻辑
+"""
+
+import sys
+import os
+import json
+import unittest
+from unittest.mock import Mock, patch
+import tempfile
+import shutil
+
+# 添加src目录到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import pdf_process_service
+from pdf_process_service import load_convert_tasks, _convert_one, default_convert_workers
+
+
+class TestConvert(unittest.TestCase):
+    """
+    本地批量转换测试类
+    """
+
+    def setUp(self):
+        """
+        测试前的准备工作
+        """
+        self.temp_dir = tempfile.mkdtemp()
+        self.input_dir = os.path.join(self.temp_dir, 'input')
+        self.output_dir = os.path.join(self.temp_dir, 'output')
+        os.makedirs(os.path.join(self.input_dir, 'sub'))
+        for name in ['sub/b.pdf', 'c.pdf', 'notes.txt']:
+            with open(os.path.join(self.input_dir, name), 'wb') as f:
+                f.write(b'%PDF-1.4')
+
+    def tearDown(self):
+        """
+        测试后的清理工作
+        """
+        pdf_process_service._convert_service = None
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_load_tasks_from_directory(self):
+        """
+        测试从目录读取转换任务
+        """
+        tasks = load_convert_tasks(self.input_dir)
+        self.assertEqual([task['article_id'] for task in tasks], ['c', 'sub_b'])
+
+    def test_load_tasks_from_manifest(self):
+        """
+        测试从JSON Lines和文本清单读取转换任务
+        """
+        manifest_path = os.path.join(self.temp_dir, 'manifest.jsonl')
+        with open(manifest_path, 'w', encoding='utf-8') as f:
+            f.write(json.dumps({'article_id': '03A', 'pdf_url': 'https://example.com/a.pdf'}) + '\n')
+            f.write('\n')
+            f.write(os.path.join(self.input_dir, 'c.pdf') + '\n')
+        tasks = load_convert_tasks(manifest_path)
+        self.assertEqual(tasks[0], {'article_id': '03A', 'pdf_url': 'https://example.com/a.pdf'})
+        self.assertEqual(tasks[1]['article_id'], 'c')
+
+    def test_convert_one_skips_existing_output(self):
+        """
+        测试已存在输出时跳过转换，否则调用process_pdf
+        """
+        service = Mock()
+        service.process_pdf.return_value = {'page_count': 3}
+        service.default_outputs = frozenset(pdf_process_service.OUTPUT_ARTIFACTS)
+        pdf_process_service._convert_service = service
+
+        task = {'article_id': 'c', 'pdf_path': os.path.join(self.input_dir, 'c.pdf')}
+        result = _convert_one(task, self.output_dir, False)
+        self.assertEqual(result['status'], 'converted')
+        self.assertEqual(result['pages'], 3)
+        service.process_pdf.assert_called_once_with(
+            task['pdf_path'],
+            'c',
+            os.path.join(self.output_dir, 'c', 'images') + '/',
+            os.path.join(self.output_dir, 'c'),
+            outputs=service.default_outputs
+        )
+
+        # 只有部分结果文件（上次转换中断）时重新转换
+        os.makedirs(os.path.join(self.output_dir, 'c'), exist_ok=True)
+        with open(os.path.join(self.output_dir, 'c', 'c.md'), 'w') as f:
+            f.write('# done')
+        self.assertEqual(_convert_one(task, self.output_dir, False)['status'], 'converted')
+
+        # 上次转换的产物少于本次请求的产物时重新转换
+        with open(os.path.join(self.output_dir, 'c', 'c_manifest.json'), 'w') as f:
+            json.dump({'article_id': 'c', 'outputs': ['markdown']}, f)
+        self.assertEqual(_convert_one(task, self.output_dir, False)['status'], 'converted')
+        self.assertEqual(_convert_one(dict(task, outputs=['markdown']), self.output_dir, False)['status'], 'skipped')
+
+        with open(os.path.join(self.output_dir, 'c', 'c_manifest.json'), 'w') as f:
+            json.dump({'article_id': 'c', 'outputs': sorted(pdf_process_service.OUTPUT_ARTIFACTS)}, f)
+        self.assertEqual(_convert_one(task, self.output_dir, False)['status'], 'skipped')
+        self.assertEqual(_convert_one(task, self.output_dir, True)['status'], 'converted')
+
+    def test_convert_one_skips_uploaded_manifest(self):
+        """
+        测试输出到OSS时按输出清单判断是否已完成
+        """
+        service = Mock()
+        service.process_pdf.return_value = {'page_count': 3}
+        service.load_manifest.return_value = None
+        service.default_outputs = frozenset(pdf_process_service.OUTPUT_ARTIFACTS)
+        service.config = {'temp': {'markdown_dir': self.temp_dir, 'image_dir': self.temp_dir}}
+        pdf_process_service._convert_service = service
+
+        task = {'article_id': 'c', 'pdf_path': os.path.join(self.input_dir, 'c.pdf')}
+        self.assertEqual(_convert_one(task, 'oss://backfill', False)['status'], 'converted')
+        service.load_manifest.assert_called_with('backfill/json/c', 'c')
+
+        service.load_manifest.return_value = {'article_id': 'c', 'outputs': sorted(pdf_process_service.OUTPUT_ARTIFACTS)}
+        self.assertEqual(_convert_one(task, 'oss://backfill', False)['status'], 'skipped')
+
+    def test_default_workers(self):
+        """
+        测试完整解析的默认进程数按可用内存限制
+        """
+        with patch('pdf_process_service.os.cpu_count', return_value=16), \
+                patch('pdf_process_service.psutil.virtual_memory', return_value=Mock(available=20 * 1024 ** 3)):
+            self.assertEqual(default_convert_workers('full', 6144), 3)
+            self.assertEqual(default_convert_workers('full', 40960), 1)
+            self.assertEqual(default_convert_workers('fast'), 16)
+
+    def test_convert_one_reports_failure(self):
+        """
+        测试转换失败时返回failed状态而不抛出异常
+        """
+        service = Mock()
+        service.process_pdf.side_effect = RuntimeError('broken pdf')
+        pdf_process_service._convert_service = service
+
+        task = {'article_id': 'c', 'pdf_path': os.path.join(self.input_dir, 'c.pdf')}
+        result = _convert_one(task, self.output_dir, False)
+        self.assertEqual(result['status'], 'failed')
+        self.assertIn('broken pdf', result['error'])
+
+
+if __name__ == '__main__':
+    unittest.main()
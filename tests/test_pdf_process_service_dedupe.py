@@ -0,0 +1,314 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+转换去重测试脚本
+测试SingleFlight的锁和结果记录，以及并发处理相同PDF时只转换一次
+"""
+
+import sys
+import os
+import io
+import json
+import hashlib
+import time
+import yaml
+import threading
+import unittest
+from unittest.mock import Mock, patch
+import tempfile
+import shutil
+import oss2
+
+# 添加src目录到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from pdf_process_service import (
+    PDFProcessService, SingleFlight, ArticleInProgressError, map_result_key, rewrite_result_object
+)
+
+
+def make_store_bucket():
+    """
+    生成以字典保存对象的Bucket替身，支持禁止覆盖写入和If-Match条件写入，ETag为内容的MD5
+    Returns:
+        (Bucket替身, 对象字典)
+    """
+    store = {}
+    lock = threading.Lock()
+
+    def etag(data):
+        return hashlib.md5(data).hexdigest()
+
+    def put_object(key, data, headers=None):
+        headers = headers or {}
+        data = data.encode('utf-8') if isinstance(data, str) else data
+        with lock:
+            if headers.get('x-oss-forbid-overwrite') == 'true' and key in store:
+                raise oss2.exceptions.ServerError(409, {}, b'', {})
+            if 'If-Match' in headers:
+                if key not in store:
+                    raise oss2.exceptions.NoSuchKey(404, {}, b'', {})
+                if etag(store[key]) != headers['If-Match']:
+                    raise oss2.exceptions.PreconditionFailed(412, {}, b'', {})
+            store[key] = data
+        return Mock(etag=etag(data))
+
+    def get_object(key):
+        with lock:
+            if key not in store:
+                raise oss2.exceptions.NoSuchKey(404, {}, b'', {})
+            result = io.BytesIO(store[key])
+        result.etag = etag(result.getvalue())
+        return result
+
+    bucket = Mock()
+    bucket.bucket_name = 'test_bucket'
+    bucket.put_object.side_effect = put_object
+    bucket.get_object.side_effect = get_object
+    bucket.delete_object.side_effect = lambda key: store.pop(key, None)
+    return bucket, store
+
+
+class TestSingleFlight(unittest.TestCase):
+    """
+    单飞协调测试类
+    """
+
+    def setUp(self):
+        """
+        测试前的准备工作
+        """
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """
+        测试后的清理工作
+        """
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_local_lock(self):
+        """
+        测试同一去重键同时只有一个持有者
+        """
+        first = SingleFlight(local_dir=self.temp_dir)
+        second = SingleFlight(local_dir=self.temp_dir)
+        self.assertTrue(first.acquire('k'))
+        self.assertFalse(second.acquire('k'))
+        self.assertTrue(second.acquire('other'))
+        first.release('k')
+        self.assertTrue(second.acquire('k'))
+
+    def test_oss_lock_renewed_and_released_by_owner(self):
+        """
+        测试OSS锁在持有期间续期，释放时不删除已被其他worker接管的锁
+        """
+        bucket, store = make_store_bucket()
+        flight = SingleFlight(backend='oss', bucket=bucket, lock_ttl=0.3)
+        self.assertTrue(flight.acquire('k'))
+        acquired_at = json.loads(store['dedupe/k.lock'])['acquired_at']
+        time.sleep(0.25)
+        self.assertGreater(json.loads(store['dedupe/k.lock'])['acquired_at'], acquired_at)
+        flight.release('k')
+        self.assertNotIn('dedupe/k.lock', store)
+
+        self.assertTrue(flight.acquire('k'))
+        store['dedupe/k.lock'] = json.dumps({'acquired_at': time.time(), 'owner': 'other'}).encode('utf-8')
+        # 锁被其他worker接管后续期不覆盖对方的锁
+        time.sleep(0.25)
+        self.assertEqual(json.loads(store['dedupe/k.lock'])['owner'], 'other')
+        flight.release('k')
+        self.assertEqual(json.loads(store['dedupe/k.lock'])['owner'], 'other')
+
+    def test_oss_stale_lock_taken_over_once(self):
+        """
+        测试两个worker同时读到过期的OSS锁时只有一个接管成功
+        """
+        bucket, store = make_store_bucket()
+        store['dedupe/k.lock'] = json.dumps({'acquired_at': time.time() - 10, 'owner': 'dead'}).encode('utf-8')
+        stale = bucket.get_object('dedupe/k.lock')
+        first = SingleFlight(backend='oss', bucket=bucket, lock_ttl=5)
+        self.assertTrue(first.acquire('k'))
+        owner = json.loads(store['dedupe/k.lock'])['owner']
+        self.assertNotEqual(owner, 'dead')
+
+        # 第二个worker读到的仍是接管前的锁对象
+        second_bucket = Mock()
+        second_bucket.put_object.side_effect = bucket.put_object
+        second_bucket.get_object.return_value = stale
+        second = SingleFlight(backend='oss', bucket=second_bucket, lock_ttl=5)
+        self.assertFalse(second.acquire('k'))
+        self.assertEqual(json.loads(store['dedupe/k.lock'])['owner'], owner)
+        first.release('k')
+        self.assertNotIn('dedupe/k.lock', store)
+
+    def test_publish_and_expire(self):
+        """
+        测试结果记录的发布、读取和过期
+        """
+        flight = SingleFlight(local_dir=self.temp_dir)
+        self.assertIsNone(flight.load('k'))
+        flight.publish('k', {'article_id': 'a1', 'objects': []})
+        self.assertEqual(flight.load('k')['article_id'], 'a1')
+        self.assertIsNone(SingleFlight(local_dir=self.temp_dir, result_ttl=0).load('k'))
+
+    def test_map_result_key(self):
+        """
+        测试结果对象路径映射到当前消息的输出路径
+        """
+        record = {'article_id': 'a1', 'markdown_file': 'md/a1.md', 'images_path': 'img/a1', 'json_path': 'json/a1'}
+        content = {'article_id': 'b2', 'markdown_file': 'md/b2.md', 'images_path': 'img/b2', 'json_path': 'json/b2'}
+        self.assertEqual(map_result_key('md/a1.md', record, content), 'md/b2.md')
+        self.assertEqual(map_result_key('img/a1/x.jpg', record, content), 'img/b2/x.jpg')
+        self.assertEqual(map_result_key('json/a1/a1_middle.json', record, content), 'json/b2/b2_middle.json')
+
+    def test_rewrite_result_object(self):
+        """
+        测试复用结果时替换markdown中的图片路径和输出清单中的文章ID
+        """
+        record = {'article_id': 'a1', 'image_dir': 'temp/image_dir/a1/'}
+        content = {'article_id': 'b2'}
+        markdown = rewrite_result_object('md/a1.md', b'![](temp/image_dir/a1/x.jpg)', record, content,
+                                         'temp/image_dir/b2/')
+        self.assertEqual(markdown, b'![](temp/image_dir/b2/x.jpg)')
+        manifest = rewrite_result_object('json/a1/a1_manifest.json', json.dumps({'article_id': 'a1'}).encode(),
+                                         record, content, 'temp/image_dir/b2/')
+        self.assertEqual(json.loads(manifest)['article_id'], 'b2')
+
+
+class TestConcurrentDedupe(unittest.TestCase):
+    """
+    并发处理相同PDF的去重测试类
+    """
+
+    def setUp(self):
+        """
+        测试前的准备工作
+        """
+        self.temp_dir = tempfile.mkdtemp()
+        self.config_path = os.path.join(self.temp_dir, 'test_config.yaml')
+        config = {
+            'mns': {
+                'endpoint': 'https://123456789.mns.cn-hangzhou.aliyuncs.com',
+                'access_id': 'test_access_id',
+                'access_key': 'test_access_key',
+                'queue_name': 'test_queue'
+            },
+            'oss': {
+                'endpoint': 'https://oss-cn-hangzhou.aliyuncs.com',
+                'access_id': 'test_access_id',
+                'access_key': 'test_access_key',
+                'bucket_name': 'test_bucket'
+            },
+            'temp': {
+                'pdf_dir': os.path.join(self.temp_dir, 'temp', 'pdf_dir'),
+                'image_dir': os.path.join(self.temp_dir, 'temp', 'image_dir'),
+                'markdown_dir': os.path.join(self.temp_dir, 'temp', 'markdown_dir')
+            },
+            'dedupe': {
+                'enabled': True,
+                'backend': 'local',
+                'local_dir': os.path.join(self.temp_dir, 'dedupe')
+            }
+        }
+        with open(self.config_path, 'w', encoding='utf-8') as f:
+            yaml.dump(config, f, default_flow_style=False, allow_unicode=True)
+
+    def tearDown(self):
+        """
+        测试后的清理工作
+        """
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def message(self, article_id):
+        """
+        生成指向同一PDF的消息内容
+        """
+        return {
+            'article_id': article_id,
+            'tag': 'test',
+            'pdf_url': 'https://example.com/same.pdf',
+            'markdown_file': f'markdown/{article_id}.md',
+            'images_path': f'images/{article_id}',
+            'json_path': f'json/{article_id}'
+        }
+
+    @patch('pdf_process_service.Account')
+    @patch('pdf_process_service.oss2.Auth')
+    @patch('pdf_process_service.oss2.Bucket')
+    def test_only_one_conversion(self, mock_bucket, mock_auth, mock_account):
+        """
+        测试并发处理相同PDF时只转换一次，转换期间的重复请求稍后重试，重试时复制已上传的结果
+        """
+        service = PDFProcessService(self.config_path)
+        service.topic_outbox = None
+        service.send_topic_message = Mock()
+        service.bucket, store = make_store_bucket()
+        image_root = service.config['temp']['image_dir']
+
+        def fake_convert(content):
+            time.sleep(0.3)
+            article_id = content['article_id']
+            store[content['markdown_file']] = f'![]({image_root}/{article_id}/x.jpg)'.encode('utf-8')
+            store[f"{content['images_path']}/x.jpg"] = b'jpg'
+            return [content['markdown_file'], f"{content['images_path']}/x.jpg"]
+
+        service.convert_content = Mock(side_effect=fake_convert)
+        leader = threading.Thread(target=service.process_content, args=(self.message('a1'),))
+        leader.start()
+        time.sleep(0.05)
+        started_at = time.time()
+        with self.assertRaises(ArticleInProgressError):
+            service.process_content(self.message('a2'))
+        # 重复请求不在处理流程中等待转换结果
+        self.assertLess(time.time() - started_at, 0.2)
+        leader.join()
+        service.process_content(self.message('a2'))
+
+        service.convert_content.assert_called_once()
+        leader, follower = 'a1', 'a2'
+        copied = [c[0][1:] for c in service.bucket.copy_object.call_args_list]
+        self.assertEqual(copied, [(f'images/{leader}/x.jpg', f'images/{follower}/x.jpg')])
+        # markdown中的图片链接指向当前文章的图片目录
+        self.assertEqual(store[f'markdown/{follower}.md'], f'![]({image_root}/{follower}/x.jpg)'.encode('utf-8'))
+        self.assertEqual(service.send_topic_message.call_args[0][0]['article_id'], follower)
+
+    @patch('pdf_process_service.Account')
+    @patch('pdf_process_service.oss2.Auth')
+    @patch('pdf_process_service.oss2.Bucket')
+    def test_retry_takes_over_after_failure(self, mock_bucket, mock_auth, mock_account):
+        """
+        测试持有者转换失败时由重试的重复请求接手转换
+        """
+        service = PDFProcessService(self.config_path)
+        calls = []
+
+        def fake_convert(content):
+            calls.append(content['article_id'])
+            if len(calls) == 1:
+                time.sleep(0.2)
+                raise RuntimeError('download failed')
+            return []
+
+        service.convert_content = Mock(side_effect=fake_convert)
+        errors = []
+
+        def run():
+            try:
+                service.process_content(self.message('a1'))
+            except RuntimeError as e:
+                errors.append(str(e))
+
+        leader = threading.Thread(target=run)
+        leader.start()
+        time.sleep(0.05)
+        with self.assertRaises(ArticleInProgressError):
+            service.process_content(self.message('a2'))
+        leader.join()
+        service.process_content(self.message('a2'))
+        self.assertEqual(calls, ['a1', 'a2'])
+        self.assertEqual(errors, ['download failed'])
+
+
+if __name__ == '__main__':
+    unittest.main()
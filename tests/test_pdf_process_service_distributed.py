@@ -0,0 +1,404 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+多节点协同处理测试脚本
+测试页码区间认领、本地子任务队列以及超大文档的分区间推理和合并
+"""
+
+import sys
+import os
+import json
+import time
+import yaml
+import threading
+import unittest
+from unittest.mock import Mock, patch
+import tempfile
+import shutil
+
+# 添加src目录到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from pdf_process_service import PDFProcessService, CheckpointStore, PageRangeQueue
+from test_pdf_process_service_dedupe import make_store_bucket
+
+
+class TestRangeClaim(unittest.TestCase):
+    """
+    页码区间认领测试类
+    """
+
+    def setUp(self):
+        """
+        测试前的准备工作
+        """
+        self.temp_dir = tempfile.mkdtemp()
+        self.store = CheckpointStore(backend='local', local_dir=self.temp_dir)
+
+    def tearDown(self):
+        """
+        测试后的清理工作
+        """
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_claim_once(self):
+        """
+        测试同一区间只能被认领一次
+        """
+        self.assertTrue(self.store.claim_range('a1', 'hash', 'txt', 0, 1, 'node-a'))
+        self.assertFalse(self.store.claim_range('a1', 'hash', 'txt', 0, 1, 'node-b'))
+        self.assertTrue(self.store.claim_range('a1', 'hash', 'txt', 2, 3, 'node-b'))
+
+    def test_claim_expired(self):
+        """
+        测试认领超时后可被其他节点接管
+        """
+        self.assertTrue(self.store.claim_range('a1', 'hash', 'txt', 0, 1, 'node-a'))
+        self.assertTrue(self.store.claim_range('a1', 'hash', 'txt', 0, 1, 'node-b', ttl=0))
+
+    def test_release_only_own_claim(self):
+        """
+        测试只释放本节点的认领，释放后可被其他节点重新认领
+        """
+        self.assertTrue(self.store.claim_range('a1', 'hash', 'txt', 0, 1, 'node-a'))
+        self.store.release_range('a1', 'hash', 'txt', 0, 1, 'node-b')
+        self.assertFalse(self.store.claim_range('a1', 'hash', 'txt', 0, 1, 'node-b'))
+        self.store.release_range('a1', 'hash', 'txt', 0, 1, 'node-a')
+        self.assertTrue(self.store.claim_range('a1', 'hash', 'txt', 0, 1, 'node-b'))
+
+    def race_takeover(self, store):
+        """
+        多个节点同时接管同一过期认领
+        Returns:
+            接管成功的节点列表
+        """
+        barrier = threading.Barrier(8)
+        winners = []
+
+        def claim(owner):
+            barrier.wait()
+            if store.claim_range('a1', 'hash', 'txt', 0, 1, owner, ttl=5):
+                winners.append(owner)
+
+        threads = [threading.Thread(target=claim, args=(f'node-{i}',)) for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return winners
+
+    def test_stale_claim_taken_over_once(self):
+        """
+        测试多个节点同时接管过期认领时只有一个成功，且认领标记属于接管成功的节点
+        """
+        path = os.path.join(self.temp_dir, 'a1', 'hash', 'txt', '000000-000001.claim')
+        os.makedirs(os.path.dirname(path))
+        for _ in range(20):
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump({'owner': 'dead', 'claimed_at': time.time() - 10}, f)
+            winners = self.race_takeover(self.store)
+            self.assertEqual(len(winners), 1)
+            with open(path, 'r', encoding='utf-8') as f:
+                self.assertEqual(json.load(f)['owner'], winners[0])
+            self.store.release_range('a1', 'hash', 'txt', 0, 1, winners[0])
+
+    def test_stale_oss_claim_taken_over_once(self):
+        """
+        测试OSS认领按ETag条件接管，多个节点同时接管时只有一个成功
+        """
+        bucket, objects = make_store_bucket()
+        store = CheckpointStore(backend='oss', bucket=bucket)
+        key = 'checkpoints/a1/hash/txt/000000-000001.claim'
+        for _ in range(20):
+            objects[key] = json.dumps({'owner': 'dead', 'claimed_at': time.time() - 10}).encode('utf-8')
+            winners = self.race_takeover(store)
+            self.assertEqual(len(winners), 1)
+            self.assertEqual(json.loads(objects[key])['owner'], winners[0])
+            store.finish_range('a1', 'hash', 'txt', 0, 1, winners[0])
+
+    def test_claim_renewed_until_finished(self):
+        """
+        测试推理期间认领定期续期，完成后停止续期
+        """
+        path = os.path.join(self.temp_dir, 'a1', 'hash', 'txt', '000000-000001.claim')
+        self.assertTrue(self.store.claim_range('a1', 'hash', 'txt', 0, 1, 'node-a', ttl=0.3))
+        with open(path, 'r', encoding='utf-8') as f:
+            claimed_at = json.load(f)['claimed_at']
+        time.sleep(0.25)
+        with open(path, 'r', encoding='utf-8') as f:
+            renewed_at = json.load(f)['claimed_at']
+        self.assertGreater(renewed_at, claimed_at)
+        # 续期后其他节点无法接管
+        self.assertFalse(self.store.claim_range('a1', 'hash', 'txt', 0, 1, 'node-b', ttl=0.3))
+
+        self.store.finish_range('a1', 'hash', 'txt', 0, 1, 'node-a')
+        time.sleep(0.35)
+        with open(path, 'r', encoding='utf-8') as f:
+            self.assertLess(json.load(f)['claimed_at'], renewed_at + 0.1)
+        self.assertTrue(self.store.claim_range('a1', 'hash', 'txt', 0, 1, 'node-b', ttl=0.3))
+        self.store.finish_range('a1', 'hash', 'txt', 0, 1, 'node-b')
+
+    def test_source_cleared_with_checkpoints(self):
+        """
+        测试PDF原文件随检查点一起清理
+        """
+        self.store.save_source('a1', 'hash', b'%PDF-1.4')
+        self.assertEqual(self.store.load_source('a1', 'hash'), b'%PDF-1.4')
+        self.store.clear('a1')
+        self.assertIsNone(self.store.load_source('a1', 'hash'))
+
+
+class TestPageRangeQueue(unittest.TestCase):
+    """
+    本地子任务队列测试类
+    """
+
+    def setUp(self):
+        """
+        测试前的准备工作
+        """
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """
+        测试后的清理工作
+        """
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_put_get_done(self):
+        """
+        测试子任务按发布顺序被取走，且每个子任务只被取走一次
+        """
+        producer = PageRangeQueue(backend='local', local_dir=self.temp_dir)
+        consumer = PageRangeQueue(backend='local', local_dir=self.temp_dir)
+        producer.put({'start_page': 0})
+        producer.put({'start_page': 2})
+
+        handle, task = consumer.get()
+        self.assertEqual(task, {'start_page': 0})
+        consumer.done(handle)
+        handle, task = producer.get()
+        self.assertEqual(task, {'start_page': 2})
+        consumer.done(handle)
+        self.assertIsNone(consumer.get())
+        self.assertEqual(os.listdir(self.temp_dir), [])
+
+
+class TestDistributedAnalyze(unittest.TestCase):
+    """
+    超大文档分区间推理测试类
+    """
+
+    def setUp(self):
+        """
+        测试前的准备工作
+        """
+        self.temp_dir = tempfile.mkdtemp()
+        self.config_path = os.path.join(self.temp_dir, 'test_config.yaml')
+        config = {
+            'mns': {
+                'endpoint': 'https://123456789.mns.cn-hangzhou.aliyuncs.com',
+                'access_id': 'test_access_id',
+                'access_key': 'test_access_key',
+                'queue_name': 'test_queue'
+            },
+            'oss': {
+                'endpoint': 'https://oss-cn-hangzhou.aliyuncs.com',
+                'access_id': 'test_access_id',
+                'access_key': 'test_access_key',
+                'bucket_name': 'test_bucket'
+            },
+            'temp': {
+                'pdf_dir': os.path.join(self.temp_dir, 'temp', 'pdf_dir'),
+                'image_dir': os.path.join(self.temp_dir, 'temp', 'image_dir'),
+                'markdown_dir': os.path.join(self.temp_dir, 'temp', 'markdown_dir')
+            },
+            'checkpoint': {
+                'enabled': True,
+                'pages_per_range': 2,
+                'backend': 'local',
+                'local_dir': os.path.join(self.temp_dir, 'checkpoints')
+            },
+            'distributed': {
+                'enabled': True,
+                'backend': 'local',
+                'local_dir': os.path.join(self.temp_dir, 'subtasks'),
+                'min_pages': 4,
+                'poll_interval': 0.01
+            }
+        }
+        with open(self.config_path, 'w', encoding='utf-8') as f:
+            yaml.dump(config, f, default_flow_style=False, allow_unicode=True)
+
+    def tearDown(self):
+        """
+        测试后的清理工作
+        """
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    @staticmethod
+    def make_dataset(page_count):
+        """
+        构造按页码区间返回推理结果的数据集
+        """
+        def fake_apply(func, ocr, start_page_id, end_page_id):
+            infer_result = Mock()
+            infer_result.get_infer_res.return_value = [
+                {'layout_dets': [], 'page_info': {'page_no': i}} for i in range(page_count)
+            ]
+            return infer_result
+
+        ds = Mock()
+        ds.__len__ = Mock(return_value=page_count)
+        ds.apply = Mock(side_effect=fake_apply)
+        ds.data_bits.return_value = b'%PDF-1.4'
+        return ds
+
+    @patch('pdf_process_service.import_magic_pdf')
+    @patch('pdf_process_service.InferenceResult')
+    @patch('pdf_process_service.Account')
+    @patch('pdf_process_service.oss2.Auth')
+    @patch('pdf_process_service.oss2.Bucket')
+    def test_publish_and_merge(self, mock_bucket, mock_auth, mock_account, mock_inference_result, mock_import):
+        """
+        测试发布子任务、跳过其他节点认领的区间并按页码顺序合并结果
+        """
+        coordinator = PDFProcessService(self.config_path)
+        helper = PDFProcessService(self.config_path)
+        helper.node_id = 'other-node'
+        store = coordinator.checkpoint_store
+        # 其他节点已认领并完成第二个区间
+        self.assertTrue(store.claim_range('a1', 'hash', 'txt', 2, 3, helper.node_id))
+        store.save_range('a1', 'hash', 'txt', 2, 3, [{'layout_dets': [], 'page_info': {'page_no': i}} for i in (2, 3)])
+
+        ds = self.make_dataset(5)
+        coordinator.analyze_pdf(ds, False, 'a1', 'hash')
+
+        called_ranges = [(c.kwargs['start_page_id'], c.kwargs['end_page_id']) for c in ds.apply.call_args_list]
+        self.assertEqual(called_ranges, [(0, 1), (4, 4)])
+        model_list = mock_inference_result.call_args[0][0]
+        self.assertEqual([page['page_info']['page_no'] for page in model_list], [0, 1, 2, 3, 4])
+
+        # 已完成的区间不再发布，发布的子任务在其他节点取走时已被本节点完成
+        tasks = []
+        while True:
+            item = helper.subtask_queue.get()
+            if item is None:
+                break
+            tasks.append(item[1])
+            with patch('pdf_process_service.PymuDocDataset', create=True):
+                self.assertFalse(helper.process_subtask(item[1]))
+            helper.subtask_queue.done(item[0])
+        self.assertEqual([(t['start_page'], t['end_page']) for t in tasks], [(0, 1), (4, 4)])
+        self.assertEqual(store.load_source('a1', 'hash'), b'%PDF-1.4')
+
+    @patch('pdf_process_service.import_magic_pdf')
+    @patch('pdf_process_service.Account')
+    @patch('pdf_process_service.oss2.Auth')
+    @patch('pdf_process_service.oss2.Bucket')
+    def test_helper_processes_subtask(self, mock_bucket, mock_auth, mock_account, mock_import):
+        """
+        测试其他节点认领子任务并保存该区间的检查点
+        """
+        helper = PDFProcessService(self.config_path)
+        store = helper.checkpoint_store
+        store.save_source('a1', 'hash', b'%PDF-1.4')
+        task = {'article_id': 'a1', 'content_hash': 'hash', 'parse_method': 'ocr', 'start_page': 2, 'end_page': 3}
+
+        ds = self.make_dataset(5)
+        with patch('pdf_process_service.PymuDocDataset', create=True, return_value=ds) as mock_dataset:
+            self.assertTrue(helper.process_subtask(task))
+            # 区间已完成时跳过
+            self.assertFalse(helper.process_subtask(task))
+
+        mock_dataset.assert_called_with(b'%PDF-1.4')
+        self.assertEqual(ds.apply.call_count, 1)
+        self.assertTrue(ds.apply.call_args.kwargs['ocr'])
+        self.assertEqual([page['page_info']['page_no'] for page in store.load_range('a1', 'hash', 'ocr', 2, 3)], [2, 3])
+        # 其他节点已认领该区间
+        self.assertFalse(store.claim_range('a1', 'hash', 'ocr', 2, 3, 'node-c'))
+
+    @patch('pdf_process_service.import_magic_pdf')
+    @patch('pdf_process_service.Account')
+    @patch('pdf_process_service.oss2.Auth')
+    @patch('pdf_process_service.oss2.Bucket')
+    def test_failed_subtask_releases_claim(self, mock_bucket, mock_auth, mock_account, mock_import):
+        """
+        测试子任务推理失败时释放认领，不必等待认领超时
+        """
+        helper = PDFProcessService(self.config_path)
+        store = helper.checkpoint_store
+        store.save_source('a1', 'hash', b'%PDF-1.4')
+        task = {'article_id': 'a1', 'content_hash': 'hash', 'parse_method': 'txt', 'start_page': 0, 'end_page': 1}
+
+        ds = self.make_dataset(5)
+        ds.apply.side_effect = RuntimeError('CUDA out of memory')
+        with patch('pdf_process_service.PymuDocDataset', create=True, return_value=ds):
+            with self.assertRaises(RuntimeError):
+                helper.process_subtask(task)
+        self.assertTrue(store.claim_range('a1', 'hash', 'txt', 0, 1, 'node-c'))
+
+    @patch('pdf_process_service.import_magic_pdf')
+    @patch('pdf_process_service.InferenceResult')
+    @patch('pdf_process_service.Account')
+    @patch('pdf_process_service.oss2.Auth')
+    @patch('pdf_process_service.oss2.Bucket')
+    def test_wait_timeout_infers_locally(self, mock_bucket, mock_auth, mock_account, mock_inference_result,
+                                         mock_import):
+        """
+        测试超过总等待时间后，其他节点认领但未完成的区间由本节点推理
+        """
+        coordinator = PDFProcessService(self.config_path)
+        coordinator.distributed_config['wait_timeout'] = 0.05
+        self.assertTrue(coordinator.checkpoint_store.claim_range('a1', 'hash', 'txt', 2, 3, 'stalled-node'))
+
+        ds = self.make_dataset(4)
+        coordinator.analyze_pdf(ds, False, 'a1', 'hash')
+        called_ranges = [(c.kwargs['start_page_id'], c.kwargs['end_page_id']) for c in ds.apply.call_args_list]
+        self.assertEqual(called_ranges, [(0, 1), (2, 3)])
+        model_list = mock_inference_result.call_args[0][0]
+        self.assertEqual([page['page_info']['page_no'] for page in model_list], [0, 1, 2, 3])
+
+
+    @patch('pdf_process_service.import_magic_pdf')
+    @patch('pdf_process_service.InferenceResult')
+    @patch('pdf_process_service.Account')
+    @patch('pdf_process_service.oss2.Auth')
+    @patch('pdf_process_service.oss2.Bucket')
+    def test_wait_releases_inference_stage(self, mock_bucket, mock_auth, mock_account, mock_inference_result,
+                                           mock_import):
+        """
+        测试等待其他节点期间让出推理锁，本节点其他文档可以推理
+        """
+        coordinator = PDFProcessService(self.config_path)
+        coordinator.distributed_config['wait_timeout'] = 2
+        self.assertTrue(coordinator.checkpoint_store.claim_range('a1', 'hash', 'txt', 2, 3, 'other-node'))
+        ds = self.make_dataset(4)
+
+        def run():
+            with coordinator.stage('inference'):
+                coordinator.analyze_pdf(ds, False, 'a1', 'hash')
+
+        thread = threading.Thread(target=run)
+        thread.start()
+        try:
+            deadline = time.time() + 5
+            while ds.apply.call_count == 0 and time.time() < deadline:
+                time.sleep(0.01)
+            time.sleep(0.05)
+            self.assertTrue(coordinator.inference_lock.acquire(timeout=1))
+            coordinator.inference_lock.release()
+            # 其他节点完成区间后合并结果
+            coordinator.checkpoint_store.save_range(
+                'a1', 'hash', 'txt', 2, 3, [{'layout_dets': [], 'page_info': {'page_no': i}} for i in (2, 3)]
+            )
+        finally:
+            thread.join(10)
+        self.assertEqual(ds.apply.call_count, 1)
+        model_list = mock_inference_result.call_args[0][0]
+        self.assertEqual([page['page_info']['page_no'] for page in model_list], [0, 1, 2, 3])
+
+
+if __name__ == '__main__':
+    unittest.main()
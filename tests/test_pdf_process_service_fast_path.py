@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+快速解析路径测试脚本
+测试extract_pdf_fast的输出结构和choose_fast_path的选择逻辑
+"""
+
+import sys
+import os
+import unittest
+import tempfile
+import shutil
+import fitz
+from unittest.mock import patch
+
+# 添加src目录到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from pdf_process_service import extract_pdf_fast, choose_fast_path
+
+
+class TestFastPath(unittest.TestCase):
+    """
+    快速解析路径测试类
+    """
+
+    def setUp(self):
+        """
+        测试前的准备工作
+        """
+        self.temp_dir = tempfile.mkdtemp()
+        self.image_dir = os.path.join(self.temp_dir, 'images') + '/'
+        self.pdf_path = os.path.join(self.temp_dir, 'paper.pdf')
+
+        doc = fitz.open()
+        page = doc.new_page()
+        page.insert_text((50, 80), 'Paper Title', fontsize=24)
+        page.insert_text((50, 130), 'Introduction', fontsize=15)
+        page.insert_textbox(fitz.Rect(50, 150, 550, 300), 'Body text of the paper. ' * 20, fontsize=11)
+        pixmap = fitz.Pixmap(fitz.csRGB, fitz.IRect(0, 0, 64, 64), False)
+        pixmap.set_rect(pixmap.irect, (200, 30, 30))
+        page.insert_image(fitz.Rect(50, 320, 250, 520), pixmap=pixmap)
+        page = doc.new_page()
+        page.insert_textbox(fitz.Rect(50, 50, 550, 300), 'Second page text. ' * 20, fontsize=11)
+        doc.save(self.pdf_path)
+        doc.close()
+
+    def tearDown(self):
+        """
+        测试后的清理工作
+        """
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_extract_markdown_and_content_list(self):
+        """
+        测试提取标题、正文和图片，输出markdown和content_list
+        """
+        markdown, content_list, middle_json, page_count = extract_pdf_fast(self.pdf_path, self.image_dir)
+
+        self.assertEqual(page_count, 2)
+        self.assertTrue(markdown.startswith('# Paper Title\n\n## Introduction\n\nBody text'))
+        self.assertEqual(content_list[0], {'type': 'text', 'text': 'Paper Title', 'text_level': 1, 'page_idx': 0})
+        self.assertEqual(content_list[1]['text_level'], 2)
+        self.assertNotIn('text_level', content_list[2])
+
+        images = [item for item in content_list if item['type'] == 'image']
+        self.assertEqual(len(images), 1)
+        self.assertTrue(os.path.exists(images[0]['img_path']))
+        self.assertIn(f"![]({images[0]['img_path']})", markdown)
+        self.assertEqual(content_list[-1]['page_idx'], 1)
+
+        self.assertEqual(middle_json['_parse_type'], 'fast')
+        self.assertEqual(len(middle_json['pdf_info']), 2)
+
+    def test_native_image_format_converted_to_png(self):
+        """
+        测试上传不支持的原生图片格式（如jpx）转换为PNG保存
+        """
+        extract_image = fitz.Document.extract_image
+
+        def extract_as_jpx(doc, xref):
+            return dict(extract_image(doc, xref), ext='jpx')
+
+        with patch.object(fitz.Document, 'extract_image', extract_as_jpx):
+            _, content_list, _, _ = extract_pdf_fast(self.pdf_path, self.image_dir)
+
+        images = [item for item in content_list if item['type'] == 'image']
+        self.assertTrue(images[0]['img_path'].endswith('.png'))
+        self.assertEqual([name for name in os.listdir(self.image_dir) if not name.endswith('.png')], [])
+        self.assertEqual(fitz.Pixmap(images[0]['img_path']).width, 64)
+
+    def test_choose_fast_path(self):
+        """
+        测试auto模式下按预检报告选择快速路径
+        """
+        report = {
+            'corrupt': False,
+            'encrypted': False,
+            'page_count': 10,
+            'text_coverage': 1.0,
+            'image_coverage': 0.05
+        }
+        self.assertTrue(choose_fast_path(report, {}))
+        self.assertFalse(choose_fast_path(dict(report, page_count=80), {}))
+        self.assertFalse(choose_fast_path(dict(report, text_coverage=0.5), {}))
+        self.assertFalse(choose_fast_path(dict(report, image_coverage=0.4), {}))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,274 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+共享推理服务测试脚本
+测试InferenceServer和InferenceClient通过Unix socket的请求和结果返回
+"""
+
+import sys
+import os
+import time
+import threading
+import unittest
+import tempfile
+import shutil
+import stat
+import fitz
+from unittest.mock import Mock, patch
+
+# 添加src目录到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+import pdf_process_service
+from pdf_process_service import (
+    InferenceServer, InferenceClient, InferenceServerError, PDFProcessService, slice_pdf_pages,
+    resolve_inference_authkey
+)
+
+
+def make_pdf(pages):
+    """
+    生成每页带页码文字的PDF内容
+    """
+    doc = fitz.open()
+    for i in range(pages):
+        doc.new_page().insert_text((50, 80), f'page {i}')
+    pdf_bytes = doc.tobytes()
+    doc.close()
+    return pdf_bytes
+
+
+class TestInferenceServer(unittest.TestCase):
+    """
+    共享推理服务测试类
+    """
+
+    def setUp(self):
+        """
+        测试前的准备工作
+        """
+        self.temp_dir = tempfile.mkdtemp()
+        self.address = os.path.join(self.temp_dir, 'inference', 'inference.sock')
+        self.active = 0
+        self.max_active = 0
+        self.lock = threading.Lock()
+
+        def fake_analyze(pdf_bytes, ocr, start_page_id=0, end_page_id=None, page_cache=None):
+            if pdf_bytes == b'broken':
+                raise ValueError('broken pdf')
+            with self.lock:
+                self.active += 1
+                self.max_active = max(self.max_active, self.active)
+            time.sleep(0.05)
+            with self.lock:
+                self.active -= 1
+            return [{'page_info': {'page_no': start_page_id}, 'ocr': ocr, 'size': len(pdf_bytes)}]
+
+        self.server = InferenceServer(self.address, authkey='secret', analyze=fake_analyze)
+        self.server.start()
+        self.client = InferenceClient(self.address, authkey='secret', timeout=10)
+
+    def tearDown(self):
+        """
+        测试后的清理工作
+        """
+        self.server.stop()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_analyze(self):
+        """
+        测试推理请求返回推理函数的结果
+        """
+        self.assertTrue(self.client.ping())
+        model_list = self.client.analyze(b'%PDF', True, 2, 3)
+        self.assertEqual(model_list, [{'page_info': {'page_no': 2}, 'ocr': True, 'size': 4}])
+
+    def test_concurrent_requests_serialized(self):
+        """
+        测试多个客户端并发请求时推理依次执行
+        """
+        results = []
+
+        def request(i):
+            results.append(self.client.analyze(b'x' * i, False))
+
+        threads = [threading.Thread(target=request, args=(i,)) for i in range(1, 5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(sorted(result[0]['size'] for result in results), [1, 2, 3, 4])
+        self.assertEqual(self.max_active, 1)
+
+    def test_errors(self):
+        """
+        测试推理失败和服务不可用时抛出InferenceServerError
+        """
+        with self.assertRaisesRegex(InferenceServerError, 'broken pdf'):
+            self.client.analyze(b'broken', False)
+        # 推理失败后服务仍可继续处理请求
+        self.assertTrue(self.client.ping())
+
+        missing = InferenceClient(os.path.join(self.temp_dir, 'missing.sock'), authkey='secret')
+        self.assertFalse(missing.ping())
+        with self.assertRaises(InferenceServerError):
+            missing.analyze(b'%PDF', False)
+
+        # 认证密钥不一致时无法连接
+        self.assertFalse(InferenceClient(self.address, authkey='wrong', timeout=10).ping())
+
+    def test_private_socket_and_required_authkey(self):
+        """
+        测试socket所在目录只允许服务用户访问，未配置认证密钥时拒绝启动
+        """
+        self.assertEqual(stat.S_IMODE(os.stat(os.path.dirname(self.address)).st_mode), 0o700)
+        self.assertEqual(stat.S_IMODE(os.stat(self.address).st_mode), 0o600)
+        with self.assertRaises(ValueError):
+            InferenceServer(self.address, authkey='')
+        with self.assertRaisesRegex(InferenceServerError, '认证密钥'):
+            InferenceClient(self.address).analyze(b'%PDF', False)
+
+    def test_generated_authkey_file(self):
+        """
+        测试未配置密钥时推理服务生成权限为0600的密钥文件，客户端从该文件读取
+        """
+        config = {'address': self.address, 'authkey_file': os.path.join(self.temp_dir, 'keys', 'authkey')}
+        with self.assertRaises(InferenceServerError):
+            resolve_inference_authkey(config)
+        authkey = resolve_inference_authkey(config, create=True)
+        self.assertEqual(stat.S_IMODE(os.stat(config['authkey_file']).st_mode), 0o600)
+        self.assertEqual(resolve_inference_authkey(config, create=True), authkey)
+        self.assertEqual(resolve_inference_authkey(dict(config, authkey='explicit')), 'explicit')
+
+        self.server.stop()
+        self.server = InferenceServer(self.address, authkey=authkey, analyze=lambda *args: ['ok'])
+        self.server.start()
+        client = InferenceClient(self.address, timeout=10, authkey_file=config['authkey_file'])
+        self.assertEqual(client.analyze(b'%PDF', False), ['ok'])
+
+
+
+class TestInferenceMicroBatching(unittest.TestCase):
+    """
+    跨文档页面微批处理测试类
+    """
+
+    def setUp(self):
+        """
+        测试前的准备工作
+        """
+        self.temp_dir = tempfile.mkdtemp()
+        self.address = os.path.join(self.temp_dir, 'inference.sock')
+        self.batches = []
+
+    def tearDown(self):
+        """
+        测试后的清理工作
+        """
+        self.server.stop()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def fake_analyze(self, pdf_bytes, ocr, start_page_id=0, end_page_id=None, page_cache=None):
+        """
+        单文档推理，返回文档内容作为结果
+        """
+        return [pdf_bytes.decode()]
+
+    def start_server(self, analyze_batch):
+        """
+        启动启用微批处理的推理服务，并发提交三个2页文档的请求
+        Args:
+            analyze_batch: 批量推理函数
+        Returns:
+            各文档的推理结果字典
+        """
+        self.server = InferenceServer(self.address, authkey='secret', analyze=self.fake_analyze, batch_size=6,
+                                      max_wait=1.0, analyze_batch=analyze_batch)
+        self.server.start()
+        client = InferenceClient(self.address, authkey='secret', timeout=10)
+        results = {}
+
+        def request(name):
+            results[name] = client.analyze(name.encode(), False, page_count=2)
+
+        threads = [threading.Thread(target=request, args=(name,)) for name in ('a', 'b', 'c')]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def test_requests_batched_until_batch_size(self):
+        """
+        测试多个文档的请求合并为一批推理，结果按文档返回
+        """
+        def fake_analyze_batch(batch):
+            self.batches.append(len(batch))
+            return [['batched', request['pdf_bytes'].decode()] for request in batch]
+
+        results = self.start_server(fake_analyze_batch)
+        self.assertEqual(self.batches, [3])
+        self.assertEqual(results, {name: ['batched', name] for name in ('a', 'b', 'c')})
+
+    def test_batch_failure_falls_back_to_single(self):
+        """
+        测试批量推理失败时逐个文档推理
+        """
+        def failing_analyze_batch(batch):
+            raise RuntimeError('batch failed')
+
+        results = self.start_server(failing_analyze_batch)
+        self.assertEqual(results, {name: [name] for name in ('a', 'b', 'c')})
+
+
+class TestSlicePdfPages(unittest.TestCase):
+    """
+    页码区间截取测试类
+    """
+
+    def test_slice_pdf_pages(self):
+        """
+        测试截取页码区间
+        """
+        pdf_bytes = make_pdf(3)
+
+        sliced, page_count, end_page_id = slice_pdf_pages(pdf_bytes, 1, 1)
+        self.assertEqual((page_count, end_page_id), (3, 1))
+        with fitz.open(stream=sliced, filetype='pdf') as sub_doc:
+            self.assertEqual(sub_doc.page_count, 1)
+            self.assertIn('page 1', sub_doc[0].get_text())
+        self.assertIs(slice_pdf_pages(pdf_bytes, 0, None)[0], pdf_bytes)
+
+
+class TestInferPagesClient(unittest.TestCase):
+    """
+    服务进程使用共享推理服务推理的测试类
+    """
+
+    def test_range_request_sends_only_range(self):
+        """
+        测试区间推理只发送区间内的页面，结果还原为原文档页码
+        """
+        service = PDFProcessService.__new__(PDFProcessService)
+        service.inference_client = Mock()
+        service.inference_client.analyze.return_value = [{'layout_dets': ['p'], 'page_info': {'page_no': 0}}]
+        ds = Mock()
+        ds.data_bits.return_value = make_pdf(3)
+        ds.__len__ = Mock(return_value=3)
+
+        with patch.object(pdf_process_service, 'InferenceResult', lambda model_list, ds: model_list):
+            model_list = service.infer_pages(ds, True, 1, 1)
+
+        sent = service.inference_client.analyze.call_args
+        with fitz.open(stream=sent[0][0], filetype='pdf') as sub_doc:
+            self.assertEqual(sub_doc.page_count, 1)
+            self.assertIn('page 1', sub_doc[0].get_text())
+        self.assertEqual(sent.kwargs['page_count'], 1)
+        self.assertEqual([page['page_info']['page_no'] for page in model_list], [0, 1, 2])
+        self.assertEqual(model_list[1]['layout_dets'], ['p'])
+        self.assertEqual(model_list[0]['layout_dets'], [])
+
+
+if __name__ == '__main__':
+    unittest.main()
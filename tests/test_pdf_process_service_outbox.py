@@ -0,0 +1,139 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+主题消息发件箱测试脚本
+测试TopicOutbox的日志持久化、分批发送和失败重试
+"""
+
+import sys
+import os
+import unittest
+from unittest.mock import Mock, patch
+import tempfile
+import shutil
+
+# 添加src目录到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from pdf_process_service import TopicOutbox
+
+
+class TestTopicOutbox(unittest.TestCase):
+    """
+    主题消息发件箱测试类
+    """
+
+    def setUp(self):
+        """
+        测试前的准备工作
+        """
+        self.temp_dir = tempfile.mkdtemp()
+        self.journal_dir = os.path.join(self.temp_dir, 'outbox')
+
+    def tearDown(self):
+        """
+        测试后的清理工作
+        """
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_put_does_not_publish(self):
+        """
+        测试写入发件箱时只记录日志，不同步发送
+        """
+        publish = Mock()
+        outbox = TopicOutbox(publish, journal_dir=self.journal_dir)
+        outbox.put({'article_id': 'a1', 'tag': None})
+        publish.assert_not_called()
+        self.assertEqual(outbox.pending_count(), 1)
+
+    def test_flush_in_order_and_batches(self):
+        """
+        测试按写入顺序分批发送，发送成功后删除日志
+        """
+        publish = Mock()
+        outbox = TopicOutbox(publish, journal_dir=self.journal_dir, batch_size=2)
+        for i in range(3):
+            outbox.put({'article_id': f'a{i}'})
+
+        outbox.flush()
+        self.assertEqual([c[0][0]['article_id'] for c in publish.call_args_list], ['a0', 'a1'])
+        self.assertEqual(outbox.pending_count(), 1)
+
+        outbox.flush()
+        self.assertEqual(outbox.pending_count(), 0)
+
+    def test_retry_with_backoff_and_replay(self):
+        """
+        测试发送失败后保留日志并退避重试，重启后的新实例沿用日志中的重试时间
+        """
+        publish = Mock(side_effect=Exception('topic unavailable'))
+        outbox = TopicOutbox(publish, journal_dir=self.journal_dir, base_backoff=60)
+        outbox.put({'article_id': 'a1'})
+
+        next_due = outbox.flush()
+        self.assertIsNotNone(next_due)
+        self.assertEqual(outbox.pending_count(), 1)
+
+        # 退避时间未到时不重试
+        outbox.flush()
+        self.assertEqual(publish.call_count, 1)
+
+        # 模拟服务重启，新的发件箱读取同一日志目录
+        replay_publish = Mock()
+        replay_outbox = TopicOutbox(replay_publish, journal_dir=self.journal_dir, base_backoff=0)
+        replay_outbox.flush()
+        replay_publish.assert_not_called()
+
+    def test_move_to_failed_after_max_attempts(self):
+        """
+        测试超过最大发送次数后移入失败目录
+        """
+        publish = Mock(side_effect=Exception('topic unavailable'))
+        outbox = TopicOutbox(publish, journal_dir=self.journal_dir, base_backoff=0, max_attempts=2)
+        outbox.put({'article_id': 'a1'})
+        outbox.flush()
+        outbox.flush()
+        self.assertEqual(outbox.pending_count(), 0)
+        self.assertEqual(len(os.listdir(os.path.join(self.journal_dir, 'failed'))), 1)
+
+    def test_claimed_entry_sent_once(self):
+        """
+        测试共用日志目录时已被其他进程认领的消息不重复发送，认领进程退出后恢复发送
+        """
+        publish = Mock()
+        outbox = TopicOutbox(publish, journal_dir=self.journal_dir)
+        outbox.put({'article_id': 'a1'})
+        name = os.listdir(self.journal_dir)[0]
+        # 模拟当前进程(存活)已认领该消息
+        claimed = os.path.join(self.journal_dir, f'{name}.{os.getpid()}.sending')
+        os.rename(os.path.join(self.journal_dir, name), claimed)
+
+        TopicOutbox(publish, journal_dir=self.journal_dir).flush()
+        publish.assert_not_called()
+        self.assertEqual(outbox.pending_count(), 1)
+
+        # 模拟认领进程已退出，新实例启动时恢复为待发送
+        os.rename(claimed, os.path.join(self.journal_dir, f'{name}.999999999.sending'))
+        with patch('pdf_process_service.os.kill', side_effect=ProcessLookupError):
+            replay_outbox = TopicOutbox(publish, journal_dir=self.journal_dir)
+        replay_outbox.flush()
+        publish.assert_called_once()
+        self.assertEqual(outbox.pending_count(), 0)
+
+    def test_remove_failure_not_resent(self):
+        """
+        测试发送成功后删除日志失败时不写回日志，不重复发送
+        """
+        publish = Mock()
+        outbox = TopicOutbox(publish, journal_dir=self.journal_dir)
+        outbox.put({'article_id': 'a1'})
+        with patch('pdf_process_service.os.remove', side_effect=FileNotFoundError):
+            outbox.flush()
+        outbox.flush()
+        publish.assert_called_once()
+        self.assertEqual([name for name in os.listdir(self.journal_dir) if name.endswith('.json')], [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,212 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+输出产物选择测试脚本
+测试按消息的outputs字段只写出和上传请求的产物
+"""
+
+import sys
+import os
+import yaml
+import unittest
+from unittest.mock import Mock, patch
+import tempfile
+import shutil
+import fitz
+
+# 添加src目录到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from pdf_process_service import PDFProcessService, PermanentInputError, resolve_outputs, resolve_mode, strip_image_links
+
+
+class TestResolveOutputs(unittest.TestCase):
+    """
+    输出产物校验测试类
+    """
+
+    def test_resolve_outputs(self):
+        """
+        测试合法产物列表和非法产物名称
+        """
+        self.assertEqual(resolve_outputs(['markdown', 'images']), frozenset({'markdown', 'images'}))
+        with self.assertRaises(ValueError):
+            resolve_outputs(['markdown', 'docx'])
+        with self.assertRaises(ValueError):
+            resolve_outputs([])
+
+    def test_strip_image_links(self):
+        """
+        测试删除markdown中的图片链接并合并多余空行
+        """
+        markdown = '# Title\n\n![](images/a.jpg)\n\nSee ![](images/b.jpg) here\n'
+        self.assertEqual(strip_image_links(markdown), '# Title\n\nSee  here\n')
+
+    def test_resolve_mode(self):
+        """
+        测试合法解析模式和非法模式名称
+        """
+        self.assertEqual(resolve_mode('fast'), 'fast')
+        with self.assertRaises(ValueError):
+            resolve_mode('fsat')
+
+
+class TestSelectableOutputs(unittest.TestCase):
+    """
+    按消息选择输出产物测试类
+    """
+
+    def setUp(self):
+        """
+        测试前的准备工作
+        """
+        self.temp_dir = tempfile.mkdtemp()
+        self.config_path = os.path.join(self.temp_dir, 'test_config.yaml')
+        self.config = {
+            'mns': {
+                'endpoint': 'https://123456789.mns.cn-hangzhou.aliyuncs.com',
+                'access_id': 'test_access_id',
+                'access_key': 'test_access_key',
+                'queue_name': 'test_queue'
+            },
+            'oss': {
+                'endpoint': 'https://oss-cn-hangzhou.aliyuncs.com',
+                'access_id': 'test_access_id',
+                'access_key': 'test_access_key',
+                'bucket_name': 'test_bucket'
+            },
+            'temp': {
+                'pdf_dir': os.path.join(self.temp_dir, 'temp', 'pdf_dir'),
+                'image_dir': os.path.join(self.temp_dir, 'temp', 'image_dir'),
+                'markdown_dir': os.path.join(self.temp_dir, 'temp', 'markdown_dir')
+            },
+            'outputs': {
+                'default': ['markdown', 'content_list']
+            }
+        }
+        with open(self.config_path, 'w', encoding='utf-8') as f:
+            yaml.dump(self.config, f, default_flow_style=False, allow_unicode=True)
+
+        self.pdf_path = os.path.join(self.temp_dir, 'a1.pdf')
+        doc = fitz.open()
+        page = doc.new_page()
+        page.insert_text((50, 80), 'Only text on this page', fontsize=11)
+        doc.save(self.pdf_path)
+        doc.close()
+
+    def tearDown(self):
+        """
+        测试后的清理工作
+        """
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    @patch('pdf_process_service.Account')
+    @patch('pdf_process_service.oss2.Auth')
+    @patch('pdf_process_service.oss2.Bucket')
+    def test_only_requested_outputs_written_and_uploaded(self, mock_bucket, mock_auth, mock_account):
+        """
+        测试只写出并上传请求的产物
+        """
+        service = PDFProcessService(self.config_path)
+        self.assertEqual(service.default_outputs, frozenset({'markdown', 'content_list'}))
+
+        markdown_dir = self.config['temp']['markdown_dir']
+        image_dir = self.config['temp']['image_dir'] + '/a1/'
+        result = service.process_pdf_fast(self.pdf_path, 'a1', image_dir, markdown_dir, outputs=resolve_outputs(['markdown']))
+        self.assertTrue(os.path.exists(result['markdown_path']))
+        self.assertIsNone(result['json_middle_path'])
+        self.assertIsNone(result['json_content_list_path'])
+        self.assertIsNone(result['image_dir'])
+        self.assertFalse(os.path.exists(image_dir))
+        self.assertEqual(sorted(os.listdir(markdown_dir)), ['a1.md', 'a1_manifest.json'])
+
+        service.upload_results('a1', result, 'markdown/a1.md', 'images/a1', 'json/a1')
+        uploaded = [c[0][0] for c in service.bucket.put_object_from_file.call_args_list]
+        self.assertEqual(uploaded, ['markdown/a1.md', 'json/a1/a1_manifest.json'])
+
+    @patch('pdf_process_service.Account')
+    @patch('pdf_process_service.oss2.Auth')
+    @patch('pdf_process_service.oss2.Bucket')
+    def test_message_outputs_override_default(self, mock_bucket, mock_auth, mock_account):
+        """
+        测试消息中的outputs字段覆盖配置默认值，并随主题消息返回
+        """
+        service = PDFProcessService(self.config_path)
+        service.download_file = Mock()
+        service.process_pdf = Mock(return_value={'page_count': 1})
+        service.upload_results = Mock()
+        service.send_topic_message = Mock()
+        service.topic_outbox = None
+
+        content = {
+            'article_id': 'a1',
+            'tag': 'test',
+            'pdf_url': 'https://example.com/a1.pdf',
+            'markdown_file': 'markdown/a1.md',
+            'images_path': 'images/a1',
+            'json_path': 'json/a1',
+            'outputs': ['markdown']
+        }
+        service.convert_content(content)
+        self.assertEqual(service.process_pdf.call_args.kwargs['outputs'], frozenset({'markdown'}))
+        self.assertEqual(service.send_topic_message.call_args[0][0]['outputs'], ['markdown'])
+
+        del content['outputs']
+        service.convert_content(content)
+        self.assertEqual(service.process_pdf.call_args.kwargs['outputs'], frozenset({'markdown', 'content_list'}))
+
+
+    @patch('pdf_process_service.Account')
+    @patch('pdf_process_service.oss2.Auth')
+    @patch('pdf_process_service.oss2.Bucket')
+    def test_unknown_mode_rejected(self, mock_bucket, mock_auth, mock_account):
+        """
+        测试消息中的未知解析模式归为永久性输入错误，不下载也不转换
+        """
+        service = PDFProcessService(self.config_path)
+        service.download_file = Mock()
+        service.process_pdf = Mock()
+        content = {
+            'article_id': 'a1',
+            'tag': 'test',
+            'pdf_url': 'https://example.com/a1.pdf',
+            'markdown_file': 'markdown/a1.md',
+            'images_path': 'images/a1',
+            'json_path': 'json/a1',
+            'mode': 'fsat'
+        }
+        with self.assertRaises(PermanentInputError):
+            service.convert_content(content)
+        service.download_file.assert_not_called()
+        service.process_pdf.assert_not_called()
+
+
+    @patch('pdf_process_service.import_magic_pdf')
+    @patch('pdf_process_service.Account')
+    @patch('pdf_process_service.oss2.Auth')
+    @patch('pdf_process_service.oss2.Bucket')
+    def test_markdown_without_images_has_no_image_links(self, mock_bucket, mock_auth, mock_account, mock_import):
+        """
+        测试未请求图片产物时完整流程写出的markdown不包含图片链接
+        """
+        service = PDFProcessService(self.config_path)
+        pipe_result = Mock()
+        pipe_result.get_markdown.return_value = '# Title\n\n![](images/a.jpg)\n\nBody\n'
+        infer_result = Mock()
+        infer_result.get_infer_res.return_value = []
+        service.run_pipeline = Mock(return_value=(pipe_result, infer_result, 'txt'))
+        markdown_dir = self.config['temp']['markdown_dir']
+        image_dir = self.config['temp']['image_dir'] + '/a1/'
+        with patch('pdf_process_service.PymuDocDataset', create=True), \
+                patch('pdf_process_service.FileBasedDataWriter', create=True) as mock_writer:
+            result = service.process_pdf(self.pdf_path, 'a1', image_dir, markdown_dir,
+                                         outputs=resolve_outputs(['markdown']))
+
+        pipe_result.dump_md.assert_not_called()
+        mock_writer.return_value.write_string.assert_called_once_with('a1.md', '# Title\n\nBody\n')
+        self.assertIsNone(result['image_dir'])
+
+
+if __name__ == '__main__':
+    unittest.main()
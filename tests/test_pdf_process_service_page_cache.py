@@ -0,0 +1,162 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+页面图像缓存测试脚本
+测试PageImageCache只渲染一次页面，并在各阶段和推理服务进程之间共用
+"""
+
+import sys
+import os
+import unittest
+import tempfile
+import shutil
+from unittest.mock import patch
+
+# 添加src目录到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from pdf_process_service import PageImageCache, CachedPageDataset
+
+
+class FakePage:
+    """
+    记录渲染次数的页面
+    """
+
+    def __init__(self, dataset, page_id):
+        self.dataset = dataset
+        self.page_id = page_id
+
+    def get_image(self):
+        import numpy as np
+
+        self.dataset.renders.append(self.page_id)
+        img = np.full((20, 10, 3), self.page_id, dtype=np.uint8)
+        return {'img': img, 'width': 10, 'height': 20}
+
+    def get_page_info(self):
+        return {'page_id': self.page_id}
+
+
+class FakeDataset:
+    """
+    模拟PymuDocDataset的数据集
+    """
+
+    def __init__(self, page_count):
+        self.page_count = page_count
+        self.renders = []
+
+    def __len__(self):
+        return self.page_count
+
+    def get_page(self, page_id):
+        return FakePage(self, page_id)
+
+    def data_bits(self):
+        return b'%PDF'
+
+
+class TestPageImageCache(unittest.TestCase):
+    """
+    页面图像缓存测试类
+    """
+
+    def setUp(self):
+        """
+        测试前的准备工作
+        """
+        self.temp_dir = tempfile.mkdtemp()
+        self.cache = PageImageCache(self.temp_dir)
+
+    def tearDown(self):
+        """
+        测试后的清理工作
+        """
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_page_rendered_once(self):
+        """
+        测试同一页面只渲染一次，之后以内存映射方式读取
+        """
+        import numpy as np
+
+        dataset = FakeDataset(3)
+        ds = self.cache.wrap(dataset, 'hash')
+        first = ds.get_page(1).get_image()
+        second = ds.get_page(1).get_image()
+        self.assertEqual(dataset.renders, [1])
+        self.assertIsInstance(second['img'], np.memmap)
+        self.assertEqual((second['width'], second['height']), (10, 20))
+        self.assertTrue(np.array_equal(first['img'], second['img']))
+        # 其他属性转发给原页面和原数据集
+        self.assertEqual(ds.get_page(1).get_page_info(), {'page_id': 1})
+        self.assertEqual(ds.data_bits(), b'%PDF')
+
+        # 推理服务进程使用相同的缓存目录和键时不再渲染
+        shared = PageImageCache(self.temp_dir).wrap(FakeDataset(3), 'hash')
+        self.assertEqual(int(shared.get_page(1).get_image()['img'][0, 0, 0]), 1)
+
+    def test_apply_and_page_offset(self):
+        """
+        测试apply以包装后的数据集调用处理函数，页码区间数据集按偏移读取缓存
+        """
+        dataset = FakeDataset(3)
+        ds = self.cache.wrap(dataset, 'hash')
+        images = ds.apply(lambda d: [page.get_image()['img'] for page in d])
+        self.assertEqual(len(images), 3)
+        self.assertIsInstance(ds.apply(lambda d: d), CachedPageDataset)
+
+        # 截取第2页开始的区间时，区间内第0页对应原文档第2页
+        sliced = FakeDataset(1)
+        sliced_ds = self.cache.wrap(sliced, 'hash', page_offset=2)
+        self.assertEqual(int(sliced_ds.get_page(0).get_image()['img'][0, 0, 0]), 2)
+        self.assertEqual(sliced.renders, [])
+
+    def test_clear(self):
+        """
+        测试清理文档的页面图像
+        """
+        dataset = FakeDataset(1)
+        self.cache.wrap(dataset, 'hash').get_page(0).get_image()
+        self.cache.clear('hash')
+        self.assertFalse(os.path.exists(os.path.join(self.temp_dir, 'hash')))
+        self.cache.wrap(dataset, 'hash').get_page(0).get_image()
+        self.assertEqual(dataset.renders, [0, 0])
+
+    def test_write_failure_returns_rendered_image(self):
+        """
+        测试缓存写入失败（如/dev/shm空间不足）时返回渲染结果，不抛出异常也不残留临时文件
+        """
+        dataset = FakeDataset(1)
+        with patch('numpy.save', side_effect=OSError(28, 'No space left on device')):
+            image = self.cache.wrap(dataset, 'hash').get_page(0).get_image()
+        self.assertEqual(image['width'], 10)
+        self.assertEqual(os.listdir(os.path.join(self.temp_dir, 'hash')), [])
+
+    def test_evict_oldest_documents_over_limit(self):
+        """
+        测试超出缓存容量时删除最早写入的其他文档，仍放不下时不缓存
+        """
+        page_bytes = 20 * 10 * 3
+        cache = PageImageCache(self.temp_dir, max_bytes=3 * page_bytes)
+        cache.wrap(FakeDataset(1), 'old').get_page(0).get_image()
+        old_dir = os.path.join(self.temp_dir, 'old')
+        os.utime(old_dir, (0, 0))
+        cache.wrap(FakeDataset(1), 'new').get_page(0).get_image()
+
+        current = cache.wrap(FakeDataset(3), 'current')
+        current.get_page(0).get_image()
+        self.assertFalse(os.path.exists(old_dir))
+        self.assertTrue(os.path.exists(os.path.join(self.temp_dir, 'new')))
+
+        current.get_page(1).get_image()
+        self.assertFalse(os.path.exists(os.path.join(self.temp_dir, 'new')))
+        # 当前文档的页面不会被删除，超出容量的页面不缓存
+        current.get_page(2).get_image()
+        self.assertEqual(len(os.listdir(os.path.join(self.temp_dir, 'current'))), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+PDF预检测试脚本
+测试inspect_pdf的检查结果和route_pdf的路径选择
+"""
+
+import sys
+import os
+import unittest
+import tempfile
+import shutil
+import fitz
+
+# 添加src目录到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from pdf_process_service import inspect_pdf, route_pdf
+
+
+class TestPreflight(unittest.TestCase):
+    """
+    PDF预检测试类
+    """
+
+    def setUp(self):
+        """
+        测试前的准备工作
+        """
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """
+        测试后的清理工作
+        """
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def make_pdf(self, name, pages=1, text='', **save_options):
+        """
+        生成测试用PDF文件
+        Args:
+            name: 文件名
+            pages: 页数
+            text: 每页写入的文字
+            save_options: 传给fitz保存方法的参数
+        Returns:
+            PDF文件路径
+        """
+        path = os.path.join(self.temp_dir, name)
+        doc = fitz.open()
+        for _ in range(pages):
+            page = doc.new_page()
+            if text:
+                page.insert_textbox(fitz.Rect(50, 50, 550, 800), text)
+        doc.save(path, **save_options)
+        doc.close()
+        return path
+
+    def test_text_pdf_routes_to_txt(self):
+        """
+        测试有文字层的PDF走文字解析路径
+        """
+        path = self.make_pdf('text.pdf', pages=3, text='Born digital paper text. ' * 20)
+        report = inspect_pdf(path)
+        self.assertEqual(report['page_count'], 3)
+        self.assertEqual(report['text_coverage'], 1.0)
+        self.assertEqual(route_pdf(report, {})[0], 'txt')
+
+    def test_blank_pdf_routes_to_ocr(self):
+        """
+        测试没有文字层的PDF走OCR路径
+        """
+        report = inspect_pdf(self.make_pdf('scan.pdf', pages=2))
+        self.assertEqual(report['text_coverage'], 0.0)
+        self.assertEqual(route_pdf(report, {})[0], 'ocr')
+
+    def test_corrupt_and_encrypted_rejected(self):
+        """
+        测试损坏和加密的PDF被拒绝
+        """
+        corrupt_path = os.path.join(self.temp_dir, 'corrupt.pdf')
+        with open(corrupt_path, 'wb') as f:
+            f.write(b'not a pdf at all')
+        report = inspect_pdf(corrupt_path)
+        self.assertTrue(report['corrupt'])
+        self.assertEqual(route_pdf(report, {})[0], 'reject')
+
+        encrypted_path = self.make_pdf(
+            'encrypted.pdf', text='secret',
+            encryption=fitz.PDF_ENCRYPT_AES_256, user_pw='user', owner_pw='owner'
+        )
+        report = inspect_pdf(encrypted_path)
+        self.assertTrue(report['encrypted'])
+        self.assertEqual(route_pdf(report, {})[0], 'reject')
+
+    def test_oversize_routing(self):
+        """
+        测试超大文档在配置了转发队列时转发，否则拒绝，已转发的消息允许处理
+        """
+        report = inspect_pdf(self.make_pdf('big.pdf', pages=3, text='Long text layer. ' * 20))
+        self.assertEqual(route_pdf(report, {'max_pages': 2})[0], 'reject')
+        self.assertEqual(route_pdf(report, {'max_pages': 2, 'oversize_queue': 'big'})[0], 'oversize')
+        self.assertEqual(route_pdf(report, {'max_pages': 2}, allow_oversize=True)[0], 'txt')
+
+
+if __name__ == '__main__':
+    unittest.main()
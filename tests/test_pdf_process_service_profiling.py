@@ -0,0 +1,150 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+性能分析测试脚本
+测试ArticleProfiler的结果保存以及慢文章的筛选逻辑
+"""
+
+import sys
+import os
+import json
+import yaml
+import unittest
+from unittest.mock import patch
+import tempfile
+import shutil
+
+# 添加src目录到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from pdf_process_service import PDFProcessService, ArticleProfiler
+
+
+class TestArticleProfiler(unittest.TestCase):
+    """
+    文章性能分析器测试类
+    """
+
+    def setUp(self):
+        """
+        测试前的准备工作
+        """
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """
+        测试后的清理工作
+        """
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_dump_timings_and_cprofile(self):
+        """
+        测试保存阶段耗时、分页耗时和cProfile结果
+        """
+        profiler = ArticleProfiler('a1', use_cprofile=True)
+        profiler.start()
+        sum(range(1000))
+        profiler.record_stage('download', 0.5, 1.0)
+        profiler.record_pages(0, 3, 2.0)
+        profiler.stop()
+
+        files = profiler.dump(self.temp_dir)
+        names = sorted(os.path.basename(path) for path in files)
+        self.assertEqual(names, ['profile.pstats', 'profile.txt', 'timings.json'])
+        with open(os.path.join(self.temp_dir, 'timings.json'), 'r', encoding='utf-8') as f:
+            timings = json.load(f)
+        self.assertEqual(timings['stages'], [{'stage': 'download', 'wait': 0.5, 'elapsed': 1.0}])
+        self.assertEqual(timings['pages'][0]['seconds_per_page'], 0.5)
+
+
+class TestProfileArticle(unittest.TestCase):
+    """
+    慢文章性能分析测试类
+    """
+
+    def setUp(self):
+        """
+        测试前的准备工作
+        """
+        self.temp_dir = tempfile.mkdtemp()
+        self.profile_dir = os.path.join(self.temp_dir, 'profiles')
+        self.config_path = os.path.join(self.temp_dir, 'test_config.yaml')
+        config = {
+            'mns': {
+                'endpoint': 'https://123456789.mns.cn-hangzhou.aliyuncs.com',
+                'access_id': 'test_access_id',
+                'access_key': 'test_access_key',
+                'queue_name': 'test_queue'
+            },
+            'oss': {
+                'endpoint': 'https://oss-cn-hangzhou.aliyuncs.com',
+                'access_id': 'test_access_id',
+                'access_key': 'test_access_key',
+                'bucket_name': 'test_bucket'
+            },
+            'temp': {
+                'pdf_dir': os.path.join(self.temp_dir, 'temp', 'pdf_dir'),
+                'image_dir': os.path.join(self.temp_dir, 'temp', 'image_dir'),
+                'markdown_dir': os.path.join(self.temp_dir, 'temp', 'markdown_dir')
+            },
+            'profiling': {
+                'enabled': True,
+                'sample_rate': 0,
+                'latency_threshold': 0,
+                'slowest_n': 1,
+                'output_dir': self.profile_dir
+            }
+        }
+        with open(self.config_path, 'w', encoding='utf-8') as f:
+            yaml.dump(config, f, default_flow_style=False, allow_unicode=True)
+
+    def tearDown(self):
+        """
+        测试后的清理工作
+        """
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    @patch('pdf_process_service.Account')
+    @patch('pdf_process_service.oss2.Auth')
+    @patch('pdf_process_service.oss2.Bucket')
+    def test_keep_only_slowest_articles(self, mock_bucket, mock_auth, mock_account):
+        """
+        测试只保存最慢的N篇文章，被挤出的结果目录被删除，未保存的文章不采集内存快照
+        """
+        service = PDFProcessService(self.config_path)
+
+        profilers = {}
+        with patch('pdf_process_service.tracemalloc.is_tracing', return_value=True), \
+                patch('pdf_process_service.tracemalloc.take_snapshot') as mock_snapshot:
+            mock_snapshot.return_value.statistics.return_value = []
+            for article_id, elapsed in [('slow', 10), ('fast', 5), ('slower', 20)]:
+                profiler = ArticleProfiler(article_id)
+                profiler.elapsed = elapsed
+                service.save_profile(profiler)
+                profilers[article_id] = profiler
+
+        self.assertEqual(os.listdir(self.profile_dir), ['slower'])
+        self.assertEqual(mock_snapshot.call_count, 2)
+        self.assertIsNone(profilers['fast'].snapshot)
+
+    @patch('pdf_process_service.Account')
+    @patch('pdf_process_service.oss2.Auth')
+    @patch('pdf_process_service.oss2.Bucket')
+    def test_failed_article_is_profiled(self, mock_bucket, mock_auth, mock_account):
+        """
+        测试处理失败的文章也保存分析结果并记录失败原因
+        """
+        service = PDFProcessService(self.config_path)
+        with self.assertRaises(ValueError):
+            with service.profile_article('broken'):
+                self.assertIsNotNone(service.current_profiler())
+                raise ValueError('broken pdf')
+
+        self.assertIsNone(service.current_profiler())
+        with open(os.path.join(self.profile_dir, 'broken', 'timings.json'), 'r', encoding='utf-8') as f:
+            self.assertIn('broken pdf', json.load(f)['status'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,187 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+增量重新处理测试脚本
+测试输出清单的比较逻辑以及重新处理模式下跳过和复用版面结果的流程
+"""
+
+import sys
+import os
+import json
+import hashlib
+import yaml
+import unittest
+from unittest.mock import Mock, patch
+import tempfile
+import shutil
+
+# 添加src目录到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from pdf_process_service import PDFProcessService, plan_reprocess
+
+
+class TestPlanReprocess(unittest.TestCase):
+    """
+    重新处理判断测试类
+    """
+
+    def setUp(self):
+        """
+        测试前的准备工作
+        """
+        self.manifest = {
+            'input_hash': 'h1',
+            'parse_method': 'txt',
+            'pipeline_version': 'v1',
+            'layout_version': 'models-1',
+            'layout_cached': True,
+            'outputs': ['content_list', 'markdown']
+        }
+
+    def test_plan(self):
+        """
+        测试各种清单状态下的处理方式
+        """
+        outputs = {'markdown'}
+        self.assertEqual(plan_reprocess(None, 'h1', 'v2', None, outputs)[0], 'full')
+        self.assertEqual(plan_reprocess(self.manifest, 'h2', 'v1', None, outputs)[0], 'full')
+        self.assertEqual(plan_reprocess(self.manifest, 'h1', 'v1', None, {'images'})[0], 'full')
+        self.assertEqual(plan_reprocess(self.manifest, 'h1', 'v1', None, outputs)[0], 'skip')
+        # 升级只影响OCR解析时，文字层文档保留已有结果
+        self.assertEqual(plan_reprocess(self.manifest, 'h1', 'v2', None, outputs, ['ocr'])[0], 'skip')
+        # 版面模型版本未变化时复用缓存的版面结果
+        self.assertEqual(plan_reprocess(self.manifest, 'h1', 'v2', 'models-1', outputs)[0], 'reparse')
+        self.assertEqual(plan_reprocess(self.manifest, 'h1', 'v2', 'models-2', outputs)[0], 'full')
+        self.assertEqual(plan_reprocess(dict(self.manifest, layout_cached=False), 'h1', 'v2', 'models-1', outputs)[0], 'full')
+
+
+class TestReprocessMode(unittest.TestCase):
+    """
+    重新处理模式测试类
+    """
+
+    def setUp(self):
+        """
+        测试前的准备工作
+        """
+        self.temp_dir = tempfile.mkdtemp()
+        self.config_path = os.path.join(self.temp_dir, 'test_config.yaml')
+        config = {
+            'mns': {
+                'endpoint': 'https://123456789.mns.cn-hangzhou.aliyuncs.com',
+                'access_id': 'test_access_id',
+                'access_key': 'test_access_key',
+                'queue_name': 'test_queue'
+            },
+            'oss': {
+                'endpoint': 'https://oss-cn-hangzhou.aliyuncs.com',
+                'access_id': 'test_access_id',
+                'access_key': 'test_access_key',
+                'bucket_name': 'test_bucket'
+            },
+            'temp': {
+                'pdf_dir': os.path.join(self.temp_dir, 'temp', 'pdf_dir'),
+                'image_dir': os.path.join(self.temp_dir, 'temp', 'image_dir'),
+                'markdown_dir': os.path.join(self.temp_dir, 'temp', 'markdown_dir')
+            },
+            'reprocess': {
+                'pipeline_version': 'v2',
+                'layout_version': 'models-1'
+            }
+        }
+        with open(self.config_path, 'w', encoding='utf-8') as f:
+            yaml.dump(config, f, default_flow_style=False, allow_unicode=True)
+
+        self.pdf_bytes = b'%PDF-1.4 test'
+        os.makedirs(config['temp']['pdf_dir'])
+        self.content = {
+            'article_id': 'a1',
+            'tag': 'test',
+            'pdf_url': 'https://example.com/a1.pdf',
+            'markdown_file': 'markdown/a1.md',
+            'images_path': 'images/a1',
+            'json_path': 'json/a1',
+            'reprocess': True
+        }
+        self.manifest = {
+            'input_hash': hashlib.sha256(self.pdf_bytes).hexdigest(),
+            'parse_method': 'txt',
+            'pipeline_version': 'v1',
+            'layout_version': 'models-1',
+            'layout_cached': True,
+            'outputs': ['content_list', 'images', 'markdown', 'middle_json']
+        }
+        self.layout = {'parse_method': 'txt', 'model_list': [{'layout_dets': [], 'page_info': {'page_no': 0}}]}
+
+    def tearDown(self):
+        """
+        测试后的清理工作
+        """
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def create_service(self, objects):
+        """
+        创建服务实例，OSS中的对象由objects字典提供
+        Args:
+            objects: OSS对象路径到内容字典的映射
+        Returns:
+            PDFProcessService实例
+        """
+        service = PDFProcessService(self.config_path)
+
+        def fake_download(url, local_path):
+            with open(local_path, 'wb') as f:
+                f.write(self.pdf_bytes)
+
+        def fake_get_object(key):
+            return Mock(read=Mock(return_value=json.dumps(objects[key])))
+
+        service.download_file = Mock(side_effect=fake_download)
+        service.bucket.get_object = Mock(side_effect=fake_get_object)
+        service.process_pdf = Mock(return_value={'page_count': 1})
+        service.process_pdf_fast = Mock()
+        service.upload_results = Mock()
+        service.send_topic_message = Mock()
+        service.topic_outbox = None
+        return service
+
+    @patch('pdf_process_service.Account')
+    @patch('pdf_process_service.oss2.Auth')
+    @patch('pdf_process_service.oss2.Bucket')
+    def test_reparse_with_cached_layout(self, mock_bucket, mock_auth, mock_account):
+        """
+        测试版面模型未变化时复用缓存的版面结果重新解析
+        """
+        service = self.create_service({
+            'json/a1/a1_manifest.json': self.manifest,
+            'json/a1/a1_layout.json': self.layout
+        })
+        service.convert_content(self.content)
+
+        self.assertEqual(service.process_pdf.call_args.kwargs['cached_layout'], self.layout)
+        service.upload_results.assert_called_once()
+        self.assertEqual(service.send_topic_message.call_args[0][0]['reprocess'], 'reparse')
+
+    @patch('pdf_process_service.Account')
+    @patch('pdf_process_service.oss2.Auth')
+    @patch('pdf_process_service.oss2.Bucket')
+    def test_skip_unaffected_document(self, mock_bucket, mock_auth, mock_account):
+        """
+        测试升级不影响的文档保留已有结果，只更新输出清单中的流程版本
+        """
+        service = self.create_service({'json/a1/a1_manifest.json': self.manifest})
+        service.reprocess_config['affected_parse_methods'] = ['ocr']
+        service.convert_content(self.content)
+
+        service.process_pdf.assert_not_called()
+        service.upload_results.assert_not_called()
+        key, body = service.bucket.put_object.call_args[0]
+        self.assertEqual(key, 'json/a1/a1_manifest.json')
+        self.assertEqual(json.loads(body)['pipeline_version'], 'v2')
+        self.assertEqual(service.send_topic_message.call_args[0][0]['reprocess'], 'skip')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,231 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+失败分类与重试策略测试脚本
+测试异常分类、阶段内重试以及死信和延迟重试策略
+"""
+
+import sys
+import os
+import json
+import yaml
+import unittest
+from unittest.mock import Mock, patch
+import tempfile
+import shutil
+import requests
+
+# 添加src目录到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from pdf_process_service import (
+    PDFProcessService, PDFRejectedError, PermanentInputError, TransientIOError, EngineError, InvalidMessageError,
+    classify_error
+)
+
+
+def http_error(status):
+    """
+    构造指定状态码的HTTPError
+    """
+    response = requests.Response()
+    response.status_code = status
+    return requests.HTTPError(f'{status} error', response=response)
+
+
+class TestClassifyError(unittest.TestCase):
+    """
+    异常分类测试类
+    """
+
+    def test_classify(self):
+        """
+        测试常见异常的分类
+        """
+        self.assertIs(classify_error(http_error(404)), PermanentInputError)
+        self.assertIs(classify_error(http_error(503)), TransientIOError)
+        self.assertIs(classify_error(http_error(429)), TransientIOError)
+        self.assertIs(classify_error(requests.ConnectionError('reset')), TransientIOError)
+        self.assertIs(classify_error(requests.Timeout('timeout')), TransientIOError)
+        self.assertIs(classify_error(PDFRejectedError('encrypted')), PermanentInputError)
+        self.assertIs(classify_error(json.JSONDecodeError('bad', '', 0)), PermanentInputError)
+        self.assertIs(classify_error(KeyError('Length1')), EngineError)
+        self.assertIs(classify_error(InvalidMessageError('tag')), PermanentInputError)
+        self.assertIs(classify_error(RuntimeError('CUDA out of memory')), EngineError)
+
+
+class TestRetryPolicy(unittest.TestCase):
+    """
+    重试策略测试类
+    """
+
+    def setUp(self):
+        """
+        测试前的准备工作
+        """
+        self.temp_dir = tempfile.mkdtemp()
+        self.config_path = os.path.join(self.temp_dir, 'test_config.yaml')
+        config = {
+            'mns': {
+                'endpoint': 'https://123456789.mns.cn-hangzhou.aliyuncs.com',
+                'access_id': 'test_access_id',
+                'access_key': 'test_access_key',
+                'queue_name': 'test_queue'
+            },
+            'oss': {
+                'endpoint': 'https://oss-cn-hangzhou.aliyuncs.com',
+                'access_id': 'test_access_id',
+                'access_key': 'test_access_key',
+                'bucket_name': 'test_bucket'
+            },
+            'temp': {
+                'pdf_dir': os.path.join(self.temp_dir, 'temp', 'pdf_dir'),
+                'image_dir': os.path.join(self.temp_dir, 'temp', 'image_dir'),
+                'markdown_dir': os.path.join(self.temp_dir, 'temp', 'markdown_dir')
+            },
+            'retry': {
+                'max_dequeue_count': 3,
+                'stage_attempts': 3,
+                'stage_delay': 0,
+                'engine_delay': 300,
+                'dead_letter_queue': 'dead_letters'
+            }
+        }
+        with open(self.config_path, 'w', encoding='utf-8') as f:
+            yaml.dump(config, f, default_flow_style=False, allow_unicode=True)
+
+        self.content = {
+            'article_id': 'a1',
+            'tag': 'test',
+            'pdf_url': 'https://example.com/a1.pdf',
+            'markdown_file': 'markdown/a1.md',
+            'images_path': 'images/a1',
+            'json_path': 'json/a1'
+        }
+
+    def tearDown(self):
+        """
+        测试后的清理工作
+        """
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def create_message(self, dequeue_count=1, body=None):
+        """
+        创建模拟的MNS消息
+        """
+        message = Mock()
+        message.message_id = 'm1'
+        message.receipt_handle = 'r1'
+        message.dequeue_count = dequeue_count
+        message.message_body = json.dumps(self.content) if body is None else body
+        return message
+
+    def create_service(self):
+        """
+        创建服务实例
+        """
+        service = PDFProcessService(self.config_path)
+        service.queue = Mock()
+        service.notice_manager = Mock()
+        return service
+
+    @patch('pdf_process_service.Account')
+    @patch('pdf_process_service.oss2.Auth')
+    @patch('pdf_process_service.oss2.Bucket')
+    def test_permanent_error_dead_lettered(self, mock_bucket, mock_auth, mock_account):
+        """
+        测试输入错误直接转入死信队列，不再重试
+        """
+        service = self.create_service()
+        service.download_file = Mock(side_effect=http_error(404))
+        service.handle_message(self.create_message())
+
+        service.download_file.assert_called_once()
+        service.queue.delete_message.assert_called_once_with('r1')
+        service.queue.change_message_visibility.assert_not_called()
+        dead_letter_queue = service.mns_account.get_queue.return_value
+        service.mns_account.get_queue.assert_called_with('dead_letters')
+        sent = dead_letter_queue.send_message.call_args[0][0]
+        self.assertEqual(json.loads(sent.message_body)['error_category'], 'PermanentInputError')
+        service.notice_manager.assert_called_once()
+
+    @patch('pdf_process_service.Account')
+    @patch('pdf_process_service.oss2.Auth')
+    @patch('pdf_process_service.oss2.Bucket')
+    def test_invalid_message_dead_lettered(self, mock_bucket, mock_auth, mock_account):
+        """
+        测试消息格式错误和缺少字段时直接删除
+        """
+        service = self.create_service()
+        service.handle_message(self.create_message(body='not json'))
+        service.queue.delete_message.assert_called_once_with('r1')
+
+        service.queue.reset_mock()
+        service.handle_message(self.create_message(body=json.dumps({'article_id': 'a1'})))
+        service.queue.delete_message.assert_called_once_with('r1')
+        service.queue.change_message_visibility.assert_not_called()
+
+    @patch('pdf_process_service.Account')
+    @patch('pdf_process_service.oss2.Auth')
+    @patch('pdf_process_service.oss2.Bucket')
+    def test_transient_error_retried_in_stage(self, mock_bucket, mock_auth, mock_account):
+        """
+        测试上传临时故障只重试上传，不重新推理
+        """
+        service = self.create_service()
+        service.download_file = Mock()
+        service.process_pdf = Mock(return_value={'page_count': 1})
+        service.upload_results = Mock(side_effect=[requests.ConnectionError('reset'), ['markdown/a1.md']])
+        service.upload_results.__name__ = 'upload_results'
+        service.send_topic_message = Mock()
+        service.topic_outbox = None
+        service.handle_message(self.create_message())
+
+        service.process_pdf.assert_called_once()
+        self.assertEqual(service.upload_results.call_count, 2)
+        service.queue.delete_message.assert_called_once_with('r1')
+
+    @patch('pdf_process_service.Account')
+    @patch('pdf_process_service.oss2.Auth')
+    @patch('pdf_process_service.oss2.Bucket')
+    def test_engine_error_delayed_retry(self, mock_bucket, mock_auth, mock_account):
+        """
+        测试引擎错误按退避时间延迟重试，达到最大处理次数时转入死信
+        """
+        service = self.create_service()
+        service.download_file = Mock()
+        service.process_pdf = Mock(side_effect=RuntimeError('model crashed'))
+
+        service.handle_message(self.create_message(dequeue_count=2))
+        service.queue.change_message_visibility.assert_not_called()
+        service.queue.delete_message.assert_called_once_with('r1')
+
+        service.queue.reset_mock()
+        service.handle_message(self.create_message(dequeue_count=1))
+        service.queue.change_message_visibility.assert_called_once_with('r1', 300)
+        service.queue.delete_message.assert_not_called()
+
+
+    @patch('pdf_process_service.Account')
+    @patch('pdf_process_service.oss2.Auth')
+    @patch('pdf_process_service.oss2.Bucket')
+    def test_in_progress_requeued_without_budget(self, mock_bucket, mock_auth, mock_account):
+        """
+        测试文章正在处理中时重新发送延迟消息，已达到最大处理次数也不转入死信
+        """
+        service = self.create_service()
+        service.processing_articles.add('a1')
+        service.handle_message(self.create_message(dequeue_count=3))
+
+        sent = service.queue.send_message.call_args[0][0]
+        self.assertEqual(json.loads(sent.message_body), self.content)
+        self.assertEqual(sent.delay_seconds, 60)
+        service.queue.delete_message.assert_called_once_with('r1')
+        service.queue.change_message_visibility.assert_not_called()
+        service.mns_account.get_queue.return_value.send_message.assert_not_called()
+        service.notice_manager.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
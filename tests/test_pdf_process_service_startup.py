@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+服务启动耗时测试脚本
+在独立进程中导入pdf_process_service，检查导入耗时、重量级依赖是否延迟加载，以及导入时是否有文件副作用
+"""
+
+import sys
+import os
+import json
+import re
+import subprocess
+import unittest
+import tempfile
+import shutil
+
+SRC_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+# 导入耗时上限(秒)，可通过环境变量调整
+IMPORT_TIME_BUDGET = float(os.environ.get('PDF2MD_IMPORT_TIME_BUDGET', '1.5'))
+
+# 导入服务模块时不应加载的重量级依赖
+HEAVY_MODULES = ('magic_pdf', 'torch', 'mns', 'aliyun')
+
+
+class TestStartup(unittest.TestCase):
+    """
+    服务启动耗时测试类
+    """
+
+    def setUp(self):
+        """
+        测试前的准备工作
+        """
+        self.work_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        """
+        测试后的清理工作
+        """
+        shutil.rmtree(self.work_dir, ignore_errors=True)
+
+    def run_import(self):
+        """
+        在空目录中用-X importtime导入服务模块
+        Returns:
+            (已加载的重量级模块列表, 服务模块累计导入耗时(秒))
+        """
+        code = (
+            'import sys, json; import pdf_process_service; '
+            f'print(json.dumps(sorted(m for m in sys.modules if m.split(".")[0] in {HEAVY_MODULES!r} '
+            'or m.startswith("oss2."))))'
+        )
+        env = dict(os.environ, PYTHONPATH=SRC_DIR)
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', code],
+            cwd=self.work_dir, env=env, capture_output=True, text=True, timeout=120
+        )
+        self.assertEqual(result.returncode, 0, result.stderr[-2000:])
+        loaded = json.loads(result.stdout.strip().splitlines()[-1])
+        match = re.search(r'import time:\s+\d+ \|\s+(\d+) \| pdf_process_service$', result.stderr, re.M)
+        self.assertIsNotNone(match)
+        return loaded, int(match.group(1)) / 1e6
+
+    def test_import_is_lazy_and_fast(self):
+        """
+        测试导入服务模块不加载重量级依赖，且耗时在预算内
+        """
+        loaded, import_seconds = self.run_import()
+        print(f"pdf_process_service导入耗时: {import_seconds:.3f} 秒")
+        self.assertEqual(loaded, [])
+        self.assertLess(import_seconds, IMPORT_TIME_BUDGET)
+
+    def test_import_has_no_side_effects(self):
+        """
+        测试导入服务模块时不创建日志目录和文件
+        """
+        self.run_import()
+        self.assertEqual(os.listdir(self.work_dir), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,265 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+处理状态接口测试脚本
+测试StatusRegistry的进度和吞吐量统计以及GET /status接口
+"""
+
+import sys
+import os
+import yaml
+import queue
+import threading
+import unittest
+from unittest.mock import Mock, patch
+import tempfile
+import shutil
+import requests
+
+# 添加src目录到Python路径
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from pdf_process_service import PDFProcessService, StatusRegistry
+
+
+class TestStatusRegistry(unittest.TestCase):
+    """
+    状态登记测试类
+    """
+
+    def test_track_progress(self):
+        """
+        测试登记处理中文章的阶段和页数进度
+        """
+        registry = StatusRegistry(window=300)
+        with registry.track('a1'):
+            registry.set_stage('inference', waiting=True)
+            registry.set_pages(pages_total=10, pages_processed=0)
+            registry.set_pages(add=4)
+            snapshot = registry.snapshot()
+            self.assertEqual(len(snapshot['in_flight']), 1)
+            record = snapshot['in_flight'][0]
+            self.assertEqual(record['article_id'], 'a1')
+            self.assertEqual(record['stage'], 'inference')
+            self.assertTrue(record['waiting'])
+            self.assertEqual((record['pages_processed'], record['pages_total']), (4, 10))
+            self.assertGreaterEqual(record['elapsed'], 0)
+
+        snapshot = registry.snapshot()
+        self.assertEqual(snapshot['in_flight'], [])
+        self.assertEqual(snapshot['throughput']['articles'], 1)
+        self.assertEqual(snapshot['throughput']['pages'], 4)
+        self.assertEqual(snapshot['throughput']['completed_total'], 1)
+
+    def test_failed_article(self):
+        """
+        测试处理失败的文章计入失败数，不计入吞吐量
+        """
+        registry = StatusRegistry(window=300)
+        with self.assertRaises(ValueError):
+            with registry.track('a1'):
+                registry.set_pages(pages_total=5, pages_processed=5)
+                raise ValueError('broken pdf')
+        throughput = registry.snapshot()['throughput']
+        self.assertEqual((throughput['articles'], throughput['failed'], throughput['pages']), (0, 1, 0))
+        self.assertEqual(throughput['failed_total'], 1)
+
+    def test_updates_without_article(self):
+        """
+        测试当前线程未登记文章时更新无效果
+        """
+        registry = StatusRegistry()
+        registry.set_stage('download')
+        registry.set_pages(add=3)
+        self.assertEqual(registry.snapshot()['in_flight'], [])
+
+
+class TestStatusApi(unittest.TestCase):
+    """
+    状态接口测试类
+    """
+
+    def setUp(self):
+        """
+        测试前的准备工作
+        """
+        self.temp_dir = tempfile.mkdtemp()
+        self.config_path = os.path.join(self.temp_dir, 'test_config.yaml')
+        config = {
+            'mns': {
+                'endpoint': 'https://123456789.mns.cn-hangzhou.aliyuncs.com',
+                'access_id': 'test_access_id',
+                'access_key': 'test_access_key',
+                'queue_name': 'test_queue'
+            },
+            'oss': {
+                'endpoint': 'https://oss-cn-hangzhou.aliyuncs.com',
+                'access_id': 'test_access_id',
+                'access_key': 'test_access_key',
+                'bucket_name': 'test_bucket'
+            },
+            'temp': {
+                'pdf_dir': os.path.join(self.temp_dir, 'temp', 'pdf_dir'),
+                'image_dir': os.path.join(self.temp_dir, 'temp', 'image_dir'),
+                'markdown_dir': os.path.join(self.temp_dir, 'temp', 'markdown_dir')
+            },
+            'api': {
+                'enabled': True,
+                'host': '127.0.0.1',
+                'port': 0
+            },
+            'status': {
+                'enabled': True,
+                'host': '127.0.0.1',
+                'port': 0
+            }
+        }
+        with open(self.config_path, 'w', encoding='utf-8') as f:
+            yaml.dump(config, f, default_flow_style=False, allow_unicode=True)
+
+    def tearDown(self):
+        """
+        测试后的清理工作
+        """
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    @patch('pdf_process_service.Account')
+    @patch('pdf_process_service.oss2.Auth')
+    @patch('pdf_process_service.oss2.Bucket')
+    def test_status_lists_in_flight_articles(self, mock_bucket, mock_auth, mock_account):
+        """
+        测试状态接口返回处理中文章的阶段、页数进度和队列积压
+        """
+        service = PDFProcessService(self.config_path)
+        service.queue.get_attributes.return_value = Mock(active_messages=7, inactive_messages=2, delay_messages=1)
+        started = threading.Event()
+        release = threading.Event()
+
+        def fake_convert_content(content):
+            service.status.set_pages(pages_total=20, pages_processed=0)
+            with service.stage('inference'):
+                service.status.set_pages(add=5)
+                started.set()
+                release.wait(10)
+
+        service.convert_content = Mock(side_effect=fake_convert_content)
+        service.start_api_server()
+        service.start_status_server()
+        status_url = f'http://127.0.0.1:{service.status_server.server_port}'
+        events = queue.Queue()
+        try:
+            service.submit_job({'article_id': 'a1'}, events)
+            self.assertTrue(started.wait(10))
+            status = requests.get(f'{status_url}/status', timeout=10).json()
+            release.set()
+            self.assertEqual(events.get(timeout=10)['event'], 'completed')
+            after = requests.get(f'{status_url}/status', timeout=10).json()
+        finally:
+            release.set()
+            service.stop_api_server()
+            service.stop_status_server()
+
+        self.assertEqual(len(status['in_flight']), 1)
+        record = status['in_flight'][0]
+        self.assertEqual(record['article_id'], 'a1')
+        self.assertEqual(record['stage'], 'inference')
+        self.assertFalse(record['waiting'])
+        self.assertEqual((record['pages_processed'], record['pages_total']), (5, 20))
+        self.assertEqual(status['backlog'], {'api_pending': 0, 'mns_active': 7, 'mns_inactive': 2, 'mns_delayed': 1})
+        self.assertGreater(status['process']['memory_mb'], 0)
+
+        self.assertEqual(after['in_flight'], [])
+        self.assertEqual(after['throughput']['articles'], 1)
+        self.assertEqual(after['throughput']['pages'], 5)
+        # MNS队列属性在缓存有效期内不重复查询
+        self.assertEqual(service.queue.get_attributes.call_count, 1)
+
+    @patch('pdf_process_service.Account')
+    @patch('pdf_process_service.oss2.Auth')
+    @patch('pdf_process_service.oss2.Bucket')
+    def test_status_server_does_not_accept_jobs(self, mock_bucket, mock_auth, mock_account):
+        """
+        测试状态接口单独监听，不提供POST /jobs，批量提交接口也不提供GET /status
+        """
+        service = PDFProcessService(self.config_path)
+        service.convert_content = Mock()
+        service.start_api_server()
+        service.start_status_server()
+        try:
+            status_url = f'http://127.0.0.1:{service.status_server.server_port}'
+            api_url = f'http://127.0.0.1:{service.api_server.server_port}'
+            self.assertNotEqual(status_url, api_url)
+            response = requests.post(f'{status_url}/jobs', json=[{'article_id': 'a1'}], timeout=10)
+            self.assertEqual(response.status_code, 501)
+            self.assertEqual(requests.get(f'{api_url}/status', timeout=10).status_code, 501)
+        finally:
+            service.stop_api_server()
+            service.stop_status_server()
+        service.convert_content.assert_not_called()
+
+    def test_cpu_percent_primed(self):
+        """
+        测试创建状态登记时预先调用一次cpu_percent，首次快照不固定返回0.0
+        """
+        with patch('pdf_process_service.psutil.Process') as mock_process:
+            StatusRegistry(window=300)
+        mock_process.return_value.cpu_percent.assert_called_once_with()
+
+    @patch('pdf_process_service.import_magic_pdf')
+    @patch('pdf_process_service.InferenceResult')
+    @patch('pdf_process_service.Account')
+    @patch('pdf_process_service.oss2.Auth')
+    @patch('pdf_process_service.oss2.Bucket')
+    def test_inference_reports_pages_per_range(self, mock_bucket, mock_auth, mock_account,
+                                               mock_inference_result, mock_import):
+        """
+        测试未启用检查点但启用状态接口时按progress_pages分段推理，每完成一段更新已处理页数
+        """
+        service = PDFProcessService(self.config_path)
+        self.assertFalse(service.checkpoint_enabled)
+        self.assertTrue(service.status_enabled)
+        service.progress_pages = 2
+
+        def fake_apply(func, ocr, start_page_id, end_page_id):
+            infer_result = Mock()
+            infer_result.get_infer_res.return_value = [{'page_info': {'page_no': i}} for i in range(5)]
+            return infer_result
+
+        ds = Mock()
+        ds.__len__ = Mock(return_value=5)
+        ds.apply = Mock(side_effect=fake_apply)
+        service.status.set_pages = Mock()
+
+        service.analyze_pdf(ds, False, 'a1', 'hash')
+
+        self.assertEqual(ds.apply.call_count, 3)
+        added = [c.kwargs['add'] for c in service.status.set_pages.call_args_list if 'add' in c.kwargs]
+        self.assertEqual(added, [2, 2, 1])
+        model_list = mock_inference_result.call_args[0][0]
+        self.assertEqual([page['page_info']['page_no'] for page in model_list], [0, 1, 2, 3, 4])
+
+    @patch('pdf_process_service.import_magic_pdf')
+    @patch('pdf_process_service.InferenceResult')
+    @patch('pdf_process_service.Account')
+    @patch('pdf_process_service.oss2.Auth')
+    @patch('pdf_process_service.oss2.Bucket')
+    def test_inference_not_split_without_status(self, mock_bucket, mock_auth, mock_account,
+                                                mock_inference_result, mock_import):
+        """
+        测试未启用状态接口时不为报告进度分段推理
+        """
+        service = PDFProcessService(self.config_path)
+        service.status_enabled = False
+        service.progress_pages = 2
+        ds = Mock()
+        ds.__len__ = Mock(return_value=5)
+
+        service.analyze_pdf(ds, False, 'a1', 'hash')
+
+        ds.apply.assert_called_once()
+        self.assertNotIn('start_page_id', ds.apply.call_args.kwargs)
+
+
+if __name__ == '__main__':
+    unittest.main()